@@ -0,0 +1,11 @@
+# Three-phase lag bioheat model as a library.
+# Importing the package only loads numpy, plotting functions import matplotlib when called.
+#
+#     from bioheat import Params, Grid, Scenario, Simulation
+#     result = Simulation(Params(k=1.5), Grid(), Scenario(wall_temp_duration=100, time_steps=200)).run()
+from bioheat.grid import Grid
+from bioheat.params import Params
+from bioheat.scenario import Scenario
+from bioheat.simulation import Result, Simulation
+
+__all__ = ['Grid', 'Params', 'Result', 'Scenario', 'Simulation']
@@ -0,0 +1,88 @@
+import numpy as np
+
+from bioheat.evaporation import evaporative_boundary
+
+# Boundary conditions of k.py and main.py written on the named views of one field buffer
+# (see kernel.buffer_views) with coefficients from kernel.step_coefficients, scalars or face arrays,
+# so that none of them allocates. Faces are named as in the boundary comments of k.py:
+# xL is row 0 (x = Lx), x0 row -1 (x = 0), y0 column 0 (y = 0) and yL column -1 (y = Ly).
+
+# Boundry between wall and tissue
+def wall_boundary(V, wall_temp):
+    V['x0'].fill(wall_temp)  # x = 0 (bottom boundary)
+    V['y0'].fill(wall_temp)  # y = 0 (left boundary)
+
+# Symmetrical boundary conditions from eq. 16
+def symmetric_boundary(V):
+    np.copyto(V['xL'], V['xL_in'])  # x = Lx
+    np.copyto(V['x0'], V['x0_in'])  # x = 0
+    np.copyto(V['y0'], V['y0_in'])  # y = 0
+    np.copyto(V['yL'], V['yL_in'])  # y = Ly
+
+# Convective boundary condition to introduce a constant heat coefficient
+def convective_boundary(V, C):
+    np.multiply(V['xL_in'], C['robin_inner_xL'], out=V['xL'])  # x = Lx
+    V['xL'] += C['robin_outer_xL']
+    np.multiply(V['yL_in'], C['robin_inner_yL'], out=V['yL'])  # y = Ly
+    V['yL'] += C['robin_outer_yL']
+
+# Fourth boundary using constant temperature and heat flux for two thermal conductivity terms from secondary paper to model conduction.
+# T[-1] = T[-2] - r (T[-2] - T[-3]) is evaluated as (1 - r) T[-2] + r T[-3] through the row and column scratch buffers.
+def fourth_boundary(V, C, row, column):
+    np.multiply(V['x0_in'], C['fourth_x_keep'], out=V['x0'])  # x = 0
+    np.multiply(V['x0_in2'], C['fourth_x'], out=row)
+    V['x0'] += row
+    np.multiply(V['y0_in'], C['fourth_y_keep'], out=V['y0'])  # y = 0
+    np.multiply(V['y0_in2'], C['fourth_y'], out=column)
+    V['y0'] += column
+
+# Third boundary using constant heat coefficient
+def third_boundary(V, C):
+    np.multiply(V['x0_in'], C['robin_inner_x0'], out=V['x0'])  # x = 0
+    V['x0'] += C['robin_outer_x0']
+    np.multiply(V['y0_in'], C['robin_inner_y0'], out=V['y0'])  # y = 0
+    V['y0'] += C['robin_outer_y0']
+
+# Boundary set 'wall', same sequence as the time loop in k.py
+def wall_boundary_set(V, V_new, C, scenario, workspace, wall_on):
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(V_new, scenario.Tw)
+
+    # Symmetric boundary conditions (Neumann conditions with zero gradient)
+    symmetric_boundary(V_new)
+
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(V_new, scenario.Tw)
+
+    convective_boundary(V_new, C)
+    if 'evaporation_faces' in C:
+        evaporative_boundary(V_new, C, workspace)
+
+    # Robin boundary condition once the wall has been removed, otherwise conduction into the wall material
+    if not wall_on and scenario.removes_wall:
+        third_boundary(V_new, C)
+    elif scenario.fourth_boundary_on:
+        fourth_boundary(V_new, C, workspace['row'], workspace['column'])
+
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(V_new, scenario.Tw)
+
+# Boundary set 'neumann_robin', main.py evaluates both conditions from the previous field
+def neumann_robin_boundary_set(V, V_new, C, scenario, workspace, wall_on):
+    # Neumann boundary condition (zero heat flux) on left and right boundaries
+    np.copyto(V_new['xL'], V['xL_in'])  # x = Lx
+    np.copyto(V_new['x0'], V['x0_in'])  # x = 0
+
+    # Robin boundary condition on top and bottom boundaries
+    np.multiply(V['yL_in'], C['robin_dy_inner_yL'], out=V_new['yL'])  # y = Ly
+    V_new['yL'] += C['robin_dy_outer_yL']
+    np.multiply(V['y0_in'], C['robin_dy_inner_y0'], out=V_new['y0'])  # y = 0
+    V_new['y0'] += C['robin_dy_outer_y0']
+
+BOUNDARY_SET_FUNCTIONS = {
+    'wall': wall_boundary_set,
+    'neumann_robin': neumann_robin_boundary_set,
+}
@@ -0,0 +1,344 @@
+import importlib.util
+from dataclasses import dataclass, field
+from math import comb
+
+import numpy as np
+
+from bioheat.kernel import advance, allocate_workspace, buffer_views
+from bioheat.sensitivity import coefficient_derivatives, initial_batch
+from bioheat.simulation import Simulation
+
+# Adjoint gradients of a temperature misfit and calibration of Params against measured curves.
+#
+#     data = Measurements(times, temperatures, probes=[(i, j)])
+#     fit = calibrate(params, grid, scenario, data, parameters=('k', 'wb', 'Qm0'))
+#     fit.params, fit.misfit
+#
+# The misfit is J = 1/2 sum over measurements of w (T(probe, time) - measured)^2, with the model sampled
+# after the step that ends at each measurement time. A step of the update is affine in the field,
+# X_n+1 = B(A X_n) with the interior update A and the boundary closures B, each closure overwriting one face
+# with a combination of other cells. The adjoint runs the transposed step backwards from the last step,
+#     lambda_n = (dX_n+1 / dX_n)^T lambda_n+1 + dJ / dX_n
+# and collects the gradient lambda_n+1 . dX_n+1 / dp on the way, the coefficient derivatives coming from
+# sensitivity.coefficient_derivatives. The cost is independent of the number of parameters.
+#
+# The transposed step needs the field before it. Storing all of them would take one field per step, so
+# the states are recomputed from a few snapshots with the binomial checkpointing of revolve (Griewank):
+# with s snapshots and n steps every step is recomputed at most t times, the smallest t with
+# C(s + t, s) >= n, so a gradient costs about t + 1 runs. dt is the time step of the initial parameters.
+
+@dataclass(frozen=True)
+class Measurements:
+    times: np.ndarray  # Measurement times (s)
+    temperatures: np.ndarray  # Measured temperature at every time and probe, shape (times, probes) (°C)
+    probes: list  # (i, j) cell of every probe column
+    weights: np.ndarray = None  # Weight of every measurement, same shape as temperatures, 1 if not given
+
+@dataclass
+class MisfitGradient:
+    misfit: float
+    gradient: np.ndarray  # dJ/dp of every parameter
+    parameters: tuple
+    dt: float
+    forward_steps: int  # Steps computed, the recomputations of the checkpointing included
+
+@dataclass
+class CalibrationResult:
+    params: object  # Params with the fitted values
+    misfit: float
+    values: np.ndarray  # Fitted value of every parameter
+    parameters: tuple
+    iterations: int
+    evaluations: int
+    history: list = field(default_factory=list)  # Misfit of every gradient evaluation
+    message: str = ''
+
+# Closures of one step of the boundary set as a tape, ('fill', face, value) or ('affine', face, terms, constant)
+# with terms (buffer, view, coefficient key or None for 1), buffer 'new' or 'old'. Same sequence as bioheat.boundaries.
+def boundary_tape(scenario, wall_on):
+    if scenario.boundary_set == 'neumann_robin':
+        return [
+            ('affine', 'xL', [('old', 'xL_in', None)], None),
+            ('affine', 'x0', [('old', 'x0_in', None)], None),
+            ('affine', 'yL', [('old', 'yL_in', 'robin_dy_inner_yL')], 'robin_dy_outer_yL'),
+            ('affine', 'y0', [('old', 'y0_in', 'robin_dy_inner_y0')], 'robin_dy_outer_y0'),
+        ]
+
+    wall = [('fill', 'x0', scenario.Tw), ('fill', 'y0', scenario.Tw)] if wall_on else []
+    tape = wall + [('affine', face, [('new', f'{face}_in', None)], None) for face in ('xL', 'x0', 'y0', 'yL')] + wall
+    tape += [
+        ('affine', 'xL', [('new', 'xL_in', 'robin_inner_xL')], 'robin_outer_xL'),
+        ('affine', 'yL', [('new', 'yL_in', 'robin_inner_yL')], 'robin_outer_yL'),
+    ]
+    if not wall_on and scenario.removes_wall:
+        tape += [
+            ('affine', 'x0', [('new', 'x0_in', 'robin_inner_x0')], 'robin_outer_x0'),
+            ('affine', 'y0', [('new', 'y0_in', 'robin_inner_y0')], 'robin_outer_y0'),
+        ]
+    elif scenario.fourth_boundary_on:
+        tape += [
+            ('affine', 'x0', [('new', 'x0_in', 'fourth_x_keep'), ('new', 'x0_in2', 'fourth_x')], None),
+            ('affine', 'y0', [('new', 'y0_in', 'fourth_y_keep'), ('new', 'y0_in2', 'fourth_y')], None),
+        ]
+    return tape + wall
+
+# lap(T) of the center rows into lap
+def laplacian(V, C, lap, work):
+    np.add(V['down'], V['up'], out=lap)
+    lap -= V['center']
+    lap -= V['center']
+    lap *= C['inv_dx2']
+    np.add(V['right'], V['left'], out=work)
+    work -= V['center']
+    work -= V['center']
+    work *= C['inv_dy2']
+    lap += work
+
+# Forward and transposed step of the discrete update, with the misfit of the measurements
+class AdjointStepper:
+    def __init__(self, params, grid, scenario, measurements, parameters, dt, wall_steps):
+        self.scenario = scenario
+        self.wall_steps = wall_steps
+        self.C, self.dC = coefficient_derivatives(params, grid, dt, parameters)
+        T_initial = initial_batch(params, grid, scenario, parameters)
+        self.X_initial = T_initial[0]
+        self.dX_initial = T_initial[1:]  # dX_0/dp
+
+        self.workspace = allocate_workspace(self.X_initial)
+        n_center = self.workspace['lap'].size
+        self.lap = np.empty(n_center)
+        self.lambda_new = buffer_views(np.zeros(grid.shape))
+        self.lambda_old = buffer_views(np.zeros(grid.shape))
+        self.gradient = np.zeros(len(parameters))
+        self.misfit = 0.0
+        self.forward_steps = 0
+
+        # Measurements by the step after which they are taken
+        times = np.asarray(measurements.times, float)
+        temperatures = np.asarray(measurements.temperatures, float).reshape(times.size, -1)
+        weights = np.ones_like(temperatures) if measurements.weights is None else np.asarray(measurements.weights, float).reshape(temperatures.shape)
+        steps = np.rint(times / dt).astype(int) - 1
+        if steps.min() < 0:
+            raise ValueError(f'Measurement at {times.min()}s is before the end of the first step ({dt}s)')
+        rows, columns = np.array(measurements.probes).reshape(-1, 2).T
+        self.observations = {}
+        for index, step in enumerate(steps):
+            self.observations.setdefault(step, []).append((temperatures[index], weights[index]))
+        self.probe_index = np.ravel_multi_index((rows, columns), grid.shape)
+        self.last_step = steps.max()
+
+    # n steps of the field from step start with the kernel, returns the new field
+    def forward(self, X, start, n):
+        workspace = self.workspace
+        V, V_new = workspace['buffers']
+        np.copyto(V['field'], X)
+        for step in range(start, start + n):
+            advance(workspace, V, V_new, self.C, self.scenario, step < self.wall_steps)
+            V, V_new = V_new, V
+        self.forward_steps += n
+        return V['field'].copy()
+
+    # Transposed step: lambda_old = (dX_n+1 / dX_n)^T (lambda_new + dJ / dX_n+1), gradient and misfit accumulated
+    def adjoint_step(self, step, X):
+        C, dC = self.C, self.dC
+        V, V_new = self.workspace['buffers']
+        np.copyto(V['field'], X)
+        lap, work = self.lap, self.workspace['work']
+
+        # Forward step, keeping lap(X) and the inputs of every closure
+        laplacian(V, C, lap, work)
+        np.multiply(lap, C['lap_coef'], out=work)
+        work += C['source']
+        np.add(V['center'], work, out=V_new['center'])
+        buffers = {'old': V, 'new': V_new}
+        tape = boundary_tape(self.scenario, step < self.wall_steps)
+        saved = []
+        for operation in tape:
+            if operation[0] == 'fill':
+                V_new[operation[1]].fill(operation[2])
+                saved.append(None)
+                continue
+            _, face, terms, constant = operation
+            inputs = [buffers[buffer][view].copy() for buffer, view, _ in terms]
+            saved.append(inputs)
+            out = V_new[face]
+            np.copyto(out, inputs[0])
+            if terms[0][2] is not None:
+                out *= C[terms[0][2]]
+            for values, (_, _, key) in zip(inputs[1:], terms[1:]):
+                out += values if key is None else C[key] * values
+            if constant is not None:
+                out += C[constant]
+        self.forward_steps += 1
+
+        # Measurements taken after this step
+        L_new, L_old = self.lambda_new, self.lambda_old
+        new_flat = L_new['field'].reshape(-1)
+        T_new_flat = V_new['field'].reshape(-1)
+        for measured, weights in self.observations.get(step, []):
+            residual = T_new_flat[self.probe_index] - measured
+            self.misfit += 0.5 * np.sum(weights * residual ** 2)
+            np.add.at(new_flat, self.probe_index, weights * residual)
+
+        # Closures in reverse, each moves the adjoint of its face to its inputs
+        L_old['field'].fill(0)
+        lambdas = {'old': L_old, 'new': L_new}
+        for operation, inputs in zip(reversed(tape), reversed(saved)):
+            if operation[0] == 'fill':
+                L_new[operation[1]].fill(0)
+                continue
+            _, face, terms, constant = operation
+            adjoint = L_new[face].copy()
+            L_new[face].fill(0)
+            for values, (buffer, view, key) in zip(inputs, terms):
+                if key is None:
+                    lambdas[buffer][view] += adjoint
+                else:
+                    lambdas[buffer][view] += C[key] * adjoint
+                    self.gradient += dC[key] * np.dot(adjoint, values)
+            if constant is not None:
+                self.gradient += dC[constant] * adjoint.sum()
+
+        # Interior update X_new = X + lap_coef * lap(X) + source, transposed
+        adjoint = L_new['center']
+        self.gradient += dC['lap_coef'] * np.dot(adjoint, lap) + dC['source'] * adjoint.sum()
+        diagonal = 1 - 2 * C['lap_coef'] * (C['inv_dx2'] + C['inv_dy2'])
+        L_old['center'] += diagonal * adjoint
+        for neighbour, inverse_spacing in (('down', 'inv_dx2'), ('up', 'inv_dx2'), ('right', 'inv_dy2'), ('left', 'inv_dy2')):
+            L_old[neighbour] += C['lap_coef'] * C[inverse_spacing] * adjoint
+
+        # lambda_n becomes the lambda_new of the previous step
+        self.lambda_new, self.lambda_old = L_old, L_new
+
+    # Contribution of the initial field, once lambda_0 is known
+    def finish(self):
+        self.gradient += np.tensordot(self.dX_initial, self.lambda_new['field'], axes=2)
+
+# Number of steps to advance before the first snapshot, so that the n steps can be reversed with
+# snapshots snapshots and the fewest recomputations: the right part needs n - m <= C(s - 1 + t, s - 1),
+# the left part m <= C(s + t - 1, s), for the smallest t with C(s + t, s) >= n
+def revolve_split(n, snapshots):
+    repeats = 1
+    while comb(snapshots + repeats, snapshots) < n:
+        repeats += 1
+    return max(1, min(comb(snapshots + repeats - 1, snapshots), n - 1))
+
+# Reverses steps start .. start + n - 1 from the field X before step start
+def reverse_steps(stepper, start, n, X, snapshots):
+    if n == 1:
+        stepper.adjoint_step(start, X)
+        return
+    if snapshots == 0:
+        for offset in reversed(range(n)):
+            stepper.adjoint_step(start + offset, stepper.forward(X, start, offset) if offset else X)
+        return
+    m = revolve_split(n, snapshots)
+    X_middle = stepper.forward(X, start, m)
+    reverse_steps(stepper, start + m, n - m, X_middle, snapshots - 1)
+    reverse_steps(stepper, start, m, X, snapshots)
+
+# Misfit of the measurements and its gradient for the parameters, by the adjoint with checkpointing.
+# The run ends at the last measurement. dt defaults to the time step Simulation resolves for params.
+def misfit_gradient(params, grid, scenario, measurements, parameters, snapshots=20, dt=None, wall_steps=None):
+    parameters = tuple(parameters)
+    if dt is None:
+        dt, _, wall_steps = Simulation(params, grid, scenario).time_stepping()
+    if wall_steps is None:
+        wall_steps = int(round(scenario.wall_temp_duration * scenario.dt / dt))
+
+    stepper = AdjointStepper(params, grid, scenario, measurements, parameters, dt, wall_steps)
+    reverse_steps(stepper, 0, stepper.last_step + 1, stepper.X_initial, snapshots)
+    stepper.finish()
+    return MisfitGradient(misfit=stepper.misfit, gradient=stepper.gradient, parameters=parameters, dt=dt,
+                          forward_steps=stepper.forward_steps)
+
+# Default search range of a parameter, a decade either side of its initial value
+def default_bounds(value):
+    return (0.1 * value, 10 * value) if value > 0 else (10 * value, 0.1 * value) if value < 0 else (-1, 1)
+
+# Fits the parameters to the measurements within bounds ({name: (low, high)}), starting from params.
+# Uses L-BFGS-B of scipy.optimize when it is installed, projected_descent otherwise. The optimizer works on
+# the values divided by their initial values, so parameters of very different size (tau_q and wb) are
+# equally scaled. The time step stays the one of the initial parameters, the bounds have to keep the
+# update stable.
+def calibrate(params, grid, scenario, measurements, parameters=('k', 'wb', 'Qm0', 'tau_q', 'tau_T', 'tau_v'),
+              bounds=None, snapshots=20, max_iter=50, tolerance=1e-8):
+    parameters = tuple(parameters)
+    bounds = dict(bounds or {})
+    initial = np.array([getattr(params, name) for name in parameters], float)
+    scale = np.where(initial != 0, np.abs(initial), 1)
+    box = np.array([bounds.get(name, default_bounds(value)) for name, value in zip(parameters, initial)], float) / scale[:, None]
+    dt, _, wall_steps = Simulation(params, grid, scenario).time_stepping()
+    history = []
+
+    def evaluate(x):
+        candidate = params.with_values(**{name: float(value) for name, value in zip(parameters, x * scale)})
+        result = misfit_gradient(candidate, grid, scenario, measurements, parameters, snapshots, dt, wall_steps)
+        history.append(result.misfit)
+        return result.misfit, result.gradient * scale
+
+    x0 = initial / scale
+    if importlib.util.find_spec('scipy') is not None:
+        from scipy.optimize import minimize
+
+        solution = minimize(evaluate, x0, jac=True, method='L-BFGS-B', bounds=box,
+                            options={'maxiter': max_iter, 'ftol': tolerance})
+        x, misfit, iterations, message = solution.x, solution.fun, solution.nit, str(solution.message)
+    else:
+        x, misfit, iterations, message = projected_descent(evaluate, x0, box, max_iter, tolerance)
+
+    values = x * scale
+    return CalibrationResult(params=params.with_values(**{name: float(value) for name, value in zip(parameters, values)}),
+                             misfit=misfit, values=values, parameters=parameters, iterations=iterations,
+                             evaluations=len(history), history=history, message=message)
+
+# Projected L-BFGS with Armijo backtracking along the projected path. Variables on a bound with the
+# gradient pushing outwards are held fixed, the quasi-Newton direction acts on the others.
+def projected_descent(evaluate, x, box, max_iter, tolerance, memory=10):
+    low, high = box[:, 0], box[:, 1]
+    x = np.clip(x, low, high)
+    misfit, gradient = evaluate(x)
+    pairs = []  # (s, y) of the last steps
+    for iteration in range(1, max_iter + 1):
+        free = ~(((x <= low) & (gradient > 0)) | ((x >= high) & (gradient < 0)))
+        if not np.any(gradient[free]):
+            return x, misfit, iteration, 'Projected gradient is zero'
+
+        # Two-loop recursion on the free variables
+        direction = np.where(free, -gradient, 0)
+        alphas = []
+        for s, y in reversed(pairs):
+            alpha = np.dot(s[free], direction[free]) / np.dot(y[free], s[free])
+            direction[free] -= alpha * y[free]
+            alphas.append(alpha)
+        if pairs:
+            s, y = pairs[-1]
+            direction *= np.dot(s, y) / np.dot(y, y)
+        else:
+            direction /= max(np.linalg.norm(direction), 1e-300)
+        for (s, y), alpha in zip(pairs, reversed(alphas)):
+            beta = np.dot(y[free], direction[free]) / np.dot(y[free], s[free])
+            direction[free] += (alpha - beta) * s[free]
+        if np.dot(direction, gradient) >= 0:
+            direction = np.where(free, -gradient, 0)
+            pairs.clear()
+
+        step = 1.0
+        while True:
+            candidate = np.clip(x + step * direction, low, high)
+            change = candidate - x
+            candidate_misfit, candidate_gradient = evaluate(candidate)
+            if candidate_misfit <= misfit + 1e-4 * np.dot(gradient, change):
+                break
+            step *= 0.5
+            if step < 1e-12:
+                return x, misfit, iteration, 'Line search failed'
+
+        converged = misfit - candidate_misfit <= tolerance * max(abs(misfit), 1)
+        y = candidate_gradient - gradient
+        if np.dot(change, y) > 1e-12 * np.linalg.norm(change) * np.linalg.norm(y):
+            pairs = (pairs + [(change, y)])[-memory:]
+        x, misfit, gradient = candidate, candidate_misfit, candidate_gradient
+        if converged:
+            return x, misfit, iteration, 'Relative reduction of the misfit below tolerance'
+    return x, misfit, max_iter, 'Maximum number of iterations reached'
@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import time as timer
+from dataclasses import asdict, fields
+
+import numpy as np
+
+from bioheat.grid import Grid
+from bioheat.params import Params
+from bioheat.scenario import Scenario
+
+# Local SQLite catalog of finished runs.
+#
+#     with RunCatalog('runs.sqlite') as catalog:
+#         catalog.record(result, runtime, dt_mode='scale', artifact_dir='artifacts')
+#         rows = catalog.query('k < ? AND wall_temp_duration > ?', (1, 40))
+#         arrays = catalog.load(rows[0])
+#
+# Every field of Params, Grid and Scenario is a column, next to the solver settings, the runtime,
+# summary statistics of the first probe and the path of the .npz file holding the arrays.
+
+SQL_TYPES = {float: 'REAL', int: 'INTEGER', bool: 'INTEGER', str: 'TEXT'}
+
+RUN_COLUMNS = [
+    ('id', 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    ('created', 'REAL'),  # Unix time the run was recorded (s)
+    ('label', 'TEXT'),
+    ('dt_mode', 'TEXT'),
+    ('dtype', 'TEXT'),
+    ('dt_run', 'REAL'),  # Time step the run used, dt is the requested one (s)
+    ('steps', 'INTEGER'),
+    ('runtime', 'REAL'),  # Wall clock time of the run (s)
+    ('probe_i', 'INTEGER'),
+    ('probe_j', 'INTEGER'),
+    ('probe_final', 'REAL'),  # Temperature of the first probe after the last step (°C)
+    ('probe_min', 'REAL'),
+    ('probe_max', 'REAL'),
+    ('probe_mean', 'REAL'),
+    ('artifact', 'TEXT'),  # Path of the .npz file with the arrays, NULL if none was written
+]
+
+PARAMETER_COLUMNS = [(f.name, SQL_TYPES.get(f.type, 'REAL')) for owner in (Params, Grid, Scenario) for f in fields(owner)]
+
+INDEXED_COLUMNS = ('k', 'wb', 'tau_q', 'wall_temp_duration', 'created')
+
+class RunCatalog:
+    def __init__(self, path='runs.sqlite'):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.create_schema()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        self.connection.close()
+
+    # Creates the runs table, and adds the columns of fields that are newer than an existing table
+    def create_schema(self):
+        columns = RUN_COLUMNS + PARAMETER_COLUMNS
+        with self.connection:
+            self.connection.execute(f'CREATE TABLE IF NOT EXISTS runs ({", ".join(f"{name} {sql_type}" for name, sql_type in columns)})')
+            existing = {row['name'] for row in self.connection.execute('PRAGMA table_info(runs)')}
+            for name, sql_type in columns:
+                if name not in existing:
+                    self.connection.execute(f'ALTER TABLE runs ADD COLUMN {name} {sql_type}')
+            for name in INDEXED_COLUMNS:
+                self.connection.execute(f'CREATE INDEX IF NOT EXISTS runs_{name} ON runs ({name})')
+
+    # Stores one Simulation result, writing its arrays to artifact_dir/run-<id>.npz if a directory is given.
+    # Returns the id of the new row.
+    def record(self, result, runtime=None, dt_mode=None, artifact_dir=None, label=None):
+        temperature = result.temperature
+        row = {
+            'created': timer.time(),
+            'label': label,
+            'dt_mode': dt_mode,
+            'dtype': str(result.T_final.dtype),
+            'dt_run': result.dt,
+            'steps': len(result.time),
+            'runtime': runtime,
+            'probe_i': int(result.probes[0][0]),
+            'probe_j': int(result.probes[0][1]),
+            'probe_final': float(temperature[-1]) if len(temperature) else None,
+            'probe_min': float(temperature.min()) if len(temperature) else None,
+            'probe_max': float(temperature.max()) if len(temperature) else None,
+            'probe_mean': float(temperature.mean()) if len(temperature) else None,
+        }
+        for configuration in (result.params, result.grid, result.scenario):
+            row.update(asdict(configuration))
+
+        with self.connection:
+            cursor = self.connection.execute(f'INSERT INTO runs ({", ".join(row)}) VALUES ({", ".join("?" * len(row))})',
+                                             list(row.values()))
+            run_id = cursor.lastrowid
+
+            if artifact_dir is not None:
+                os.makedirs(artifact_dir, exist_ok=True)
+                artifact = os.path.join(artifact_dir, f'run-{run_id}.npz')
+                save_artifact(artifact, result)
+                self.connection.execute('UPDATE runs SET artifact = ? WHERE id = ?', (artifact, run_id))
+
+        return run_id
+
+    # Rows matching an SQL condition on the catalog columns, e.g. query('k < ? AND wall_temp_duration > ?', (1, 40))
+    def query(self, where='1', parameters=(), order_by='id'):
+        return [dict(row) for row in self.connection.execute(f'SELECT * FROM runs WHERE {where} ORDER BY {order_by}', parameters)]
+
+    # Arrays of a catalog row, loaded from its artifact
+    def load(self, row):
+        if row['artifact'] is None:
+            raise ValueError(f"Run {row['id']} was recorded without an artifact")
+        with np.load(row['artifact']) as arrays:
+            return dict(arrays)
+
+# Arrays of a result in one compressed .npz file
+def save_artifact(path, result):
+    arrays = {'time': result.time, 'probe_temps': result.probe_temps, 'probes': np.array(result.probes), 'T_final': result.T_final}
+    if result.frames is not None:
+        arrays.update(frames=result.frames, frame_times=result.frame_times)
+    np.savez_compressed(path, **arrays)
+
+# Records the (run, result, runtime) stream of bioheat.sweep.run_sweep into the catalog and passes it on,
+# so it can sit in front of sweep_table
+def record_sweep(records, catalog, dt_mode=None, artifact_dir=None, label=None):
+    for run, result, runtime in records:
+        catalog.record(result, runtime, dt_mode, artifact_dir, label)
+        yield run, result, runtime
@@ -0,0 +1,81 @@
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from bioheat.grid import Grid
+from bioheat.tissue import TissueMap
+
+# Conjugate contact with a second material, replacing the fourth kind boundary of k.py.
+#
+#     result = Simulation(params, grid, scenario, contact=ContactBlock(thickness=0.01)).run()
+#
+# fourth_boundary approximates the material behind the x = 0 and y = 0 faces through the k / ku ratio on
+# one row of tissue. Here the material is meshed instead: the grid is extended by thickness beyond those
+# faces (rows after row -1, columns before column 0) and the extra cells get the conductivity ku and their
+# own rho and c, no perfusion or metabolism and plain Fourier conduction. Tissue and material are one
+# tissue map stepped by the same kernel, and the face between two cells carries one flux with the harmonic
+# mean conductivity, so heat flux and temperature are continuous across the contact exactly as inside
+# either block. The extra cost is the extra cells.
+#
+# The wall temperature of the scenario is applied on the outer faces of the material while it is on, as a
+# heater behind the contact material. Afterwards those faces are insulated, or Robin if the wall is removed.
+
+CONTACT_FACES = ('x0', 'y0')
+
+@dataclass(frozen=True)
+class ContactBlock:
+    thickness: float = 0.01  # Thickness of the material beyond each contact face (m)
+    k: float = None  # Thermal conductivity (W/m°C), ku of Params if not given
+    rho: float = 1000  # Density (kg/m^3)
+    c: float = 4180  # Specific heat (J/kg°C)
+    faces: tuple = CONTACT_FACES  # Tissue faces in contact with the material
+
+    def __post_init__(self):
+        unknown = set(self.faces) - set(CONTACT_FACES)
+        if unknown:
+            raise ValueError(f'Contact faces {sorted(unknown)} are not supported, expected a subset of {CONTACT_FACES}')
+
+# Extended grid and tissue map of tissue plus material, with the slices of the tissue in the extended field
+@dataclass
+class ConjugateSetup:
+    grid: Grid
+    tissue: TissueMap
+    rows: slice
+    columns: slice
+
+    def tissue_part(self, T_array):
+        return T_array[self.rows, self.columns]
+
+def conjugate_setup(params, grid, contact, tissue=None):
+    extra_rows = int(round(contact.thickness / grid.dx)) if 'x0' in contact.faces else 0
+    extra_columns = int(round(contact.thickness / grid.dy)) if 'y0' in contact.faces else 0
+    nx = grid.nx + extra_rows
+    ny = grid.ny + extra_columns
+
+    # Lx half a cell short of the last node, so arange(0, Lx + dx, dx) cannot pick up an extra node from rounding
+    extended = Grid(Lx=(nx - 1.5) * grid.dx, Ly=(ny - 1.5) * grid.dy, dx=grid.dx, dy=grid.dy)
+    if extended.shape != (nx, ny):
+        raise ValueError(f'Extended grid has shape {extended.shape}, expected {(nx, ny)}')
+
+    if tissue is None:
+        tissue = TissueMap.uniform(grid, params)
+
+    material = {'k': params.ku if contact.k is None else contact.k, 'rho': contact.rho, 'c': contact.c, 'wb': 0, 'Qm0': 0}
+    rows = slice(0, grid.nx)
+    columns = slice(extra_columns, extra_columns + grid.ny)
+    arrays = {}
+    for name, value in material.items():
+        array = np.full((nx, ny), float(value))
+        array[rows, columns] = getattr(tissue, name)
+        arrays[name] = array
+
+    labels = np.full((nx, ny), -1)
+    labels[rows, columns] = tissue.labels if tissue.labels is not None else 0
+    conduction_only = np.ones((nx, ny), bool)
+    conduction_only[rows, columns] = tissue.conduction_only if tissue.conduction_only is not None else False
+
+    return ConjugateSetup(extended, TissueMap(labels=labels, conduction_only=conduction_only, **arrays), rows, columns)
+
+# Scenario for the extended grid: the material replaces the fourth kind closure
+def conjugate_scenario(scenario):
+    return replace(scenario, fourth_boundary_on=False)
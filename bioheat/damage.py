@@ -0,0 +1,57 @@
+import numpy as np
+
+# Thermal damage accumulated during a run, one value per cell.
+#
+#     damage = ThermalDamage(grid.shape)
+#     result = Simulation(..., damage=damage).run()
+#     damage.omega, damage.cem43, damage.damaged_fraction()
+#
+# Arrhenius damage integral, Omega = integral of A * exp(-Ea / (R * T)) dt with T in kelvin, and the
+# cumulative equivalent minutes at 43 °C, CEM43 = integral of R_cem^(43 - T) dt / 60 with
+# R_cem = 0.5 above 43 °C and 0.25 below (Sapareto and Dewey). Both are updated after every step
+# with the rectangle rule, through preallocated buffers, so memory stays at a few fields however
+# long the run is.
+
+KELVIN = 273.15
+GAS_CONSTANT = 8.314  # (J/mol K)
+
+class ThermalDamage:
+    def __init__(self, shape, A=3.1e98, Ea=6.28e5, dtype=np.float64):
+        self.A = A  # Frequency factor (1/s), default from Henriques for skin
+        self.Ea = Ea  # Activation energy (J/mol)
+        self.omega = np.zeros(shape, dtype)
+        self.cem43 = np.zeros(shape, dtype)  # (min)
+        self.work = np.empty(shape, dtype)
+        self.log_base = np.empty(shape, dtype)
+        self.above = np.empty(shape, bool)
+
+    def reset(self):
+        self.omega.fill(0)
+        self.cem43.fill(0)
+
+    # Adds one step of length dt (s) at temperature field T_array (°C)
+    def update(self, T_array, dt):
+        work = self.work
+
+        # Omega += dt * exp(ln A - Ea / (R * T)), ln A keeps the exponent in range
+        np.add(T_array, KELVIN, out=work)
+        np.reciprocal(work, out=work)
+        work *= -self.Ea / GAS_CONSTANT
+        work += np.log(self.A)
+        np.exp(work, out=work)
+        work *= dt
+        self.omega += work
+
+        # CEM43 += dt / 60 * exp((43 - T) * ln R_cem)
+        np.greater_equal(T_array, 43, out=self.above)
+        self.log_base.fill(np.log(0.25))
+        np.copyto(self.log_base, np.log(0.5), where=self.above)
+        np.subtract(43, T_array, out=work)
+        work *= self.log_base
+        np.exp(work, out=work)
+        work *= dt / 60
+        self.cem43 += work
+
+    # Fraction of denatured tissue, 1 - exp(-Omega), Omega = 1 is the usual threshold for necrosis
+    def damaged_fraction(self):
+        return -np.expm1(-self.omega)
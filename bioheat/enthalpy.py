@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from bioheat.boundaries import BOUNDARY_SET_FUNCTIONS
+from bioheat.kernel import allocate_workspace, buffer_views, flux_divergence
+
+# Enthalpy formulation of the TPL update for freezing tissue (cryosurgery).
+#
+# The state is the volumetric enthalpy H (J/m^3), zero for tissue that has just frozen solid at T_solidus:
+#     T < T_solidus                   H = C_f (T - T_solidus)
+#     T_solidus <= T <= T_liquidus    H rises linearly to H_l = latent_heat + C_m (T_liquidus - T_solidus)
+#     T > T_liquidus                  H = H_l + C_u (T - T_liquidus)
+# with C_f = rho * c_frozen, C_u = rho * c and C_m their mean. The liquid fraction f = clip(H / H_l, 0, 1)
+# switches the properties cell by cell, k = k_frozen + f (k - k_frozen) and perfusion and metabolism
+# scaled by f, so frozen tissue conducts like ice and has no blood flow. The update of the constant
+# property kernel becomes
+#     H_n+1 = H_n + dt * (lag(k) * (div(k grad T) + f (Qb + Qm)) - tau_T * k_star * lap(T))
+# which reduces to it when nothing freezes. The front is wherever 0 < f < 1, no interface is tracked
+# and every step costs the same however large the ice ball is. The boundary conditions act on T with
+# the unfrozen conductivity, H of the faces is then recomputed from T.
+
+@dataclass(frozen=True)
+class PhaseChange:
+    latent_heat: float = 2.5e8  # Volumetric latent heat of tissue water (J/m^3)
+    T_solidus: float = -8  # Tissue fully frozen below (°C)
+    T_liquidus: float = -1  # Tissue fully unfrozen above (°C)
+    k_frozen: float = 2.0  # Thermal conductivity of frozen tissue (W/m°C)
+    c_frozen: float = 1800  # Specific heat of frozen tissue (J/kg°C)
+
+    # Largest laplacian coefficient of the frozen and unfrozen phase, the mushy zone is less diffusive
+    def laplacian_coefficient(self, params):
+        frozen = params.with_values(k=self.k_frozen, c=self.c_frozen)
+        return max(params.laplacian_coefficient, frozen.laplacian_coefficient)
+
+# Volumetric heat capacities, enthalpy breakpoint and update constants of the phases
+def phase_constants(params, phase_change, dt):
+    C_f = params.rho * phase_change.c_frozen
+    C_u = params.rho * params.c
+    mushy_range = phase_change.T_liquidus - phase_change.T_solidus
+    H_l = phase_change.latent_heat + 0.5 * (C_f + C_u) * mushy_range
+    return {
+        'T_solidus': phase_change.T_solidus,
+        'T_liquidus': phase_change.T_liquidus,
+        'C_f': C_f,
+        'C_u': C_u,
+        'H_l': H_l,
+        'mushy_slope': mushy_range / H_l,  # dT/dH in the mushy zone
+        'k_frozen': phase_change.k_frozen,
+        'k_range': params.k - phase_change.k_frozen,
+        'lag_base': 1 + params.tau_q + params.k_star * params.tau_v,
+        'tau_k_star': params.tau_T * params.k_star,
+        'sources': params.Qb + params.Qm,
+        'dt': dt,
+    }
+
+# H = C_f min(T - T_s, 0) + clip(T - T_s, 0, T_l - T_s) / mushy_slope + C_u max(T - T_l, 0)
+def enthalpy_from_temperature(T_array, P, out, work):
+    np.subtract(T_array, P['T_solidus'], out=work)
+    np.minimum(work, 0, out=out)
+    out *= P['C_f']
+    np.clip(work, 0, P['T_liquidus'] - P['T_solidus'], out=work)
+    work *= 1 / P['mushy_slope']
+    out += work
+    np.subtract(T_array, P['T_liquidus'], out=work)
+    np.maximum(work, 0, out=work)
+    work *= P['C_u']
+    out += work
+
+# T = T_s + min(H, 0) / C_f + clip(H, 0, H_l) * mushy_slope + max(H - H_l, 0) / C_u
+def temperature_from_enthalpy(H, P, out, work):
+    np.minimum(H, 0, out=out)
+    out *= 1 / P['C_f']
+    out += P['T_solidus']
+    np.clip(H, 0, P['H_l'], out=work)
+    work *= P['mushy_slope']
+    out += work
+    np.subtract(H, P['H_l'], out=work)
+    np.maximum(work, 0, out=work)
+    work *= 1 / P['C_u']
+    out += work
+
+# Workspace of kernel.allocate_workspace with the enthalpy field, the conductivity field and their scratch buffers
+def allocate_enthalpy_workspace(T_initial, P):
+    workspace = allocate_workspace(T_initial)
+    n_center = workspace['lap'].size
+    H = np.empty_like(T_initial)
+    enthalpy_from_temperature(T_initial, P, H, np.empty_like(T_initial))
+    workspace.update({
+        'H': H.reshape(-1),
+        'H_center': buffer_views(H)['center'],
+        'K': buffer_views(np.empty_like(T_initial)),
+        'field_work': np.empty(T_initial.size, T_initial.dtype),
+        'fraction': np.empty(n_center, T_initial.dtype),
+        'lag': np.empty(n_center, T_initial.dtype),
+        'face': np.empty(n_center, T_initial.dtype),
+        'flux': np.empty(n_center, T_initial.dtype),
+    })
+    return workspace
+
+# Liquid fraction clip(H / H_l, 0, 1) of the whole field into out
+def liquid_fraction(H, P, out):
+    np.multiply(H, 1 / P['H_l'], out=out)
+    np.clip(out, 0, 1, out=out)
+
+# One time step from the views of T into the views of T_new, updating the enthalpy in place
+def advance_enthalpy(workspace, V, V_new, C, P, scenario, wall_on):
+    H = workspace['H']
+    H_center = workspace['H_center']
+    K = workspace['K']
+    lap = workspace['lap']
+    work = workspace['work']
+    fraction = workspace['fraction']
+    lag = workspace['lag']
+
+    # Conductivity of every cell from its liquid fraction
+    k_flat = K['field'].reshape(-1)
+    liquid_fraction(H, P, k_flat)
+    np.copyto(fraction, K['center'])
+    k_flat *= P['k_range']
+    k_flat += P['k_frozen']
+
+    # lag(k) = 1 + tau_q + k + k_star * tau_v
+    np.add(K['center'], P['lag_base'], out=lag)
+
+    # lag(k) * (div(k grad T) + f (Qb + Qm))
+    flux_divergence(V, K, C, workspace['face'], workspace['flux'], work)
+    fraction *= P['sources']
+    work += fraction
+    work *= lag
+
+    # - tau_T * k_star * lap(T)
+    np.add(V['down'], V['up'], out=lap)
+    lap -= V['center']
+    lap -= V['center']
+    lap *= C['inv_dx2']
+    np.add(V['right'], V['left'], out=fraction)
+    fraction -= V['center']
+    fraction -= V['center']
+    fraction *= C['inv_dy2']
+    lap += fraction
+    lap *= P['tau_k_star']
+    work -= lap
+
+    # H_n+1 = H_n + dt * (...)
+    work *= P['dt']
+    H_center += work
+
+    # Temperature of the whole field, then the boundary conditions on T and the enthalpy of the faces
+    T_new_flat = V_new['field'].reshape(-1)
+    temperature_from_enthalpy(H, P, T_new_flat, workspace['field_work'])
+    BOUNDARY_SET_FUNCTIONS[scenario.boundary_set](V, V_new, C, scenario, workspace, wall_on)
+    enthalpy_from_temperature(T_new_flat, P, H, workspace['field_work'])
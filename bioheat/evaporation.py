@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# Evaporative (sweat) cooling on the convective faces, the model of the MATLAB evaporation scripts.
+#
+#     result = Simulation(params, grid, scenario, evaporation=Evaporation(sweat_rate=2e-4)).run()
+#
+# The evaporative heat flux leaving the skin surface is
+#     q_e = clip((P_sat(T_s) - RH * P_sat(T_air)) / R_e, 0, sweat_rate * latent_heat)
+# limited by what the air can take up (vapor pressure difference over the evaporative resistance R_e of
+# the air layer) and by the sweat that is available. R_e defaults to 1 / (LR * h), the Lewis relation
+# with the convective coefficient h of Params. The surface energy balance of convective_boundary,
+#     k (T_in - T_s) / dx = h (T_s - Tl) + q_e
+# gives T_s = robin closure - dx / (k + h dx) * q_e, with q_e taken at the convective surface temperature.
+# P_sat comes from a table built once, looked up per face cell by linear interpolation, so a step adds a
+# few passes over the faces and no exponentials.
+
+LEWIS_RATIO = 16.5  # Lewis ratio of air (°C/kPa)
+
+@dataclass(frozen=True)
+class Evaporation:
+    relative_humidity: float = 0.5  # Relative humidity of the air
+    air_temp: float = None  # Air temperature (°C), Tl of Params if not given
+    evaporative_resistance: float = None  # R_e of the air layer (m^2 kPa/W), 1 / (LR * h) if not given
+    sweat_rate: float = 1e-4  # Sweat secreted per surface area (kg/m^2s)
+    latent_heat: float = 2.43e6  # Latent heat of vaporization of sweat (J/kg)
+    faces: tuple = ('xL', 'yL')  # Skin faces exposed to air, the convective faces by default
+    table_min: float = -50  # Range and resolution of the saturation pressure table (°C)
+    table_max: float = 150
+    table_step: float = 0.05
+
+    def __post_init__(self):
+        unknown = set(self.faces) - {'xL', 'yL'}
+        if unknown:
+            raise ValueError(f'Evaporation faces {sorted(unknown)} are not convective faces, expected a subset of (\'xL\', \'yL\')')
+
+# Saturation vapor pressure of water (kPa), Magnus formula
+def saturation_pressure(T):
+    return 0.61094 * np.exp(17.625 * T / (T + 243.04))
+
+# Table and scalars of the evaporative flux, part of kernel.step_coefficients.
+# k_faces maps every face to the conductivity of its cells.
+def evaporation_coefficients(evaporation, params, grid, k_faces):
+    air_temp = params.Tl if evaporation.air_temp is None else evaporation.air_temp
+    resistance = evaporation.evaporative_resistance
+    if resistance is None:
+        resistance = 1 / (LEWIS_RATIO * params.h)
+
+    n_entries = int(round((evaporation.table_max - evaporation.table_min) / evaporation.table_step)) + 1
+    table_T = evaporation.table_min + evaporation.table_step * np.arange(n_entries)
+    pressure = saturation_pressure(table_T)
+    return {
+        'evaporation_faces': evaporation.faces,
+        'evaporation_table': pressure,
+        'evaporation_slope': np.append(np.diff(pressure), 0),  # Pressure step to the next entry
+        'evaporation_table_min': evaporation.table_min,
+        'evaporation_inv_step': 1 / evaporation.table_step,
+        'evaporation_last': n_entries - 1,
+        'evaporation_air_pressure': evaporation.relative_humidity * saturation_pressure(air_temp),
+        'evaporation_inv_resistance': 1 / resistance,
+        'evaporation_max_flux': evaporation.sweat_rate * evaporation.latent_heat,
+        **{f'evaporation_scale_{face}': grid.dx / (k_faces[face] + params.h * grid.dx) for face in evaporation.faces},
+    }
+
+# Scratch buffers of one face length
+def face_buffers(length, dtype):
+    return {
+        'position': np.empty(length, dtype),
+        'index': np.empty(length, np.intp),
+        'lower': np.empty(length, dtype),
+        'flux': np.empty(length, dtype),
+    }
+
+# Subtracts the evaporative cooling from the surface temperatures set by convective_boundary
+def evaporative_boundary(V, C, workspace):
+    buffers = workspace.setdefault('evaporation', {})
+    for face in C['evaporation_faces']:
+        T_surface = V[face]
+        if face not in buffers:
+            buffers[face] = face_buffers(T_surface.size, T_surface.dtype)
+        B = buffers[face]
+        position = B['position']
+        flux = B['flux']
+
+        # Fractional table position of every surface temperature, clipped to the table
+        np.subtract(T_surface, C['evaporation_table_min'], out=position)
+        position *= C['evaporation_inv_step']
+        np.clip(position, 0, C['evaporation_last'], out=position)
+        np.floor(position, out=B['lower'])
+        np.copyto(B['index'], B['lower'], casting='unsafe')
+        position -= B['lower']
+
+        # P_sat = table[i] + (position - i) * (table[i + 1] - table[i])
+        np.take(C['evaporation_slope'], B['index'], out=flux)
+        flux *= position
+        flux += np.take(C['evaporation_table'], B['index'], out=B['lower'])
+
+        # q_e = clip((P_sat - RH P_air) / R_e, 0, sweat_rate * latent_heat)
+        flux -= C['evaporation_air_pressure']
+        flux *= C['evaporation_inv_resistance']
+        np.clip(flux, 0, C['evaporation_max_flux'], out=flux)
+
+        flux *= C[f'evaporation_scale_{face}']
+        T_surface -= flux
@@ -0,0 +1,104 @@
+import importlib.util
+
+import numpy as np
+
+from bioheat.sweep import parameter_value
+
+# Columnar export of probe time series and sweep tables.
+#
+#     path = 'series' + columnar_suffix()
+#     export_probe_series(run_sweep(plan, dt_mode='scale'), path)
+#     columns = load_columns(path)
+#
+# The long format has one row per (configuration, probe, step) with the columns run, time, probe_i,
+# probe_j, temperature and one column per swept parameter. Parquet files get one row group per
+# configuration and are written while the sweep runs. pyarrow is only imported for .parquet paths.
+# Compressed .npz files hold the same columns plus row_group_offsets, the first row of every
+# configuration, and are written once all configurations are in.
+
+# '.parquet' when pyarrow is installed, '.npz' otherwise
+def columnar_suffix():
+    return '.parquet' if importlib.util.find_spec('pyarrow') is not None else '.npz'
+
+# Long format columns of one configuration
+def probe_series_columns(run_index, run, result, columns):
+    n_steps, n_probes = result.probe_temps.shape
+    probes = np.array(result.probes).reshape(-1, 2)
+    series = {
+        'run': np.full(n_steps * n_probes, run_index, np.int32),
+        'time': np.tile(result.time, n_probes),
+        'probe_i': np.repeat(probes[:, 0], n_steps).astype(np.int32),
+        'probe_j': np.repeat(probes[:, 1], n_steps).astype(np.int32),
+        'temperature': result.probe_temps.T.reshape(-1),
+    }
+    for name in columns:
+        series[name] = np.full(n_steps * n_probes, parameter_value(run, name))
+    return series
+
+# Writes the (run, result, runtime) stream of bioheat.sweep.run_sweep to a .parquet or .npz file,
+# parameter columns default to the swept names of the first record. Returns the number of rows.
+def export_probe_series(records, path, columns=None):
+    n_rows = 0
+    if str(path).endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for run_index, (run, result, runtime) in enumerate(records):
+                if columns is None:
+                    columns = list(run.values)
+                table = pa.table(probe_series_columns(run_index, run, result, columns))
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+                writer.write_table(table, row_group_size=table.num_rows)
+                n_rows += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        return n_rows
+
+    chunks = []
+    offsets = []
+    for run_index, (run, result, runtime) in enumerate(records):
+        if columns is None:
+            columns = list(run.values)
+        chunks.append(probe_series_columns(run_index, run, result, columns))
+        offsets.append(n_rows)
+        n_rows += len(chunks[-1]['time'])
+
+    arrays = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]} if chunks else {}
+    np.savez_compressed(path, row_group_offsets=np.array(offsets, np.int64), **arrays)
+    return n_rows
+
+# Writes a table of equal length columns, e.g. from bioheat.sweep.sweep_table, to a .parquet or .npz file
+def export_table(table, path):
+    if str(path).endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.table({name: np.asarray(column) for name, column in table.items()}), path, compression='zstd')
+    else:
+        np.savez_compressed(path, **{name: np.asarray(column) for name, column in table.items()})
+
+# Columns of a file written by export_probe_series or export_table.
+# row_groups selects configurations of a probe series, by row group index.
+def load_columns(path, columns=None, row_groups=None):
+    if str(path).endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        if row_groups is None:
+            table = parquet_file.read(columns=columns)
+        else:
+            table = parquet_file.read_row_groups(row_groups, columns=columns)
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+
+    with np.load(path) as arrays:
+        names = [name for name in (columns or arrays.files) if name != 'row_group_offsets']
+        if row_groups is None or 'row_group_offsets' not in arrays.files:
+            return {name: arrays[name] for name in names}
+
+        offsets = np.append(arrays['row_group_offsets'], len(arrays['run']))
+        rows = np.concatenate([np.arange(offsets[group], offsets[group + 1]) for group in row_groups])
+        return {name: arrays[name][rows] for name in names}
@@ -0,0 +1,154 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from bioheat.damage import ThermalDamage
+from bioheat.grid import Grid
+from bioheat.params import Params
+from bioheat.sampling import Uniform, transform, unit_samples
+from bioheat.scenario import Scenario
+from bioheat.uq import batch_params, ensemble_time_stepping, run_ensemble
+
+# Variance based (Sobol) global sensitivity of the run outcomes to the parameters of Params.
+#
+#     indices = sobol_indices(uniform_ranges(params, spread=0.2), n_base=1024, params=params, grid=grid, scenario=scenario)
+#     indices.total['temperature'][:, 0]  # total index of every parameter for the final temperature at the first probe
+#     indices.ranking('damaged_fraction')
+#
+# The first order index S_i is the share of the output variance explained by parameter i alone, the total
+# index ST_i the share it takes part in including all interactions. Both come from the sample matrices
+# of Saltelli: two independent base matrices A and B of n_base rows and, for every parameter, A_B^i, A with
+# column i taken from B. A and B are the two halves of one 2d dimensional sample (Sobol points by default).
+# The estimators of Saltelli et al. (2010) and Jansen
+#     S_i = mean(f(B) (f(A_B^i) - f(A))) / V,  ST_i = mean((f(A) - f(A_B^i))^2) / (2 V)
+# share the runs of A and B between all parameters, n_base (d + 2) runs in all, evaluated as ensembles of
+# chunk_size members (bioheat.uq) at one shared time step. The confidence intervals are percentiles of the
+# indices over bootstrap resamples of the rows, which reuse the same runs.
+#
+# Outputs of every run: 'temperature' and 'peak_temperature' at the probes, and with damage the Arrhenius
+# 'omega' at the probes and the 'damaged_fraction' of the grid, the mean of 1 - exp(-omega).
+
+GLOBAL_PARAMETERS = ('rho', 'c', 'k', 'k_star', 'h', 'wb', 'Qm0', 'tau_q', 'tau_T', 'tau_v')
+
+@dataclass
+class SobolIndices:
+    parameters: tuple
+    first_order: dict  # {output: array of shape (parameters,) + output shape}
+    total: dict
+    first_order_interval: dict  # {output: array of shape (2, parameters) + output shape}, lower and upper bound
+    total_interval: dict
+    confidence: float
+    n_base: int
+    n_runs: int
+    dt: float
+    probes: list
+
+    # Parameters by decreasing total index of one element of an output, with the index
+    def ranking(self, output, index=0):
+        total = self.total[output].reshape(len(self.parameters), -1)[:, index]
+        order = np.argsort(-total)
+        return [(self.parameters[i], float(total[i])) for i in order]
+
+# Uniform distributions within value * (1 - spread) .. value * (1 + spread) of the parameters
+def uniform_ranges(params=None, parameters=GLOBAL_PARAMETERS, spread=0.2):
+    params = params if params is not None else Params()
+    return {name: Uniform(getattr(params, name) * (1 - spread), getattr(params, name) * (1 + spread)) for name in parameters}
+
+# Parameter values of the rows of A, B and A_B^1 .. A_B^d, {name: array of n_base (d + 2) values}
+def saltelli_samples(distributions, n_base, method='sobol', seed=0):
+    d = len(distributions)
+    u = unit_samples(n_base, 2 * d, method, seed)
+    A, B = u[:, :d], u[:, d:]
+    blocks = [A, B]
+    for i in range(d):
+        AB = A.copy()
+        AB[:, i] = B[:, i]
+        blocks.append(AB)
+    return transform(distributions, np.concatenate(blocks))
+
+# First order and total indices from the outputs Y of shape (d + 2, n_base, outputs), the blocks A, B, A_B^1 ..
+# of saltelli_samples. rows selects the rows of every block, an array of shape (resamples, n_base) gives
+# the indices of every resample, shape (parameters, resamples, outputs).
+def saltelli_estimates(Y, rows=slice(None)):
+    Y_A = Y[0][rows]
+    Y_B = Y[1][rows]
+    variance = np.var(np.concatenate([Y_A, Y_B], axis=-2), axis=-2)
+    first = np.empty((Y.shape[0] - 2,) + variance.shape)
+    total = np.empty_like(first)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(first.shape[0]):
+            difference = Y[2 + i][rows] - Y_A
+            first[i] = np.mean(Y_B * difference, axis=-2) / variance
+            total[i] = 0.5 * np.mean(difference ** 2, axis=-2) / variance
+    return first, total
+
+# Outcomes of the runs of the samples, {output: array of shape (runs,) + output shape}, in chunks of chunk_size members
+def ensemble_outcomes(params, samples, grid, scenario, dt_run, steps, wall_steps, probes, chunk_size, damage):
+    n_runs = len(next(iter(samples.values())))
+    rows, columns = np.array(probes).reshape(-1, 2).T
+    outputs = {'temperature': np.empty((n_runs, len(probes))), 'peak_temperature': np.empty((n_runs, len(probes)))}
+    if damage is not None:
+        outputs['omega'] = np.empty((n_runs, len(probes)))
+        outputs['damaged_fraction'] = np.empty(n_runs)
+
+    for start in range(0, n_runs, chunk_size):
+        stop = min(start + chunk_size, n_runs)
+        peak = np.full((stop - start, len(probes)), -np.inf)
+        chunk_damage = None
+        if damage is not None:
+            chunk_damage = ThermalDamage((stop - start,) + grid.shape, A=damage.A, Ea=damage.Ea)
+
+        def observe(t, X):
+            np.maximum(peak, X[:, rows, columns], out=peak)
+            if chunk_damage is not None:
+                chunk_damage.update(X, dt_run)
+        X = run_ensemble(batch_params(params, samples, start, stop), stop - start, grid, scenario, dt_run, steps, wall_steps,
+                         observe)
+
+        outputs['temperature'][start:stop] = X[:, rows, columns]
+        outputs['peak_temperature'][start:stop] = peak
+        if chunk_damage is not None:
+            outputs['omega'][start:stop] = chunk_damage.omega[:, rows, columns]
+            outputs['damaged_fraction'][start:stop] = chunk_damage.damaged_fraction().mean(axis=(1, 2))
+    return outputs
+
+# First order and total Sobol indices of the outcomes for the distributions ({Params field: distribution}),
+# from n_base (d + 2) runs, a power of two keeps the balance of the Sobol points. damage is a ThermalDamage
+# whose A and Ea are used, True for the defaults of ThermalDamage and None leaves out the damage outputs.
+def sobol_indices(distributions, n_base=1024, params=None, grid=None, scenario=None, method='sobol', seed=0,
+                  chunk_size=256, probes=None, damage=True, n_bootstrap=200, confidence=0.95, dt_mode='check',
+                  boundary_check=True):
+    params = params if params is not None else Params()
+    grid = grid if grid is not None else Grid()
+    scenario = scenario if scenario is not None else Scenario()
+    probes = list(probes) if probes is not None else [grid.center]
+    if damage is True:
+        damage = ThermalDamage(())
+
+    parameters = tuple(distributions)
+    d = len(parameters)
+    samples = saltelli_samples(distributions, n_base, method, seed)
+    n_runs = n_base * (d + 2)
+
+    dt_run, steps, wall_steps = ensemble_time_stepping(params, samples, grid, scenario, dt_mode, boundary_check)
+    outputs = ensemble_outcomes(params, samples, grid, scenario, dt_run, steps, wall_steps, probes, chunk_size, damage)
+
+    rng = np.random.default_rng(seed)
+    resamples = rng.integers(0, n_base, (n_bootstrap, n_base))
+    tail = 100 * (1 - confidence) / 2
+    first_order, total, first_order_interval, total_interval = {}, {}, {}, {}
+    for name, values in outputs.items():
+        shape = values.shape[1:]
+        Y = values.reshape(d + 2, n_base, -1)
+        first, tot = saltelli_estimates(Y)
+        first_order[name] = first.reshape((d,) + shape)
+        total[name] = tot.reshape((d,) + shape)
+
+        # Bootstrap over the rows, the same resample for A, B and every A_B^i
+        first_boot, total_boot = saltelli_estimates(Y, resamples)
+        first_order_interval[name] = np.nanpercentile(first_boot, [tail, 100 - tail], axis=1).reshape((2, d) + shape)
+        total_interval[name] = np.nanpercentile(total_boot, [tail, 100 - tail], axis=1).reshape((2, d) + shape)
+
+    return SobolIndices(parameters=parameters, first_order=first_order, total=total,
+                        first_order_interval=first_order_interval, total_interval=total_interval, confidence=confidence,
+                        n_base=n_base, n_runs=n_runs, dt=dt_run, probes=probes)
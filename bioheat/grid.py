@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# Rectangular patch of tissue discretized with uniform spacing, node 0 and node n-1 on the faces
+@dataclass(frozen=True)
+class Grid:
+    Lx: float = 0.05  # Length of the skin tissue in x direction (m)
+    Ly: float = 0.05  # Length of the skin tissue in y direction (m)
+    dx: float = 0.01  # Space step in x direction (m)
+    dy: float = 0.01  # Space step in y direction (m)
+
+    @property
+    def x(self):
+        return np.arange(0, self.Lx + self.dx, self.dx)
+
+    @property
+    def y(self):
+        return np.arange(0, self.Ly + self.dy, self.dy)
+
+    @property
+    def nx(self):
+        return len(self.x)
+
+    @property
+    def ny(self):
+        return len(self.y)
+
+    @property
+    def shape(self):
+        return (self.nx, self.ny)
+
+    @property
+    def center(self):
+        return (self.nx // 2, self.ny // 2)
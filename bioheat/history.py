@@ -0,0 +1,168 @@
+import json
+import lzma
+import struct
+import zlib
+
+import numpy as np
+
+# Compressed field-history files with keyframes and quantized temporal deltas.
+#
+#     with HistoryWriter('history.bhh', grid.shape, error_bound=1e-3) as history:
+#         Simulation(..., record_every=1, history=history).run()
+#     frames = HistoryReader('history.bhh')
+#     T = frames[120]
+#
+# Every field is quantized on a uniform grid of step 2 * error_bound, so each stored value is within
+# error_bound of the original. Keyframes store the quantized field with its flattened differences,
+# the frames in between store the difference to the previous reconstructed frame (closed loop, the
+# error does not build up). Both are small integers, narrowed to the smallest integer type and
+# compressed with zlib or lzma. A frame is decoded from its keyframe, so random access costs at most
+# keyframe_every block decompressions.
+#
+# File layout: MAGIC, the compressed blocks one after another, a JSON footer with the shape, the
+# settings, the frame times and the offset and type of every block, and the footer length.
+
+MAGIC = b'BHHIST01'
+FOOTER_LENGTH = struct.Struct('<Q')
+
+CODECS = {
+    'zlib': (lambda data, level: zlib.compress(data, level), zlib.decompress),
+    'lzma': (lambda data, level: lzma.compress(data, preset=level), lzma.decompress),
+}
+
+INTEGER_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+# Smallest integer type that holds every value
+def narrowest(values):
+    if values.size == 0:
+        return values.astype(np.int8)
+    low = values.min()
+    high = values.max()
+    for integer_type in INTEGER_TYPES:
+        info = np.iinfo(integer_type)
+        if info.min <= low and high <= info.max:
+            return values.astype(integer_type)
+    return values
+
+class HistoryWriter:
+    def __init__(self, path, shape, error_bound=1e-3, keyframe_every=50, codec='zlib', level=6):
+        if error_bound <= 0:
+            raise ValueError(f'error_bound must be positive, got {error_bound}')
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}', expected one of {tuple(CODECS)}")
+
+        self.path = path
+        self.shape = tuple(shape)
+        self.error_bound = error_bound
+        self.keyframe_every = keyframe_every
+        self.codec = codec
+        self.level = level
+        self.step = 2 * error_bound
+        self.previous = None  # Quantized previous frame, as the reader reconstructs it
+        self.blocks = []
+        self.times = []
+        self.stream = open(path, 'wb')
+        self.stream.write(MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def append(self, T_array, time=None):
+        if T_array.shape != self.shape:
+            raise ValueError(f'Frame shape {T_array.shape} does not match the history shape {self.shape}')
+
+        quantized = np.rint(np.asarray(T_array, np.float64) / self.step).astype(np.int64).reshape(-1)
+        keyframe = len(self.blocks) % self.keyframe_every == 0
+        if keyframe:
+            values = np.diff(quantized, prepend=0)
+        else:
+            values = quantized - self.previous
+        self.previous = quantized
+
+        values = narrowest(values)
+        data = CODECS[self.codec][0](values.tobytes(), self.level)
+        self.blocks.append([self.stream.tell(), len(data), values.dtype.str, keyframe])
+        self.times.append(len(self.times) if time is None else float(time))
+        self.stream.write(data)
+
+    def close(self):
+        if self.stream.closed:
+            return
+        footer = json.dumps({
+            'shape': self.shape,
+            'error_bound': self.error_bound,
+            'keyframe_every': self.keyframe_every,
+            'codec': self.codec,
+            'times': self.times,
+            'blocks': self.blocks,
+        }).encode()
+        self.stream.write(footer)
+        self.stream.write(FOOTER_LENGTH.pack(len(footer)))
+        self.stream.close()
+
+class HistoryReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as stream:
+            if stream.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'{path} is not a field history file')
+            stream.seek(-FOOTER_LENGTH.size, 2)
+            footer_length, = FOOTER_LENGTH.unpack(stream.read(FOOTER_LENGTH.size))
+            stream.seek(-FOOTER_LENGTH.size - footer_length, 2)
+            footer = json.loads(stream.read(footer_length))
+
+        self.shape = tuple(footer['shape'])
+        self.error_bound = footer['error_bound']
+        self.keyframe_every = footer['keyframe_every']
+        self.codec = footer['codec']
+        self.times = np.array(footer['times'])
+        self.blocks = footer['blocks']
+        self.step = 2 * self.error_bound
+        self.cached = (None, None)  # Index and quantized values of the last decoded frame
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __getitem__(self, index):
+        return self.frame(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.frame(index)
+
+    def read_block(self, stream, index):
+        offset, length, dtype, keyframe = self.blocks[index]
+        stream.seek(offset)
+        values = np.frombuffer(CODECS[self.codec][1](stream.read(length)), dtype).astype(np.int64)
+        return values, keyframe
+
+    # Field of frame index, decoded from its keyframe or from the last decoded frame when reading forward
+    def frame(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f'Frame {index} out of range for a history of {len(self)} frames')
+
+        cached_index, quantized = self.cached
+        with open(self.path, 'rb') as stream:
+            if cached_index is None or not cached_index <= index or index - cached_index >= self.keyframe_every:
+                start = index
+                while not self.blocks[start][3]:
+                    start -= 1
+                values, _ = self.read_block(stream, start)
+                quantized = np.cumsum(values)
+                cached_index = start
+
+            for position in range(cached_index + 1, index + 1):
+                values, keyframe = self.read_block(stream, position)
+                quantized = np.cumsum(values) if keyframe else quantized + values
+
+        self.cached = (index, quantized)
+        return (quantized * self.step).reshape(self.shape)
@@ -0,0 +1,237 @@
+import numpy as np
+
+from bioheat.boundaries import BOUNDARY_SET_FUNCTIONS, wall_boundary
+from bioheat.evaporation import evaporation_coefficients
+from bioheat.local_sources import local_source, local_source_coefficients, reaction_rate
+from bioheat.sources import scatter_heat_sources
+from bioheat.vessels import vessel_exchange
+
+# Allocation-free Jacobi stepping of the TPL update, from k_buffered.py.
+#
+# Every array and every view the time loop touches is created once by allocate_workspace. The stencil
+# runs on the flattened field over the rows 1 .. nx-2, where the x neighbours are ny cells away and the
+# y neighbours one cell away, so every operand is a contiguous 1D slice (strided 2D operands make NumPy
+# allocate temporaries). The first and last column of those rows see wrapped neighbours, but every
+# face is rewritten by the boundary set in the same step.
+
+# Named views of one field buffer, faces named as in the boundary comments of k.py
+def buffer_views(T_array):
+    nx, ny = T_array.shape
+    flat = T_array.reshape(-1)
+    start = ny
+    stop = (nx - 1) * ny
+    return {
+        'field': T_array,
+        'center': flat[start:stop],
+        'up': flat[start - ny:stop - ny],
+        'down': flat[start + ny:stop + ny],
+        'left': flat[start - 1:stop - 1],
+        'right': flat[start + 1:stop + 1],
+        'xL': T_array[0, :],  # x = Lx
+        'xL_in': T_array[1, :],
+        'x0': T_array[-1, :],  # x = 0
+        'x0_in': T_array[-2, :],
+        'x0_in2': T_array[-3, :],
+        'y0': T_array[:, 0],  # y = 0
+        'y0_in': T_array[:, 1],
+        'y0_in2': T_array[:, 2],
+        'yL': T_array[:, -1],  # y = Ly
+        'yL_in': T_array[:, -2],
+    }
+
+# Both field buffers, their views and the stencil and boundary scratch buffers
+def allocate_workspace(T_initial):
+    nx, ny = T_initial.shape
+    dtype = T_initial.dtype
+    return {
+        'buffers': [buffer_views(T_initial.copy()), buffer_views(T_initial.copy())],
+        'lap': np.empty((nx - 2) * ny, dtype),
+        'work': np.empty((nx - 2) * ny, dtype),
+        'row': np.empty(ny, dtype),
+        'column': np.empty(nx, dtype),
+    }
+
+# Coefficients of the update and the boundaries, computed once per run. Homogeneous tissue gets scalars,
+# a bioheat.tissue.TissueMap per-neighbour coefficient arrays of the center rows (see advance) and
+# per-face boundary coefficients from the conductivity of the face cells. A bioheat.evaporation.Evaporation
+# adds the coefficients of the sweat cooling on the convective faces, bioheat.local_sources.LocalSources
+# those of the perfusion and metabolism evaluated from the local temperature.
+def step_coefficients(params, grid, dt, tissue=None, evaporation=None, local_sources=None):
+    C = {
+        'lap_coef': dt * params.laplacian_coefficient,
+        'source': dt * params.source_rate,
+        'inv_dx2': 1 / grid.dx ** 2,
+        'inv_dy2': 1 / grid.dy ** 2,
+    }
+    if tissue is not None:
+        C.update(tissue_coefficients(tissue, params, grid, dt))
+
+    h = params.h
+    ku = params.ku
+    k_faces = {}
+    for face in ('xL', 'x0', 'y0', 'yL'):
+        k = params.k if tissue is None else tissue.face('k', face)
+        k_faces[face] = k
+
+        # Robin closure (h d Tl + k T_in) / (h d + k), with dx on every face as in k.py and dy as in main.py
+        C[f'robin_inner_{face}'] = k / (h * grid.dx + k)
+        C[f'robin_outer_{face}'] = h * grid.dx * params.Tl / (h * grid.dx + k)
+        C[f'robin_dy_inner_{face}'] = k / (h * grid.dy + k)
+        C[f'robin_dy_outer_{face}'] = h * grid.dy * params.Tl / (h * grid.dy + k)
+
+        if face == 'x0':
+            C['fourth_x'] = k / ku
+            C['fourth_x_keep'] = 1 - k / ku
+        if face == 'y0':
+            C['fourth_y'] = ku / k
+            C['fourth_y_keep'] = 1 - ku / k
+
+    if evaporation is not None:
+        C.update(evaporation_coefficients(evaporation, params, grid, k_faces))
+
+    if local_sources is not None:
+        if tissue is None:
+            C.update(local_source_coefficients(local_sources, params, dt * params.lag / (params.rho * params.c)))
+        else:
+            C.update(local_source_coefficients(local_sources, params, C['source_scale'],
+                                               center_rows(tissue.wb), center_rows(tissue.Qm0)))
+
+    return C
+
+# Flat center rows of a property field, the cells of the 'center' view of buffer_views
+def center_rows(values):
+    return buffer_views(np.ascontiguousarray(values, np.float64))['center']
+
+# Per-cell form of the TPL update, T_n+1 = T_n + sum over neighbours n of g_n (T_n - T) + source with
+#     g_n = dt * (lag * k_face - tau_T * k_star) / (rho c d^2)
+# where k_face is the harmonic mean of the two cell conductivities, lag = 1 + tau_q + k + k_star * tau_v
+# and source = dt * lag * (Qb + Qm) / (rho c), all over the flat center rows of buffer_views.
+def tissue_coefficients(tissue, params, grid, dt):
+    views = {name: buffer_views(np.ascontiguousarray(getattr(tissue, name), np.float64)) for name in ('k', 'rho', 'c', 'wb', 'Qm0')}
+    k = views['k']['center']
+    heat_capacity = views['rho']['center'] * views['c']['center']
+    lag = 1 + params.tau_q + k + params.k_star * params.tau_v
+    k_star_term = np.full_like(k, params.tau_T * params.k_star)
+
+    # Non-living material (see bioheat.contact) conducts without lags, rho c dT/dt = div(k grad T)
+    if tissue.conduction_only is not None:
+        conduction_only = buffer_views(np.ascontiguousarray(tissue.conduction_only, bool))['center']
+        lag[conduction_only] = 1
+        k_star_term[conduction_only] = 0
+
+    # From eq. 5 and eq. 6 with the local perfusion and metabolism
+    Qm = views['Qm0']['center'] * (1 + (params.Tl - params.T0) / 10)
+    Qb = views['wb']['center'] * params.rho_b * params.cb * (params.Tb - params.Tl)
+
+    source_scale = dt * lag / heat_capacity
+    coefficients = {'source_field': source_scale * (Qb + Qm), 'source_scale': source_scale}
+    for neighbour, spacing in (('down', grid.dx), ('up', grid.dx), ('right', grid.dy), ('left', grid.dy)):
+        k_face = 2 * k * views['k'][neighbour] / (k + views['k'][neighbour])
+        coefficients[f'g_{neighbour}'] = dt * (lag * k_face - k_star_term) / (heat_capacity * spacing ** 2)
+    coefficients['g_center'] = 1 - sum(coefficients[f'g_{neighbour}'] for neighbour in ('down', 'up', 'right', 'left'))
+    return coefficients
+
+# Largest laplacian coefficient of a tissue map: the update is stable while dt * sum(g_n / dt) <= 1 in every cell,
+# expressed as the coefficient of a homogeneous tissue with the same limit for bioheat.stability
+def tissue_laplacian_coefficient(tissue, params, grid):
+    C = tissue_coefficients(tissue, params, grid, 1.0)
+    total = sum(C[f'g_{neighbour}'].reshape(grid.nx - 2, grid.ny)[:, 1:-1] for neighbour in ('down', 'up', 'right', 'left'))
+    return total.max() / (2 / grid.dx ** 2 + 2 / grid.dy ** 2)
+
+# Largest perfusion sink rate of local sources (1/s), see bioheat.local_sources.reaction_rate
+def local_sources_rate(local_sources, params, grid, tissue=None):
+    if tissue is None:
+        return reaction_rate(local_sources, params, params.lag / (params.rho * params.c))
+    scale_per_dt = tissue_coefficients(tissue, params, grid, 1.0)['source_scale']
+    return reaction_rate(local_sources, params, scale_per_dt, center_rows(tissue.wb))
+
+# Field before the first step, with the wall temperature of the scenario on the x = 0 and y = 0 faces
+def initial_field(params, grid, scenario, dtype=np.float64):
+    T_initial = np.full(grid.shape, params.T0, dtype)  # Initialize entire temperature field to T0
+    wall_boundary(buffer_views(T_initial), scenario.initial_wall_temp)
+    return T_initial
+
+# One time step from the views of T into the views of T_new. step is the index of the step, for the
+# schedule of the heat sources of bioheat.sources.
+def advance(workspace, V, V_new, C, scenario, wall_on, step=None):
+    # Constant source of the run, or the one of the current field with local sources
+    source = C['source_field'] if 'source_field' in C else C['source']
+    if 'local_sources' in C:
+        source = local_source(V['center'], C, workspace)
+
+    if 'source_field' in C:
+        advance_tissue(V, V_new, C, workspace['work'], source)
+    else:
+        advance_homogeneous(V, V_new, C, workspace['lap'], workspace['work'], source)
+
+    if 'heat_sources' in C:
+        scatter_heat_sources(V_new['field'], C['heat_sources'], step)
+    if 'vessel_cells' in C:
+        vessel_exchange(V['field'], V_new['field'], C)
+
+    BOUNDARY_SET_FUNCTIONS[scenario.boundary_set](V, V_new, C, scenario, workspace, wall_on)
+
+# Interior update of homogeneous tissue
+def advance_homogeneous(V, V_new, C, lap, work, source):
+    # d2T/dx2
+    np.add(V['down'], V['up'], out=lap)
+    lap -= V['center']
+    lap -= V['center']
+    lap *= C['inv_dx2']
+
+    # d2T/dy2
+    np.add(V['right'], V['left'], out=work)
+    work -= V['center']
+    work -= V['center']
+    work *= C['inv_dy2']
+    lap += work
+
+    # T_n+1 = T_n + dt * (...)
+    lap *= C['lap_coef']
+    lap += source
+    np.add(V['center'], lap, out=V_new['center'])
+
+# Interior update of a tissue map as g_center T + sum of g_n T_n + source, with g_center = 1 - sum of g_n,
+# the same number of array passes as the homogeneous update
+def advance_tissue(V, V_new, C, work, source):
+    center = V_new['center']
+    np.multiply(V['center'], C['g_center'], out=center)
+    center += source
+    for neighbour in ('down', 'up', 'right', 'left'):
+        np.multiply(V[neighbour], C[f'g_{neighbour}'], out=work)
+        center += work
+
+# Step function for bioheat.stability: returns the next field without modifying T_array.
+# The workspace and the coefficients of the last dt are kept, power iteration calls it many times per dt.
+def phase_step(params, grid, scenario, wall_on, tissue=None, local_sources=None):
+    cache = {}
+
+    def step(T_array, dt):
+        if 'workspace' not in cache:
+            cache['workspace'] = allocate_workspace(T_array)
+        if cache.get('dt') != dt:
+            cache['dt'] = dt
+            cache['C'] = step_coefficients(params, grid, dt, tissue, local_sources=local_sources)
+
+        workspace = cache['workspace']
+        V, V_new = workspace['buffers']
+        np.copyto(V['field'], T_array)
+        advance(workspace, V, V_new, cache['C'], scenario, wall_on)
+        return V_new['field'].copy()
+    return step
+
+# div(k grad T) on the center rows into out, with the harmonic mean of the two cell conductivities on
+# every face (exact for the series resistance of two half cells). K holds the flat views of the
+# conductivity field, face and flux are scratch buffers of the center length.
+def flux_divergence(V, K, C, face, flux, out):
+    out.fill(0)
+    for neighbour, inverse_spacing in (('down', 'inv_dx2'), ('up', 'inv_dx2'), ('right', 'inv_dy2'), ('left', 'inv_dy2')):
+        # 2 k_c k_n / (k_c + k_n)
+        np.add(K['center'], K[neighbour], out=face)
+        np.divide(K[neighbour], face, out=face)
+        face *= K['center']
+        face *= 2 * C[inverse_spacing]
+
+        np.subtract(V[neighbour], V['center'], out=flux)
+        flux *= face
+        out += flux
@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# Perfusion and metabolism evaluated from the local temperature instead of the constant Tl.
+#
+#     result = Simulation(params, grid, scenario, local_sources=LocalSources(dilation=0.1, T_shutdown=50)).run()
+#
+# Eq. 5 and eq. 6 of Params use the tissue temperature Tl, so the source is one constant for every cell.
+# Here T of the cell takes its place:
+#     Qm(T) = Qm0 (1 + (T - T0) / 10)
+#     Qb(T) = wb(T) rho_b cb (Tb - T)
+# with the perfusion rising by dilation per °C above T_dilation up to max_dilation times wb
+# (thermoregulation) and dropping to shutdown_fraction of it above T_shutdown (vascular shutdown).
+# Both are whole-array expressions over the center rows, evaluated once per step into a workspace buffer,
+# and only the terms that are switched on are evaluated. Runs without local_sources keep the constant source.
+#
+# The perfusion term is a sink proportional to T, dt * lag * wb rho_b cb / (rho c) per step, which
+# bioheat.stability has to see: reaction_rate gives its largest value for the time step limit.
+
+@dataclass(frozen=True)
+class LocalSources:
+    metabolism: bool = True  # Qm from the local temperature, eq. 5 with Tl otherwise
+    perfusion: bool = True  # Qb from the local temperature, eq. 6 with Tl otherwise
+    dilation: float = 0.0  # Relative perfusion increase per °C above T_dilation (1/°C)
+    T_dilation: float = 37  # Onset of vasodilation (°C)
+    max_dilation: float = 4.0  # Largest perfusion as a multiple of wb
+    T_shutdown: float = None  # Vascular shutdown above this temperature (°C), none if not given
+    shutdown_fraction: float = 0.0  # Perfusion left after shutdown, as a fraction of wb(T)
+
+    # Largest multiple of wb the perfusion can reach
+    @property
+    def max_perfusion_factor(self):
+        return self.max_dilation if self.dilation > 0 else 1.0
+
+# Coefficients of the local sources over the center rows, part of kernel.step_coefficients.
+# Homogeneous tissue gives scalars. With a tissue map, wb and Qm0 are the flat center rows of the
+# map and scale the per-cell dt * lag / (rho c) of kernel.tissue_coefficients.
+def local_source_coefficients(local_sources, params, scale, wb=None, Qm0=None):
+    wb = params.wb if wb is None else wb
+    Qm0 = params.Qm0 if Qm0 is None else Qm0
+    C = {
+        'local_sources': local_sources,
+        'local_scale': scale,
+        'local_wb': wb,
+        'local_Qm0': Qm0,
+        'local_Qm0_slope': 0.1 * Qm0,  # dQm/dT
+        'local_blood_capacity': params.rho_b * params.cb,
+        'local_Tb': params.Tb,
+        'local_T0': params.T0,
+    }
+    if not local_sources.perfusion:
+        C['local_Qb'] = wb * params.rho_b * params.cb * (params.Tb - params.Tl)  # Eq. 6
+    if not local_sources.metabolism:
+        C['local_Qm'] = Qm0 * (1 + (params.Tl - params.T0) / 10)  # Eq. 5
+    return C
+
+# Largest sink rate of the local perfusion (1/s), T loses dt * rate * T per step to the blood.
+# scale_per_dt is the scale of local_source_coefficients for dt = 1.
+def reaction_rate(local_sources, params, scale_per_dt, wb=None):
+    if not local_sources.perfusion:
+        return 0.0
+    wb = params.wb if wb is None else wb
+    return float(np.max(scale_per_dt * wb * local_sources.max_perfusion_factor * params.rho_b * params.cb))
+
+# Scratch buffers of the center length
+def local_source_buffers(length, dtype):
+    return {
+        'source': np.empty(length, dtype),
+        'perfusion': np.empty(length, dtype),
+        'work': np.empty(length, dtype),
+        'shutdown': np.empty(length, bool),
+    }
+
+# dt * lag * (Qb(T) + Qm(T)) / (rho c) of the center temperatures T, returns the buffer holding it
+def local_source(T, C, workspace):
+    if 'local_sources' not in workspace:
+        workspace['local_sources'] = local_source_buffers(T.size, T.dtype)
+    B = workspace['local_sources']
+    S = C['local_sources']
+    source = B['source']
+
+    if S.perfusion:
+        # wb(T) = wb * clip(1 + dilation (T - T_dilation), 1, max_dilation), lowered above T_shutdown
+        perfusion = C['local_wb']
+        if S.dilation > 0 or S.T_shutdown is not None:
+            perfusion = B['perfusion']
+            if S.dilation > 0:
+                np.subtract(T, S.T_dilation, out=perfusion)
+                perfusion *= S.dilation
+                np.clip(perfusion, 0, S.max_dilation - 1, out=perfusion)
+                perfusion += 1
+                perfusion *= C['local_wb']
+            else:
+                np.copyto(perfusion, C['local_wb'])
+            if S.T_shutdown is not None:
+                np.greater(T, S.T_shutdown, out=B['shutdown'])
+                np.multiply(perfusion, S.shutdown_fraction, out=perfusion, where=B['shutdown'])
+
+        # Qb = wb(T) rho_b cb (Tb - T)
+        np.subtract(C['local_Tb'], T, out=source)
+        source *= perfusion
+        source *= C['local_blood_capacity']
+    else:
+        np.copyto(source, C['local_Qb'])
+
+    if S.metabolism:
+        # Qm = Qm0 + Qm0 (T - T0) / 10
+        work = B['work']
+        np.subtract(T, C['local_T0'], out=work)
+        work *= C['local_Qm0_slope']
+        source += work
+        source += C['local_Qm0']
+    else:
+        source += C['local_Qm']
+
+    source *= C['local_scale']
+    return source
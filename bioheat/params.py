@@ -0,0 +1,50 @@
+from dataclasses import dataclass, replace
+
+# Physical parameters of the three-phase lag model, defaults as in main.py and k.py.
+# DOI_1 = 'https://doi.org/10.1016/j.ijthermalsci.2022.108002'
+@dataclass(frozen=True)
+class Params:
+    rho: float = 1000  # Tissue density (kg/m^3)
+    c: float = 4000  # Specific heat of tissue (J/kg°C)
+    k: float = 0.5  # Thermal conductivity of tissue (W/m°C)
+    k_star: float = 0.1  # Additional thermal conductivity term (W/m°C/s)
+    h: float = 4.5  # Heat transfer coefficient for Robin boundary condition (W/m^2°C) - Typical for large blood vessels
+    wb: float = 0.0098  # Blood perfusion rate coefficient (1/s) - Typical for skin tissue
+    rho_b: float = 1056  # Density of blood (kg/m^3)
+    cb: float = 4000  # Specific heat of blood (J/kg°C)
+    Qm0: float = 50.65  # Metabolic heat generation (W/m^3)
+    Tb: float = 37  # Temperature of arterial blood (°C)
+    T0: float = 37  # Initial temperature of the body (°C)
+    Tl: float = 37  # Temperature of Tissue (°C)
+    tau_q: float = 600  # Relaxation time due to heat flux (s)
+    tau_T: float = 300  # Relaxation time due to temperature gradient (s)
+    tau_v: float = 100  # Relaxation time due to thermal displacement (s)
+    ku: float = 0.625  # Thermal conductivity of the second material for the boundary condition of fourth kind (W/m°C)
+
+    # Copy with some fields changed, e.g. params.with_values(k=1.5)
+    def with_values(self, **changes):
+        return replace(self, **changes)
+
+    # From eq. 5
+    @property
+    def Qm(self):
+        return self.Qm0 * (1 + (self.Tl - self.T0) / 10)
+
+    # From eq. 6
+    @property
+    def Qb(self):
+        return self.wb * self.rho_b * self.cb * (self.Tb - self.Tl)
+
+    # Factor of dT/dt in eq. 7, (1 + tau_q + k + k_star * tau_v)
+    @property
+    def lag(self):
+        return 1 + self.tau_q + self.k + self.k_star * self.tau_v
+
+    # Eq. 4 and its k* derivative substituted into eq. 7: T_n+1 = T_n + dt * (laplacian_coefficient * lap(T) + source_rate)
+    @property
+    def laplacian_coefficient(self):
+        return (self.lag * self.k - self.tau_T * self.k_star) / (self.rho * self.c)
+
+    @property
+    def source_rate(self):
+        return self.lag * (self.Qb + self.Qm) / (self.rho * self.c)
@@ -0,0 +1,47 @@
+import numpy as np
+
+# matplotlib is imported inside the functions so that importing bioheat stays headless and fast
+
+# Temperature of the first probe over time for every result, labels default to the conductivity
+def plot_temperature_profiles(results, labels=None, title='Temperature Profile Over Time', path=None, show=False):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for index, result in enumerate(results):
+        label = labels[index] if labels is not None else f'k = {result.params.k} W/m°C'
+        ax.plot(result.time, result.temperature, label=label)
+
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Temperature (°C)')
+    ax.set_title(title)
+    ax.legend()
+    ax.grid(True)
+    finish(fig, path, show)
+    return fig
+
+# Final temperature field of every result as a heatmap, rotated as in k.py
+def plot_heatmaps(results, labels=None, path=None, show=False):
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, len(results), figsize=(6 * len(results), 6), squeeze=False)
+    for index, result in enumerate(results):
+        ax = axes[0, index]
+        label = labels[index] if labels is not None else f'k = {result.params.k}W/m°C'
+        contour = ax.contourf(np.rot90(result.T_final, -1), 100, cmap='hot')
+        fig.colorbar(contour, ax=ax, shrink=0.5)
+        ax.set_aspect('equal', 'box')
+        ax.set_xlabel('Length in cells')
+        ax.set_ylabel('Length in cells')
+        ax.set_title(f'Temperature Distribution ({label})')
+
+    fig.tight_layout()
+    finish(fig, path, show)
+    return fig
+
+def finish(fig, path, show):
+    import matplotlib.pyplot as plt
+
+    if path is not None:
+        fig.savefig(path)
+    if show:
+        plt.show()
@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# Parameter distributions and the unit hypercube samples they are drawn from.
+#
+#     distributions = {'k': Normal(0.5, 0.05), 'wb': Uniform(0.005, 0.015), 'rho_b': Triangular(1005, 1056, 1080)}
+#     samples = draw_samples(distributions, 1024, method='sobol', seed=0)  # {'k': array, ...}
+#
+# Every distribution maps uniform numbers u in (0, 1) to values through its inverse CDF, so the same
+# hypercube samples serve pseudo-random, latin hypercube and quasi-random Sobol draws. The Sobol points
+# use the direction numbers of Joe and Kuo (new-joe-kuo-6.21201) with a random digital shift, which keeps
+# their stratification and makes the draws of different seeds independent.
+
+@dataclass(frozen=True)
+class Uniform:
+    low: float
+    high: float
+
+    def ppf(self, u):
+        return self.low + u * (self.high - self.low)
+
+@dataclass(frozen=True)
+class Normal:
+    mean: float
+    std: float
+
+    def ppf(self, u):
+        return self.mean + self.std * normal_ppf(u)
+
+# exp of a normal, median and sigma of the log
+@dataclass(frozen=True)
+class LogNormal:
+    median: float
+    sigma: float
+
+    def ppf(self, u):
+        return self.median * np.exp(self.sigma * normal_ppf(u))
+
+@dataclass(frozen=True)
+class Triangular:
+    low: float
+    mode: float
+    high: float
+
+    def ppf(self, u):
+        split = (self.mode - self.low) / (self.high - self.low)
+        rising = self.low + np.sqrt(u * (self.high - self.low) * (self.mode - self.low))
+        falling = self.high - np.sqrt((1 - u) * (self.high - self.low) * (self.high - self.mode))
+        return np.where(u < split, rising, falling)
+
+# Inverse of the standard normal CDF, rational approximation of Acklam (relative error below 1.2e-9)
+NORMAL_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02, 1.383577518672690e+02,
+            -3.066479806614716e+01, 2.506628277459239e+00)
+NORMAL_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02, 6.680131188771972e+01,
+            -1.328068155288572e+01)
+NORMAL_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00, -2.549732539343734e+00,
+            4.374664141464968e+00, 2.938163982698783e+00)
+NORMAL_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+
+def normal_ppf(u):
+    u = np.asarray(u, float)
+    a, b, c, d = NORMAL_A, NORMAL_B, NORMAL_C, NORMAL_D
+    tail = np.minimum(u, 1 - u)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Central region
+        q = u - 0.5
+        r = q * q
+        central = ((((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) * q
+                   / (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1))
+
+        # Tails, negative below the median
+        s = np.sqrt(-2 * np.log(tail))
+        outer = ((((((c[0] * s + c[1]) * s + c[2]) * s + c[3]) * s + c[4]) * s + c[5])
+                 / ((((d[0] * s + d[1]) * s + d[2]) * s + d[3]) * s + 1))
+        outer = np.where(u < 0.5, outer, -outer)
+    return np.where(tail < 0.02425, outer, central)
+
+# Joe-Kuo direction numbers of dimensions 2 and up: (degree s, coefficient a, initial numbers m)
+SOBOL_DIRECTIONS = [
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+    (6, 19, (1, 1, 1, 15, 7, 5)),
+    (6, 22, (1, 3, 1, 15, 13, 25)),
+    (6, 25, (1, 1, 5, 5, 19, 61)),
+    (7, 1, (1, 3, 7, 11, 23, 15, 103)),
+    (7, 4, (1, 3, 7, 13, 13, 15, 69)),
+]
+SOBOL_BITS = 32
+
+# Direction integers v_k of every dimension, shape (dimensions, bits)
+def sobol_directions(dimensions):
+    if dimensions > len(SOBOL_DIRECTIONS) + 1:
+        raise ValueError(f'Sobol sequence supports up to {len(SOBOL_DIRECTIONS) + 1} dimensions, got {dimensions}')
+    V = np.zeros((dimensions, SOBOL_BITS), np.uint64)
+    V[0] = [1 << (SOBOL_BITS - 1 - k) for k in range(SOBOL_BITS)]  # van der Corput
+    for dimension, (s, a, m) in enumerate(SOBOL_DIRECTIONS[:dimensions - 1], start=1):
+        v = [m[k] << (SOBOL_BITS - 1 - k) for k in range(s)]
+        for k in range(s, SOBOL_BITS):
+            value = v[k - s] ^ (v[k - s] >> s)
+            for j in range(1, s):
+                if (a >> (s - 1 - j)) & 1:
+                    value ^= v[k - j]
+            v.append(value)
+        V[dimension] = v
+    return V
+
+# Points start .. start + n - 1 of the Sobol sequence in [0, 1)^dimensions, shifted by the digital shift of seed
+def sobol_points(n, dimensions, start=0, seed=None):
+    V = sobol_directions(dimensions)
+    index = np.arange(start, start + n, dtype=np.uint64)
+    points = np.zeros((n, dimensions), np.uint64)
+    for bit in range(SOBOL_BITS):
+        set_bit = ((index >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        points[set_bit] ^= V[:, bit]
+    if seed is not None:
+        points ^= np.random.default_rng(seed).integers(0, 1 << SOBOL_BITS, dimensions, dtype=np.uint64)
+    return (points.astype(np.float64) + 0.5) / 2.0 ** SOBOL_BITS
+
+# Unit hypercube samples, shape (n, dimensions). method is 'random', 'latin_hypercube' or 'sobol',
+# Sobol sets of 2^m points keep the balance of the sequence.
+def unit_samples(n, dimensions, method='sobol', seed=0):
+    if method == 'random':
+        return np.random.default_rng(seed).random((n, dimensions))
+    if method == 'latin_hypercube':
+        rng = np.random.default_rng(seed)
+        return np.column_stack([(rng.permutation(n) + rng.random(n)) / n for _ in range(dimensions)])
+    if method == 'sobol':
+        return sobol_points(n, dimensions, seed=seed)
+    raise ValueError(f"Unknown sampling method '{method}', expected 'random', 'latin_hypercube' or 'sobol'")
+
+# Values of every parameter for the unit samples u, column j of u drawn from the j-th distribution
+def transform(distributions, u):
+    return {name: np.asarray(distribution.ppf(u[:, column]), float) for column, (name, distribution) in enumerate(distributions.items())}
+
+# Values of every parameter for n samples, {name: array of n values}
+def draw_samples(distributions, n, method='sobol', seed=0):
+    return transform(distributions, unit_samples(n, len(distributions), method, seed))
@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+
+# Boundary sets
+# 'wall': the heated wall of k.py, a fixed temperature on the x = 0 and y = 0 faces for the first
+#     wall_temp_duration steps, convection on x = Lx and y = Ly and afterwards the fourth kind
+#     condition (or the third kind one once the wall is removed) on x = 0 and y = 0.
+# 'neumann_robin': main.py, zero flux on the x faces and Robin on the y faces, evaluated from the
+#     previous field, with the wall temperature only as initial value.
+BOUNDARY_SETS = ('wall', 'neumann_robin')
+
+# Boundary conditions, heating schedule and time stepping of one run, defaults as in k.py
+@dataclass(frozen=True)
+class Scenario:
+    Tw: float = 100  # Fixed temperature at left and bottom boundary (°C)
+    Tw0: float = 37  # Wall temperature when the wall is never switched on (°C)
+    ambient_temp: float = 37  # Ambient temperature of space without initialized wall temp (°C)
+    wall_temp_duration: int = 50  # Number of Wall Temperature 'ON' time steps
+    remove_wall_after: bool = False  # Remove Wall if True, disables fourth boundry condition on boundry border
+    fourth_boundary_on: bool = True
+    time_steps: int = 100  # Number of time steps
+    dt: float = 0.1  # Time step (s)
+    boundary_set: str = 'wall'
+
+    def __post_init__(self):
+        if self.boundary_set not in BOUNDARY_SETS:
+            raise ValueError(f"Unknown boundary_set '{self.boundary_set}', expected one of {BOUNDARY_SETS}")
+
+    # The wall is never removed when it stays on for the whole run
+    @property
+    def removes_wall(self):
+        return self.remove_wall_after and self.wall_temp_duration != self.time_steps
+
+    # Temperature written on the wall faces before the first step
+    @property
+    def initial_wall_temp(self):
+        if self.wall_temp_duration > 0:
+            return self.Tw
+        if self.remove_wall_after:
+            return self.ambient_temp
+        return self.Tw0
@@ -0,0 +1,210 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from bioheat.kernel import initial_field, step_coefficients
+from bioheat.simulation import Simulation
+
+# Tangent-linear (forward mode) sensitivities of the run to the parameters of Params.
+#
+#     result = sensitivity_run(params, grid, scenario, parameters=('k', 'wb', 'tau_q', 'tau_T', 'tau_v'))
+#     result.sensitivities[:, 0, 0]  # dT/dk at the first probe after every step
+#
+# Every coefficient of the step (kernel.step_coefficients) is a function of the parameters, so the
+# derivative S_p = dT/dp of the field follows the step with the same linear part plus the derivative of
+# the coefficients applied to T:
+#     S_n+1 = S_n + lap_coef * lap(S_n) + (d lap_coef / dp) * lap(T_n) + d source / dp
+# and likewise through every affine boundary closure, the fixed wall temperature has zero derivative.
+# T and its sensitivities are stored as the members of one batch X[member, x, y], member 0 being T, and
+# advance together through one vectorized stencil, so a run costs about one batched step per time step
+# instead of two runs per parameter for central differences. The coefficient derivatives come from complex
+# step differentiation of step_coefficients, exact to rounding for every field of Params. dt is held at the
+# value of the nominal parameters. Homogeneous tissue with the boundary sets of bioheat.boundaries.
+
+SENSITIVITY_PARAMETERS = ('k', 'wb', 'tau_q', 'tau_T', 'tau_v')
+
+@dataclass
+class SensitivityResult:
+    time: np.ndarray  # Time after every step (s)
+    probe_temps: np.ndarray  # Temperature at every probe, shape (steps, probes) (°C)
+    sensitivities: np.ndarray  # dT/dp at every probe, shape (steps, probes, parameters) (°C per unit of p)
+    parameters: tuple
+    values: np.ndarray  # Nominal value of every parameter
+    T_final: np.ndarray  # Temperature field after the last step (°C)
+    S_final: np.ndarray  # dT/dp fields after the last step, shape (parameters, nx, ny)
+    dt: float
+    probes: list
+
+    # p dT/dp, the change of the probe temperatures for a relative change of every parameter (°C)
+    @property
+    def scaled_sensitivities(self):
+        return self.sensitivities * self.values
+
+# Derivative of every coefficient of step_coefficients with respect to every parameter, arrays of shape (parameters,)
+def coefficient_derivatives(params, grid, dt, parameters):
+    C = step_coefficients(params, grid, dt)
+    dC = {key: np.empty(len(parameters)) for key in C}
+    for index, name in enumerate(parameters):
+        value = getattr(params, name)
+        step = 1e-20 * max(abs(value), 1)
+        perturbed = step_coefficients(params.with_values(**{name: value + 1j * step}), grid, dt)
+        for key in C:
+            dC[key][index] = np.imag(perturbed[key]) / step
+    return C, dC
+
+# Initial field and its derivatives as one batch, T0 is the only parameter the initial field depends on
+def initial_batch(params, grid, scenario, parameters):
+    X = np.empty((1 + len(parameters),) + grid.shape)
+    X[0] = initial_field(params, grid, scenario)
+    for index, name in enumerate(parameters):
+        value = getattr(params, name)
+        step = 1e-20 * max(abs(value), 1)
+        X[1 + index] = np.imag(initial_field(params.with_values(**{name: value + 1j * step}), grid, scenario, complex)) / step
+    return X
+
+# Named views of a batch, the buffer_views of kernel with the member axis in front
+def batch_views(X):
+    members, nx, ny = X.shape
+    flat = X.reshape(members, -1)
+    start = ny
+    stop = (nx - 1) * ny
+    return {
+        'field': X,
+        'center': flat[:, start:stop],
+        'up': flat[:, start - ny:stop - ny],
+        'down': flat[:, start + ny:stop + ny],
+        'left': flat[:, start - 1:stop - 1],
+        'right': flat[:, start + 1:stop + 1],
+        'xL': X[:, 0, :],
+        'xL_in': X[:, 1, :],
+        'x0': X[:, -1, :],
+        'x0_in': X[:, -2, :],
+        'x0_in2': X[:, -3, :],
+        'y0': X[:, :, 0],
+        'y0_in': X[:, :, 1],
+        'y0_in2': X[:, :, 2],
+        'yL': X[:, :, -1],
+        'yL_in': X[:, :, -2],
+    }
+
+# Both batch buffers and the scratch buffers of the batched step
+def allocate_batch_workspace(X_initial):
+    members, nx, ny = X_initial.shape
+    return {
+        'buffers': [batch_views(X_initial.copy()), batch_views(X_initial.copy())],
+        'lap': np.empty((members, (nx - 2) * ny)),
+        'work': np.empty((members, (nx - 2) * ny)),
+        'row': np.empty((members, ny)),
+        'column': np.empty((members, nx)),
+    }
+
+# out = sum of C[key] * input + C[constant] for T, and its derivative
+# sum of C[key] * S_input + dC[key] * T_input + dC[constant] for the sensitivities
+def affine_closure(out, terms, constant, C, dC, work):
+    for index, (values, key) in enumerate(terms):
+        if index == 0:
+            np.multiply(values, C[key], out=out)
+        else:
+            np.multiply(values, C[key], out=work)
+            out += work
+    for values, key in terms:
+        np.multiply(values[0], dC[key][:, None], out=work[1:])
+        out[1:] += work[1:]
+    if constant is not None:
+        out[0] += C[constant]
+        out[1:] += dC[constant][:, None]
+
+# Boundry between wall and tissue, the wall temperature does not depend on the parameters
+def batch_wall_boundary(X, wall_temp):
+    for face in ('x0', 'y0'):
+        X[face][0].fill(wall_temp)
+        X[face][1:].fill(0)
+
+def batch_symmetric_boundary(X):
+    for face in ('xL', 'x0', 'y0', 'yL'):
+        np.copyto(X[face], X[f'{face}_in'])
+
+# Boundary set 'wall' of boundaries.wall_boundary_set on the batch
+def batch_wall_boundary_set(X, X_new, C, dC, scenario, workspace, wall_on):
+    row = workspace['row']
+    column = workspace['column']
+    if wall_on:
+        batch_wall_boundary(X_new, scenario.Tw)
+    batch_symmetric_boundary(X_new)
+    if wall_on:
+        batch_wall_boundary(X_new, scenario.Tw)
+
+    affine_closure(X_new['xL'], [(X_new['xL_in'], 'robin_inner_xL')], 'robin_outer_xL', C, dC, row)
+    affine_closure(X_new['yL'], [(X_new['yL_in'], 'robin_inner_yL')], 'robin_outer_yL', C, dC, column)
+
+    if not wall_on and scenario.removes_wall:
+        affine_closure(X_new['x0'], [(X_new['x0_in'], 'robin_inner_x0')], 'robin_outer_x0', C, dC, row)
+        affine_closure(X_new['y0'], [(X_new['y0_in'], 'robin_inner_y0')], 'robin_outer_y0', C, dC, column)
+    elif scenario.fourth_boundary_on:
+        affine_closure(X_new['x0'], [(X_new['x0_in'], 'fourth_x_keep'), (X_new['x0_in2'], 'fourth_x')], None, C, dC, row)
+        affine_closure(X_new['y0'], [(X_new['y0_in'], 'fourth_y_keep'), (X_new['y0_in2'], 'fourth_y')], None, C, dC, column)
+
+    if wall_on:
+        batch_wall_boundary(X_new, scenario.Tw)
+
+# Boundary set 'neumann_robin' of boundaries.neumann_robin_boundary_set on the batch
+def batch_neumann_robin_boundary_set(X, X_new, C, dC, scenario, workspace, wall_on):
+    np.copyto(X_new['xL'], X['xL_in'])
+    np.copyto(X_new['x0'], X['x0_in'])
+    affine_closure(X_new['yL'], [(X['yL_in'], 'robin_dy_inner_yL')], 'robin_dy_outer_yL', C, dC, workspace['column'])
+    affine_closure(X_new['y0'], [(X['y0_in'], 'robin_dy_inner_y0')], 'robin_dy_outer_y0', C, dC, workspace['column'])
+
+BATCH_BOUNDARY_SET_FUNCTIONS = {
+    'wall': batch_wall_boundary_set,
+    'neumann_robin': batch_neumann_robin_boundary_set,
+}
+
+# One time step of T and its sensitivities from the views of X into the views of X_new
+def advance_batch(workspace, X, X_new, C, dC, scenario, wall_on):
+    lap = workspace['lap']
+    work = workspace['work']
+
+    # lap(X) of every member
+    np.add(X['down'], X['up'], out=lap)
+    lap -= X['center']
+    lap -= X['center']
+    lap *= C['inv_dx2']
+    np.add(X['right'], X['left'], out=work)
+    work -= X['center']
+    work -= X['center']
+    work *= C['inv_dy2']
+    lap += work
+
+    # (d lap_coef / dp) * lap(T) before lap is scaled
+    np.multiply(lap[0], dC['lap_coef'][:, None], out=work[1:])
+    lap *= C['lap_coef']
+    lap[1:] += work[1:]
+    lap[0] += C['source']
+    lap[1:] += dC['source'][:, None]
+    np.add(X['center'], lap, out=X_new['center'])
+
+    BATCH_BOUNDARY_SET_FUNCTIONS[scenario.boundary_set](X, X_new, C, dC, scenario, workspace, wall_on)
+
+# Run of T and dT/dp for the parameters, at the time step Simulation chooses for the nominal parameters
+def sensitivity_run(params, grid, scenario, parameters=SENSITIVITY_PARAMETERS, probes=None, dt_mode='check',
+                    boundary_check=True):
+    parameters = tuple(parameters)
+    simulation = Simulation(params, grid, scenario, dt_mode=dt_mode, probes=probes, boundary_check=boundary_check)
+    dt_run, steps, wall_steps = simulation.time_stepping()
+    C, dC = coefficient_derivatives(params, grid, dt_run, parameters)
+
+    workspace = allocate_batch_workspace(initial_batch(params, grid, scenario, parameters))
+    X, X_new = workspace['buffers']
+    rows, columns = np.array(simulation.probes).reshape(-1, 2).T
+    probe_temps = np.empty((steps, len(simulation.probes)))
+    sensitivities = np.empty((steps, len(simulation.probes), len(parameters)))
+
+    for t in range(steps):
+        advance_batch(workspace, X, X_new, C, dC, scenario, t < wall_steps)
+        X, X_new = X_new, X
+        probe_temps[t] = X['field'][0, rows, columns]
+        sensitivities[t] = X['field'][1:, rows, columns].T
+
+    return SensitivityResult(time=np.arange(1, steps + 1) * dt_run, probe_temps=probe_temps, sensitivities=sensitivities,
+                             parameters=parameters, values=np.array([getattr(params, name) for name in parameters], float),
+                             T_final=X['field'][0].copy(), S_final=X['field'][1:].copy(), dt=dt_run, probes=simulation.probes)
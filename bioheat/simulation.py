@@ -0,0 +1,188 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from bioheat.contact import conjugate_scenario, conjugate_setup
+from bioheat.enthalpy import advance_enthalpy, allocate_enthalpy_workspace, liquid_fraction, phase_constants
+from bioheat.grid import Grid
+from bioheat.kernel import (advance, allocate_workspace, initial_field, local_sources_rate, phase_step,
+                            step_coefficients, tissue_laplacian_coefficient)
+from bioheat.params import Params
+from bioheat.scenario import Scenario
+from bioheat.sources import heat_source_coefficients
+from bioheat.stability import resolve_dt
+from bioheat.vessels import vessel_coefficients, vessel_rate
+
+# Output of Simulation.run()
+@dataclass
+class Result:
+    time: np.ndarray  # Time after every step (s)
+    probe_temps: np.ndarray  # Temperature at every probe after every step, shape (steps, probes) (°C)
+    T_final: np.ndarray  # Temperature field after the last step (°C)
+    dt: float  # Time step the run used (s)
+    probes: list  # (i, j) cell of every probe column of probe_temps
+    frames: np.ndarray = None  # Recorded fields, shape (frames, nx, ny) (°C), None unless record_every > 0 without a history
+    frame_times: np.ndarray = None  # Time of every recorded field (s)
+    damage: object = None  # bioheat.damage.ThermalDamage accumulated during the run, if one was given
+    liquid_fraction: np.ndarray = None  # Unfrozen fraction of every cell after the last step, phase change runs only
+    T_conjugate: np.ndarray = None  # Field of tissue and contact material after the last step, contact runs only (°C)
+    params: Params = field(default=None, repr=False)
+    grid: Grid = field(default=None, repr=False)
+    scenario: Scenario = field(default=None, repr=False)
+
+    # Temperature history of the first probe, the tissue center by default
+    @property
+    def temperature(self):
+        return self.probe_temps[:, 0]
+
+# One configuration of the 2D TPL model.
+# dt_mode is passed to bioheat.stability.resolve_dt: 'check' raises on an unstable scenario.dt,
+# 'scale' shrinks it to the stable limit and 'max' runs at the limit. The limit includes the
+# boundary closures of both wall phases unless boundary_check is False. A changed time step
+# keeps the simulated time, time_steps and wall_temp_duration are rescaled as in k.py.
+# Every record_every steps the field is stored in Result.frames, or appended to history
+# (e.g. a bioheat.history.HistoryWriter) instead of being kept in memory when one is given.
+# damage (a bioheat.damage.ThermalDamage) is updated with the field after every step.
+# phase_change (a bioheat.enthalpy.PhaseChange) switches to the enthalpy formulation with freezing,
+# tissue (a bioheat.tissue.TissueMap) replaces the scalar tissue properties of params by per-cell ones
+# and contact (a bioheat.contact.ContactBlock) meshes the contact material behind the wall faces. The
+# solver then runs on the extended solver_grid, probes, frames, damage and T_final stay on the tissue.
+# evaporation (a bioheat.evaporation.Evaporation) adds sweat cooling to the convective faces of the
+# 'wall' boundary set and is refused with the other sets, the stability check leaves it out (it only removes heat).
+# local_sources (a bioheat.local_sources.LocalSources) evaluates perfusion and metabolism from the local
+# temperature every step, the perfusion sink then enters the stable time step.
+# heat_sources is a list of volumetric sources of bioheat.sources (laser, RF, ultrasound), positioned on the tissue.
+# vessels (a bioheat.vessels.VesselNetwork) couples large vessels to the cells they cross, their exchange
+# enters the stable time step.
+class Simulation:
+    def __init__(self, params=None, grid=None, scenario=None, dt_mode='check', dtype=np.float64,
+                 probes=None, record_every=0, boundary_check=True, history=None, damage=None, phase_change=None,
+                 tissue=None, contact=None, evaporation=None, local_sources=None, heat_sources=None, vessels=None):
+        self.params = params if params is not None else Params()
+        self.grid = grid if grid is not None else Grid()
+        self.scenario = scenario if scenario is not None else Scenario()
+        self.dt_mode = dt_mode
+        self.dtype = np.dtype(dtype)
+        self.probes = list(probes) if probes is not None else [self.grid.center]
+        self.record_every = record_every
+        self.boundary_check = boundary_check
+        self.history = history
+        self.damage = damage
+        self.phase_change = phase_change
+        self.tissue = tissue
+        self.contact = contact
+        self.evaporation = evaporation
+        self.local_sources = local_sources
+        self.heat_sources = list(heat_sources) if heat_sources is not None else []
+        self.vessels = vessels
+        if phase_change is not None and (tissue is not None or contact is not None):
+            raise ValueError('phase_change uses the properties of params and cannot be combined with a tissue map or contact block')
+        if phase_change is not None and (local_sources is not None or heat_sources or vessels is not None):
+            raise ValueError('phase_change scales the constant sources by the liquid fraction and cannot be combined with '
+                             'local_sources, heat_sources or vessels')
+        if evaporation is not None and self.scenario.boundary_set != 'wall':
+            raise ValueError(f"evaporation cools the convective faces of the 'wall' boundary set, boundary set "
+                             f"'{self.scenario.boundary_set}' has none")
+
+        self.solver_grid = self.grid
+        self.solver_tissue = tissue
+        self.solver_scenario = self.scenario
+        self.region = (slice(None), slice(None))  # Tissue part of the solver field
+        if contact is not None:
+            setup = conjugate_setup(self.params, self.grid, contact, tissue)
+            self.solver_grid = setup.grid
+            self.solver_tissue = setup.tissue
+            self.solver_scenario = conjugate_scenario(self.scenario)
+            self.region = (setup.rows, setup.columns)
+        self.offset = (self.region[0].start or 0, self.region[1].start or 0)  # Tissue cell (0, 0) in the solver field
+
+    # Stable time step, number of steps and number of wall steps of the run
+    def time_stepping(self):
+        scenario = self.solver_scenario
+        grid = self.solver_grid
+        tissue = self.solver_tissue
+        T_initial = initial_field(self.params, grid, scenario)
+        wall_phases = [False]
+        if scenario.boundary_set == 'wall' and scenario.wall_temp_duration > 0:
+            wall_phases.append(True)
+
+        # With phase change the most diffusive phase sets the limit, the boundaries are checked unfrozen
+        coefficient = self.params.laplacian_coefficient
+        if self.phase_change is not None:
+            coefficient = self.phase_change.laplacian_coefficient(self.params)
+        if tissue is not None:
+            coefficient = tissue_laplacian_coefficient(tissue, self.params, grid)
+
+        # The perfusion sink r adds to the highest mode, 2 / (coefficient * lambda_max + r) is the limit of
+        # a laplacian coefficient larger by r / lambda_max. The vessel exchange is bounded the same way.
+        if self.local_sources is not None:
+            lambda_max = 4 / grid.dx ** 2 + 4 / grid.dy ** 2
+            coefficient += local_sources_rate(self.local_sources, self.params, grid, tissue) / lambda_max
+        if self.vessels is not None:
+            lambda_max = 4 / grid.dx ** 2 + 4 / grid.dy ** 2
+            coefficient += vessel_rate(self.vessels, self.params, self.grid, tissue, self.offset, grid.shape) / lambda_max
+
+        dt_run = min(
+            resolve_dt(scenario.dt, coefficient, (grid.dx, grid.dy), mode=self.dt_mode,
+                       step=phase_step(self.params, grid, scenario, wall_on, tissue, self.local_sources) if self.boundary_check else None,
+                       T_reference=T_initial)
+            for wall_on in wall_phases)
+        steps = int(round(scenario.time_steps * scenario.dt / dt_run))
+        wall_steps = int(round(scenario.wall_temp_duration * scenario.dt / dt_run))
+        return dt_run, steps, wall_steps
+
+    def run(self):
+        dt_run, steps, wall_steps = self.time_stepping()
+        scenario = self.solver_scenario
+        C = step_coefficients(self.params, self.solver_grid, dt_run, self.solver_tissue, self.evaporation, self.local_sources)
+        if self.heat_sources:
+            C.update(heat_source_coefficients(self.heat_sources, self.params, self.grid, dt_run, self.solver_tissue,
+                                              self.offset, self.solver_grid.shape))
+        if self.vessels is not None:
+            C.update(vessel_coefficients(self.vessels, self.params, self.grid, dt_run, self.solver_tissue,
+                                         self.offset, self.solver_grid.shape))
+
+        T_initial = initial_field(self.params, self.solver_grid, scenario, self.dtype)
+        if self.phase_change is None:
+            workspace = allocate_workspace(T_initial)
+        else:
+            P = phase_constants(self.params, self.phase_change, dt_run)
+            workspace = allocate_enthalpy_workspace(T_initial, P)
+        V, V_new = workspace['buffers']
+
+        rows, columns = np.array(self.probes).reshape(-1, 2).T
+        rows = rows + self.offset[0]
+        columns = columns + self.offset[1]
+        probe_temps = np.empty((steps, len(self.probes)))
+
+        n_frames = steps // self.record_every if self.record_every > 0 else 0
+        frames = np.empty((n_frames,) + self.grid.shape, self.dtype) if n_frames and self.history is None else None
+
+        for t in range(steps):
+            if self.phase_change is None:
+                advance(workspace, V, V_new, C, scenario, t < wall_steps, t)
+            else:
+                advance_enthalpy(workspace, V, V_new, C, P, scenario, t < wall_steps)
+
+            # Swap the buffers instead of copying
+            V, V_new = V_new, V
+
+            probe_temps[t] = V['field'][rows, columns]
+            if self.damage is not None:
+                self.damage.update(V['field'][self.region], dt_run)
+            if n_frames and (t + 1) % self.record_every == 0:
+                if frames is None:
+                    self.history.append(V['field'][self.region], (t + 1) * dt_run)
+                else:
+                    frames[(t + 1) // self.record_every - 1] = V['field'][self.region]
+
+        fraction = None
+        if self.phase_change is not None:
+            fraction = np.empty_like(T_initial)
+            liquid_fraction(workspace['H'].reshape(T_initial.shape), P, fraction)
+
+        time = np.arange(1, steps + 1) * dt_run
+        return Result(time=time, probe_temps=probe_temps, T_final=V['field'][self.region].copy(), dt=dt_run, probes=self.probes,
+                      frames=frames, frame_times=time[self.record_every - 1::self.record_every] if frames is not None else None,
+                      damage=self.damage, liquid_fraction=fraction,
+                      T_conjugate=V['field'].copy() if self.contact is not None else None, params=self.params, grid=self.grid, scenario=self.scenario)
@@ -0,0 +1,174 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# Volumetric heat sources for laser, RF and ultrasound heating.
+#
+#     sources = [LaserBeam(irradiance=2e4, position=0.025), NeedleTip(Q0=5e6, position=(0.02, 0.025))]
+#     result = Simulation(params, grid, scenario, heat_sources=sources).run()
+#
+# A source deposits Q (W/m^3) and enters the update like the metabolic and perfusion sources of eq. 7,
+# T_n+1 += dt * lag * Q / (rho c). Positions are in metres, x = 0 on the x0 face (row -1) and y = 0 on the
+# y0 face (column 0), see the face names in bioheat.boundaries. Every source is truncated where it falls
+# below cutoff of its peak and kept in the smallest form of its support:
+#     separable sources (laser beam, ultrasound focus) as the block of rows and columns they cover,
+#     radial sources (RF needle tip) as flat cell indices and weights,
+# with the per-cell factor dt * lag / (rho c) folded into the weights once per run. advance adds them to
+# the interior update before the boundary conditions, so a focal source costs a pass over its few cells
+# and nothing over the rest of the grid. Sources are on between start and stop (s).
+
+# Depth and lateral axis of a beam entering through a face, and whether the depth grows with the row or column
+BEAM_FACES = {'xL': (0, True), 'x0': (0, False), 'y0': (1, True), 'yL': (1, False)}
+
+# Gaussian laser beam with Beer-Lambert decay, Q = mu_a I0 exp(-mu_a depth) exp(-2 s^2 / w^2)
+@dataclass(frozen=True)
+class LaserBeam:
+    irradiance: float  # Peak irradiance on the surface, I0 (W/m^2)
+    position: float  # Beam axis along the face (m)
+    absorption: float = 400  # Absorption coefficient, mu_a (1/m)
+    radius: float = 0.002  # 1/e^2 beam radius, w (m)
+    face: str = 'xL'  # Face the beam enters through, the convective surface by default
+    start: float = 0  # Switched on at (s)
+    stop: float = None  # Switched off at (s), stays on if not given
+    cutoff: float = 1e-6  # Truncation relative to the peak
+
+    def profile(self, grid):
+        if self.face not in BEAM_FACES:
+            raise ValueError(f"Unknown face '{self.face}', expected one of {tuple(BEAM_FACES)}")
+        axis, growing = BEAM_FACES[self.face]
+        spacing = (grid.dx, grid.dy)
+        n = grid.shape
+
+        # Beer-Lambert decay along the depth axis
+        n_depth = min(int(-np.log(self.cutoff) / (self.absorption * spacing[axis])) + 1, n[axis])
+        depth = np.arange(n_depth) * spacing[axis]
+        depth_index = np.arange(n_depth) if growing else n[axis] - 1 - np.arange(n_depth)
+        depth_profile = self.absorption * self.irradiance * np.exp(-self.absorption * depth)
+
+        # Gaussian across the beam
+        lateral = 1 - axis
+        half_width = self.radius * np.sqrt(-np.log(self.cutoff) / 2)
+        lateral_index = cells_within(grid, lateral, self.position - half_width, self.position + half_width)
+        s = face_coordinate(grid, lateral, lateral_index) - self.position
+        lateral_profile = np.exp(-2 * s ** 2 / self.radius ** 2)
+
+        if axis == 0:
+            return depth_index, lateral_index, np.outer(depth_profile, lateral_profile)
+        return lateral_index, depth_index, np.outer(lateral_profile, depth_profile)
+
+# Focused ultrasound, Gaussian focus Q = Q0 exp(-(x - x_f)^2 / (2 sx^2) - (y - y_f)^2 / (2 sy^2))
+@dataclass(frozen=True)
+class UltrasoundFocus:
+    Q0: float  # Peak power density at the focus (W/m^3)
+    focus: tuple  # (x, y) of the focus (m)
+    width: tuple = (0.004, 0.001)  # Standard deviation of the focal spot along x and y (m), long along the beam
+    start: float = 0
+    stop: float = None
+    cutoff: float = 1e-6
+
+    def profile(self, grid):
+        extent = np.sqrt(-2 * np.log(self.cutoff))
+        profiles = []
+        for axis in (0, 1):
+            index = cells_within(grid, axis, self.focus[axis] - extent * self.width[axis], self.focus[axis] + extent * self.width[axis])
+            coordinate = face_coordinate(grid, axis, index) - self.focus[axis]
+            profiles.append((index, np.exp(-coordinate ** 2 / (2 * self.width[axis] ** 2))))
+        (rows, row_profile), (columns, column_profile) = profiles
+        return rows, columns, self.Q0 * np.outer(row_profile, column_profile)
+
+# RF needle tip, Q = Q0 (r_tip / max(r, r_tip))^4 from the field of a point electrode, E ~ 1 / r^2
+@dataclass(frozen=True)
+class NeedleTip:
+    Q0: float  # Power density at the tip surface (W/m^3)
+    position: tuple  # (x, y) of the tip (m)
+    tip_radius: float = 0.0005  # (m)
+    start: float = 0
+    stop: float = None
+    cutoff: float = 1e-6
+
+    def profile(self, grid):
+        reach = self.tip_radius * self.cutoff ** -0.25
+        rows = cells_within(grid, 0, self.position[0] - reach, self.position[0] + reach)
+        columns = cells_within(grid, 1, self.position[1] - reach, self.position[1] + reach)
+        dx = face_coordinate(grid, 0, rows)[:, None] - self.position[0]
+        dy = face_coordinate(grid, 1, columns)[None, :] - self.position[1]
+        r = np.sqrt(dx ** 2 + dy ** 2)
+        inside = r <= reach
+        rows, columns = np.broadcast_arrays(rows[:, None], columns[None, :])
+        return rows[inside], columns[inside], self.Q0 * (self.tip_radius / np.maximum(r[inside], self.tip_radius)) ** 4
+
+# Coordinate of the cells along an axis, x runs from row -1 (x = 0) to row 0 (x = Lx)
+def face_coordinate(grid, axis, index):
+    if axis == 0:
+        return (grid.nx - 1 - index) * grid.dx
+    return index * grid.dy
+
+# Indices of the cells with coordinate in [low, high] along an axis, in increasing index order
+def cells_within(grid, axis, low, high):
+    index = np.arange(grid.shape[axis])
+    coordinate = face_coordinate(grid, axis, index)
+    return index[(coordinate >= low - 1e-12) & (coordinate <= high + 1e-12)]
+
+# dt * lag / (rho c) of every cell of the solver field
+def source_scale(params, dt, tissue=None):
+    if tissue is None:
+        return dt * params.lag / (params.rho * params.c)
+    lag = 1 + params.tau_q + tissue.k + params.k_star * params.tau_v
+    if tissue.conduction_only is not None:
+        lag = np.where(tissue.conduction_only, 1.0, lag)
+    return dt * lag / (tissue.rho * tissue.c)
+
+# Scatter terms of the sources, part of the coefficients of a run. Profiles are evaluated on the tissue
+# grid, restricted to its interior cells (the faces are set by the boundary conditions) and shifted by
+# offset, the position of the tissue in the solver field of shape solver_shape (see bioheat.contact).
+def heat_source_coefficients(heat_sources, params, grid, dt, tissue=None, offset=(0, 0), solver_shape=None):
+    solver_shape = grid.shape if solver_shape is None else solver_shape
+    scale = source_scale(params, dt, tissue)
+    terms = []
+    for source in heat_sources:
+        rows, columns, values = source.profile(grid)
+        term = {
+            'start_step': int(round(source.start / dt)),
+            'stop_step': None if source.stop is None else int(round(source.stop / dt)),
+        }
+
+        if values.ndim == 2:
+            # Separable source, block of the rows and columns it covers
+            keep_rows = (rows > 0) & (rows < grid.nx - 1)
+            keep_columns = (columns > 0) & (columns < grid.ny - 1)
+            rows = rows[keep_rows] + offset[0]
+            columns = columns[keep_columns] + offset[1]
+            values = values[np.ix_(keep_rows, keep_columns)]
+            if rows.size == 0 or columns.size == 0:
+                continue
+            block = (slice(rows.min(), rows.max() + 1), slice(columns.min(), columns.max() + 1))
+            weights = np.zeros((block[0].stop - block[0].start, block[1].stop - block[1].start))
+            weights[np.ix_(rows - block[0].start, columns - block[1].start)] = values
+            weights *= scale[block] if np.ndim(scale) else scale
+            term.update(block=block, weights=weights)
+        else:
+            # Radial source, flat indices and weights
+            keep = (rows > 0) & (rows < grid.nx - 1) & (columns > 0) & (columns < grid.ny - 1)
+            rows = rows[keep] + offset[0]
+            columns = columns[keep] + offset[1]
+            if rows.size == 0:
+                continue
+            weights = values[keep] * (scale[rows, columns] if np.ndim(scale) else scale)
+            term.update(index=np.ravel_multi_index((rows, columns), solver_shape), weights=weights,
+                        buffer=np.empty(rows.size))
+        terms.append(term)
+    return {'heat_sources': terms}
+
+# Adds the active sources of a step to the field, step None counts every source as active
+def scatter_heat_sources(T_array, terms, step=None):
+    flat = T_array.reshape(-1)
+    for term in terms:
+        if step is not None and (step < term['start_step'] or (term['stop_step'] is not None and step >= term['stop_step'])):
+            continue
+        if 'block' in term:
+            T_array[term['block']] += term['weights']
+        else:
+            buffer = term['buffer']
+            np.take(flat, term['index'], out=buffer)
+            buffer += term['weights']
+            flat[term['index']] = buffer
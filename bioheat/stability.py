@@ -0,0 +1,140 @@
+import numpy as np
+
+# Stability limits for the explicit TPL update used by the simulation scripts.
+#
+# Substituting eq. 4 and its k* derivative into eq. 7 gives
+#     T_n+1 = T_n + dt * (coefficient * laplacian(T_n) + source)
+# with coefficient = ((1 + tau_q + k + k_star * tau_v) * k - tau_T * k_star) / (rho * c).
+# The source does not depend on T, so stability is decided by the coefficient, the time step
+# and the eigenvalues of the discrete laplacian, which are found from the von Neumann symbol.
+
+# Largest magnitude of the 1D second derivative symbol, per 1 / spacing^2
+laplacian_symbol_max = {2: 4.0, 4: 16.0 / 3.0}
+
+# Coefficient of the laplacian in the explicit TPL update (W/m°C / (J/m^3°C) = m^2/s)
+def laplacian_coefficient(k, k_star, tau_q, tau_T, tau_v, rho, c):
+    lag = 1 + tau_q + k + k_star * tau_v
+    return (lag * k - tau_T * k_star) / (rho * c)
+
+# Symbol of the 1D second derivative stencil at wavenumber theta (radians per cell)
+def second_derivative_symbol(theta, spacing, order=2):
+    if order == 2:
+        return (2 * np.cos(theta) - 2) / spacing ** 2
+    if order == 4:
+        return (-2 * np.cos(2 * theta) + 32 * np.cos(theta) - 30) / (12 * spacing ** 2)
+    raise ValueError(f'Unsupported stencil order {order}, expected 2 or 4')
+
+# Largest |G| over the resolvable wavenumbers for one update with time step dt.
+# update='jacobi' is the update of main.py and the vectorized scripts (all neighbours from T_n).
+# update='sweep' is the in-place loop of k.py, where the i-1 and j-1 neighbours already hold T_n+1.
+def amplification_factor(dt, coefficient, spacings, order=2, update='jacobi', n_modes=65):
+    thetas = np.meshgrid(*[np.linspace(0, np.pi, n_modes)] * len(spacings), indexing='ij')
+
+    if update == 'jacobi':
+        symbol = sum(second_derivative_symbol(theta, spacing, order) for theta, spacing in zip(thetas, spacings))
+        return np.abs(1 + dt * coefficient * symbol).max()
+
+    if update == 'sweep':
+        if order != 2:
+            raise ValueError('The in-place sweep update only uses the three point stencil')
+
+        mu = [dt * coefficient / spacing ** 2 for spacing in spacings]
+        upper = 1 + sum(m * (np.exp(1j * theta) - 2) for m, theta in zip(mu, thetas))
+        lower = 1 - sum(m * np.exp(-1j * theta) for m, theta in zip(mu, thetas))
+
+        # 0 / 0 only occurs for the constant mode, where G = 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.nanmax(np.abs(upper / lower))
+
+    raise ValueError(f"Unknown update '{update}', expected 'jacobi' or 'sweep'")
+
+# Spectral radius of one full update, boundaries included.
+# step(T_array, dt) returns the next field without modifying T_array. The update is affine in T
+# (the sources and fixed wall temperatures only add constants), so the difference of two steps
+# is exactly its linear part. Small grids use the dense operator, larger ones power iteration.
+def step_spectral_radius(step, T_reference, dt, dense_limit=1024, n_iter=500, seed=0):
+    base = step(T_reference, dt)
+
+    if T_reference.size <= dense_limit:
+        operator = np.empty((T_reference.size, T_reference.size))
+        for index in range(T_reference.size):
+            T_probe = T_reference.copy()
+            T_probe.flat[index] += 1
+            operator[:, index] = (step(T_probe, dt) - base).ravel()
+        return np.abs(np.linalg.eigvals(operator)).max()
+
+    direction = np.random.default_rng(seed).standard_normal(T_reference.shape)
+    direction /= np.linalg.norm(direction)
+    radius = 0.0
+    for _ in range(n_iter):
+        image = step(T_reference + direction, dt) - base
+        radius = np.linalg.norm(image)
+        if radius == 0:
+            return 0.0
+        direction = image / radius
+
+    return radius
+
+# Largest dt with |G| <= 1 for every mode. Returns 0 when no positive dt is stable
+# (anti-diffusive coefficient, tau_T * k_star too large) and inf when the coefficient is zero.
+# When a step function is given the limit is tightened until the full update, boundary
+# closures included, has spectral radius <= 1 (the fourth kind closure can amplify on its own).
+def max_stable_dt(coefficient, spacings, order=2, update='jacobi', step=None, T_reference=None):
+    if coefficient < 0:
+        return 0.0
+    if coefficient == 0:
+        return np.inf
+
+    # Jacobi update: the highest mode gives G = 1 - dt * coefficient * lambda_max
+    lambda_max = sum(laplacian_symbol_max[order] / spacing ** 2 for spacing in spacings)
+    dt_limit = 2 / (coefficient * lambda_max)
+
+    # Other updates have no closed form, bisect on the sampled amplification factor
+    if update != 'jacobi':
+        dt_limit = bisect_stable_dt(lambda dt: amplification_factor(dt, coefficient, spacings, order, update), dt_limit)
+
+    if step is not None and step_spectral_radius(step, T_reference, dt_limit) > 1 + 1e-9:
+        dt_limit = bisect_stable_dt(lambda dt: step_spectral_radius(step, T_reference, dt), dt_limit, grow=False)
+
+    return dt_limit
+
+# Largest dt with amplification(dt) <= 1, starting from a guess that is grown (or only shrunk)
+def bisect_stable_dt(amplification, dt_guess, grow=True, n_bisect=50):
+    low = 0.0
+    high = dt_guess
+    while grow and amplification(high) <= 1 + 1e-9:
+        low = high
+        high *= 2
+
+    for _ in range(n_bisect):
+        middle = (low + high) / 2
+        if amplification(middle) <= 1 + 1e-9:
+            low = middle
+        else:
+            high = middle
+
+    return low
+
+# Time step to use for one configuration.
+# mode='check' returns dt unchanged and raises if it is unstable,
+# mode='scale' shrinks an unstable dt to safety * the limit,
+# mode='max' always runs at safety * the limit.
+def resolve_dt(dt, coefficient, spacings, order=2, update='jacobi', mode='check', safety=0.9, step=None, T_reference=None):
+    dt_max = max_stable_dt(coefficient, spacings, order, update, step, T_reference)
+
+    if dt_max == 0:
+        raise ValueError(f'No stable time step: laplacian coefficient {coefficient:.3e} m^2/s is negative '
+                         '(tau_T * k_star outweighs (1 + tau_q + k + k_star * tau_v) * k)')
+
+    if mode == 'check':
+        if dt > dt_max:
+            raise ValueError(f'dt = {dt}s is unstable, the largest stable time step is {dt_max:.4g}s')
+        return dt
+
+    if mode == 'scale':
+        return min(dt, safety * dt_max)
+
+    if mode == 'max':
+        return dt if np.isinf(dt_max) else safety * dt_max
+
+    raise ValueError(f"Unknown mode '{mode}', expected 'check', 'scale' or 'max'")
@@ -0,0 +1,188 @@
+import csv
+import itertools
+import time as timer
+from contextlib import nullcontext
+from dataclasses import dataclass, field, fields, replace
+
+import numpy as np
+
+from bioheat.grid import Grid
+from bioheat.params import Params
+from bioheat.scenario import Scenario
+from bioheat.simulation import Simulation
+from bioheat.stability import max_stable_dt
+
+# Joint parameter sweeps over Params, Grid and Scenario fields.
+#
+#     plan = plan_sweep(values={'k': [0.3, 0.625, 1, 1.5], 'wb': [0.0098, 0.02], 'wall_temp_duration': [50, 100]},
+#                       base_scenario=Scenario(time_steps=200))
+#     table = sweep_table(run_sweep(plan, dt_mode='scale'), path='sweep.csv')
+#
+# values are crossed as a cartesian product, latin_hypercube samples n_samples points from (low, high)
+# ranges and table lists explicit configurations. The three sources are crossed with each other, a
+# source that is not given contributes a single empty configuration.
+
+PARAMETER_FIELDS = {
+    'params': [f.name for f in fields(Params)],
+    'grid': [f.name for f in fields(Grid)],
+    'scenario': [f.name for f in fields(Scenario)],
+}
+
+# Scenario fields that count steps, latin hypercube samples of these are rounded
+INTEGER_FIELDS = ('wall_temp_duration', 'time_steps')
+
+# One planned configuration
+@dataclass
+class Run:
+    values: dict  # Swept values of this configuration
+    params: Params
+    grid: Grid
+    scenario: Scenario
+    cost: float = 0.0  # Estimated work, cells times steps
+    duplicates: list = field(default_factory=list)  # values of dropped configurations that give the same run
+
+# Base objects with the swept values written into the dataclass each one belongs to
+def configure(values, base_params=None, base_grid=None, base_scenario=None):
+    changes = {'params': {}, 'grid': {}, 'scenario': {}}
+    for name, value in values.items():
+        owner = next((owner for owner, names in PARAMETER_FIELDS.items() if name in names), None)
+        if owner is None:
+            raise ValueError(f"Unknown sweep parameter '{name}', expected a field of Params, Grid or Scenario")
+        changes[owner][name] = value
+
+    return (replace(base_params if base_params is not None else Params(), **changes['params']),
+            replace(base_grid if base_grid is not None else Grid(), **changes['grid']),
+            replace(base_scenario if base_scenario is not None else Scenario(), **changes['scenario']))
+
+# n_samples points of a latin hypercube over {name: (low, high)}, one stratum per sample in every dimension
+def latin_hypercube(ranges, n_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    samples = [{} for _ in range(n_samples)]
+    for name, (low, high) in ranges.items():
+        strata = (rng.permutation(n_samples) + rng.random(n_samples)) / n_samples
+        for sample, u in zip(samples, strata):
+            value = low + u * (high - low)
+            sample[name] = int(round(value)) if name in INTEGER_FIELDS else float(value)
+    return samples
+
+def rounded(value):
+    return float(f'{value:.12g}') if isinstance(value, float) else value
+
+# Everything the kernel reads, two configurations with the same key produce the same fields.
+# Fields that cannot affect the run are left out, e.g. wb when Tb == Tl or ku when the
+# fourth kind boundary is never applied.
+def canonical_key(params, grid, scenario):
+    key = [grid.shape, grid.dx, grid.dy, scenario.dt, scenario.time_steps, scenario.boundary_set,
+           scenario.initial_wall_temp, params.T0, params.k,
+           params.laplacian_coefficient, params.source_rate]
+
+    if scenario.boundary_set == 'wall':
+        wall_steps = min(scenario.wall_temp_duration, scenario.time_steps)
+        removes_wall = scenario.removes_wall and wall_steps < scenario.time_steps
+        key += [wall_steps, scenario.Tw if wall_steps > 0 else None, removes_wall]
+        fourth = scenario.fourth_boundary_on and not removes_wall and wall_steps < scenario.time_steps
+    else:
+        fourth = False
+
+    key += [params.h, params.Tl, params.ku if fourth else None]
+    return tuple(rounded(item) for item in key)
+
+# Cells times steps, with the number of steps dt_mode would run
+def estimated_cost(params, grid, scenario, dt_mode='check'):
+    dt_run = scenario.dt
+    if dt_mode != 'check':
+        dt_limit = 0.9 * max_stable_dt(params.laplacian_coefficient, (grid.dx, grid.dy))
+        dt_run = min(dt_run, dt_limit) if dt_mode == 'scale' else dt_limit
+    if not dt_run > 0:
+        return np.inf
+    return grid.nx * grid.ny * scenario.time_steps * scenario.dt / dt_run
+
+# Run plan of the crossed sources without numerically identical configurations, longest runs first
+def plan_sweep(values=None, latin_hypercube_ranges=None, n_samples=0, table=None, seed=0,
+               base_params=None, base_grid=None, base_scenario=None, dt_mode='check'):
+    cartesian = [{}]
+    if values:
+        names = list(values)
+        cartesian = [dict(zip(names, combination)) for combination in itertools.product(*(values[name] for name in names))]
+    sampled = latin_hypercube(latin_hypercube_ranges, n_samples, seed) if latin_hypercube_ranges else [{}]
+    explicit = [dict(row) for row in table] if table else [{}]
+
+    runs = {}
+    for parts in itertools.product(explicit, cartesian, sampled):
+        run_values = {name: value for part in parts for name, value in part.items()}
+        params, grid, scenario = configure(run_values, base_params, base_grid, base_scenario)
+        key = canonical_key(params, grid, scenario)
+        if key in runs:
+            runs[key].duplicates.append(run_values)
+        else:
+            runs[key] = Run(run_values, params, grid, scenario, estimated_cost(params, grid, scenario, dt_mode))
+
+    return sorted(runs.values(), key=lambda run: -run.cost)
+
+# One run of the plan, top level so that it can be sent to worker processes
+def execute_run(run, simulation_options):
+    started = timer.perf_counter()
+    result = Simulation(run.params, run.grid, run.scenario, **simulation_options).run()
+    return result, timer.perf_counter() - started
+
+# Runs the plan in order and yields (run, result, runtime) as runs finish.
+# With an executor (e.g. concurrent.futures.ProcessPoolExecutor) the runs are submitted longest first.
+def run_sweep(plan, executor=None, **simulation_options):
+    if executor is None:
+        for run in plan:
+            result, runtime = execute_run(run, simulation_options)
+            yield run, result, runtime
+        return
+
+    from concurrent.futures import as_completed
+
+    futures = {executor.submit(execute_run, run, simulation_options): run for run in plan}
+    for future in as_completed(futures):
+        result, runtime = future.result()
+        yield futures[future], result, runtime
+
+# Value of a swept parameter in the configuration of a run
+def parameter_value(run, name):
+    for owner, names in PARAMETER_FIELDS.items():
+        if name in names:
+            return getattr(getattr(run, owner), name)
+    raise ValueError(f"Unknown sweep parameter '{name}', expected a field of Params, Grid or Scenario")
+
+# One row of the tidy table: swept values, solver settings and summary statistics of the first probe
+def tidy_row(run, result, runtime, columns):
+    row = {name: parameter_value(run, name) for name in columns}
+    temperature = result.temperature
+    row.update({
+        'dt': result.dt,
+        'steps': len(result.time),
+        'runtime': runtime,
+        'final_temp': temperature[-1] if len(temperature) else np.nan,
+        'max_temp': temperature.max() if len(temperature) else np.nan,
+        'mean_temp': temperature.mean() if len(temperature) else np.nan,
+        'duplicates': len(run.duplicates),
+    })
+    return row
+
+# Collects (run, result, runtime) records into columns, streaming every row to a CSV file if path is given.
+# The parameter columns default to the swept names of the first record.
+def sweep_table(records, path=None, columns=None):
+    table = None
+    with open(path, 'w', newline='') if path is not None else nullcontext() as stream:
+        writer = None
+        for run, result, runtime in records:
+            if columns is None:
+                columns = list(run.values)
+            row = tidy_row(run, result, runtime, columns)
+
+            if table is None:
+                table = {name: [] for name in row}
+                if stream is not None:
+                    writer = csv.DictWriter(stream, fieldnames=list(row))
+                    writer.writeheader()
+            for name, value in row.items():
+                table[name].append(value)
+            if writer is not None:
+                writer.writerow(row)
+                stream.flush()
+
+    return {name: np.array(column) for name, column in (table or {}).items()}
@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# Heterogeneous tissue: per-cell conductivity, density, specific heat, perfusion and metabolism.
+#
+#     tissue = TissueMap.from_layers(SKIN_LAYERS, grid, params)
+#     result = Simulation(params, grid, scenario, tissue=tissue).run()
+#
+# Layers are stacked from one face of the grid, by default the convective surface x = Lx (row 0, see
+# the face names in bioheat.boundaries), the last layer fills the rest. A segmentation mask assigns
+# the properties of a label to every cell instead. Properties a layer or label does not set keep the
+# values of Params. kernel.step_coefficients turns the map into per-face update coefficients once per
+# run, so the time loop does the same number of array passes as for homogeneous tissue.
+
+PROPERTIES = ('k', 'rho', 'c', 'wb', 'Qm0')
+
+@dataclass(frozen=True)
+class Layer:
+    name: str
+    thickness: float  # (m)
+    k: float = None  # Thermal conductivity (W/m°C)
+    rho: float = None  # Density (kg/m^3)
+    c: float = None  # Specific heat (J/kg°C)
+    wb: float = None  # Blood perfusion rate coefficient (1/s)
+    Qm0: float = None  # Metabolic heat generation (W/m^3)
+
+    def properties(self):
+        return {name: getattr(self, name) for name in PROPERTIES if getattr(self, name) is not None}
+
+# Typical values for skin, epidermis without blood flow
+SKIN_LAYERS = [
+    Layer('epidermis', 0.0001, k=0.235, rho=1200, c=3589, wb=0, Qm0=0),
+    Layer('dermis', 0.002, k=0.445, rho=1200, c=3300, wb=0.0098),
+    Layer('subcutaneous fat', 0.01, k=0.19, rho=1000, c=2674, wb=0.0025),
+    Layer('muscle', 0.0, k=0.5, rho=1050, c=3800, wb=0.0098),
+]
+
+# Face a layer stack starts from: (axis the depth runs along, True if depth grows with the index)
+LAYER_FACES = {'xL': (0, True), 'x0': (0, False), 'y0': (1, True), 'yL': (1, False)}
+
+@dataclass
+class TissueMap:
+    k: np.ndarray
+    rho: np.ndarray
+    c: np.ndarray
+    wb: np.ndarray
+    Qm0: np.ndarray
+    labels: np.ndarray = None  # Layer or mask label of every cell
+    conduction_only: np.ndarray = None  # Cells of non-living material, plain Fourier conduction without the TPL lags
+
+    # Homogeneous map with the values of Params
+    @classmethod
+    def uniform(cls, grid, params):
+        return cls(**{name: np.full(grid.shape, float(getattr(params, name))) for name in PROPERTIES},
+                   labels=np.zeros(grid.shape, int))
+
+    # Layers stacked from face, a cell belongs to the layer its depth (distance of the node from face) falls in
+    @classmethod
+    def from_layers(cls, layers, grid, params, face='xL'):
+        if face not in LAYER_FACES:
+            raise ValueError(f"Unknown face '{face}', expected one of {tuple(LAYER_FACES)}")
+        axis, growing = LAYER_FACES[face]
+        spacing = (grid.dx, grid.dy)[axis]
+        n = grid.shape[axis]
+        depth = np.arange(n) * spacing if growing else (n - 1 - np.arange(n)) * spacing
+
+        bottoms = np.cumsum([layer.thickness for layer in layers[:-1]])
+        index = np.searchsorted(bottoms, depth + 1e-12 * spacing, side='right')
+        labels = np.broadcast_to(index[:, None] if axis == 0 else index[None, :], grid.shape)
+        return cls.from_mask(labels, {number: layer.properties() for number, layer in enumerate(layers)}, params)
+
+    # Properties of label -> {property: value} painted on an integer mask of the grid shape
+    @classmethod
+    def from_mask(cls, mask, label_properties, params):
+        mask = np.asarray(mask)
+        unknown = set(np.unique(mask)) - set(label_properties)
+        if unknown:
+            raise ValueError(f'Mask labels {sorted(unknown)} have no properties')
+
+        tissue = cls(**{name: np.full(mask.shape, float(getattr(params, name))) for name in PROPERTIES},
+                     labels=np.array(mask))
+        for label, properties in label_properties.items():
+            cells = mask == label
+            for name, value in properties.items():
+                if name not in PROPERTIES:
+                    raise ValueError(f"Unknown tissue property '{name}', expected one of {PROPERTIES}")
+                getattr(tissue, name)[cells] = value
+        return tissue
+
+    # Field of the face (row or column) of every property, as the boundary conditions see it
+    def face(self, name, face):
+        values = getattr(self, name)
+        return {'xL': values[0, :], 'x0': values[-1, :], 'y0': values[:, 0], 'yL': values[:, -1]}[face]
+
+# Integer label mask from a .npy file or an image, grey levels of an image are numbered in increasing order
+def load_mask(path):
+    if str(path).endswith('.npy'):
+        return np.load(path)
+
+    import matplotlib.image as mpimg
+
+    image = mpimg.imread(path)
+    if image.ndim == 3:
+        image = image[..., :3].mean(axis=2)
+    _, labels = np.unique(image, return_inverse=True)
+    return labels.reshape(image.shape)
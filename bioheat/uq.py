@@ -0,0 +1,236 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from bioheat.grid import Grid
+from bioheat.boundaries import wall_boundary
+from bioheat.kernel import advance, step_coefficients
+from bioheat.params import Params
+from bioheat.sampling import draw_samples
+from bioheat.scenario import Scenario
+from bioheat.sensitivity import allocate_batch_workspace, batch_views
+from bioheat.stability import resolve_dt
+
+# Monte Carlo uncertainty quantification of the probe temperatures.
+#
+#     bands = monte_carlo({'k': Normal(0.5, 0.05), 'rho_b': Triangular(1005, 1056, 1080)}, n_samples=4096,
+#                         params=params, grid=grid, scenario=scenario)
+#     bands.percentiles[:, :, 0]  # 5th, 25th, 50th, 75th and 95th percentile of the first probe over time
+#
+# Samples are drawn from the distributions of any Params fields (bioheat.sampling) and run as an ensemble:
+# a chunk of samples is one batch T[member, x, y] advanced by kernel.advance, with every coefficient a
+# (members, 1) column, so a chunk costs one vectorized step per time step. chunk_size bounds the memory.
+# After every chunk its probe series are folded into streaming statistics and dropped: mean and variance
+# exactly (Chan's pairwise update) and the percentiles with the P^2 algorithm of Jain and Chlamtac, five
+# markers per percentile and recorded value, so the memory does not grow with the number of samples.
+#
+# All samples run at one time step, the stable limit of the worst sample: the largest laplacian
+# coefficient, with the boundary closures checked on the batch of the extreme samples of every parameter.
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+@dataclass
+class UQResult:
+    time: np.ndarray  # Time of every recorded step (s)
+    percentiles: np.ndarray  # Shape (percentiles, times, probes) (°C)
+    percentile_levels: tuple
+    mean: np.ndarray  # Shape (times, probes) (°C)
+    std: np.ndarray
+    minimum: np.ndarray
+    maximum: np.ndarray
+    n_samples: int
+    samples: dict  # Sampled value of every parameter, {name: array}
+    dt: float
+    probes: list
+
+# P^2 estimate of several quantiles of a stream of arrays, one estimate per element
+class StreamingQuantiles:
+    def __init__(self, quantiles, shape):
+        self.p = np.asarray(quantiles, float)[:, None]  # (quantiles, 1)
+        self.shape = shape
+        self.size = int(np.prod(shape))
+        self.count = 0
+        self.first = np.empty((5, self.size))  # Observations until the markers can be placed
+        self.heights = None
+        self.positions = None
+        self.desired = None
+        self.increments = np.stack([0 * self.p, self.p / 2, self.p, (1 + self.p) / 2, 1 + 0 * self.p])
+
+    def update(self, x):
+        x = np.asarray(x, float).reshape(-1)
+        if self.count < 5:
+            self.first[self.count] = x
+            self.count += 1
+            if self.count == 5:
+                start = np.sort(self.first, axis=0)
+                self.heights = np.repeat(start[:, None, :], self.p.size, axis=1)  # (5, quantiles, size)
+                self.positions = np.broadcast_to(np.arange(1.0, 6.0)[:, None, None], self.heights.shape).copy()
+                self.desired = (1 + 4 * self.increments) * np.ones_like(self.heights)
+            return
+        self.count += 1
+
+        q, n = self.heights, self.positions
+        x = np.broadcast_to(x, q.shape[1:])
+        np.minimum(q[0], x, out=q[0])
+        np.maximum(q[4], x, out=q[4])
+
+        # Cell of x between the markers, the markers above it move up by one
+        cell = (x >= q[1]).astype(int) + (x >= q[2]) + (x >= q[3])
+        for i in range(1, 5):
+            n[i] += cell < i
+        self.desired += self.increments
+
+        # Move the middle markers towards their desired positions, parabolic or else linear
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for i in (1, 2, 3):
+                offset = self.desired[i] - n[i]
+                step = (((offset >= 1) & (n[i + 1] - n[i] > 1)).astype(float)
+                        - ((offset <= -1) & (n[i - 1] - n[i] < -1)))
+                parabolic = q[i] + step / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                neighbour_q = np.where(step > 0, q[i + 1], q[i - 1])
+                neighbour_n = np.where(step > 0, n[i + 1], n[i - 1])
+                linear = q[i] + step * (neighbour_q - q[i]) / (neighbour_n - n[i])
+                inside = (q[i - 1] < parabolic) & (parabolic < q[i + 1])
+                q[i] = np.where(step != 0, np.where(inside, parabolic, linear), q[i])
+                n[i] += step
+
+    # Current estimates, shape (quantiles,) + shape, exact while fewer than six values were seen
+    def values(self):
+        if self.count <= 5:
+            exact = np.quantile(self.first[:self.count], self.p[:, 0], axis=0)
+            return exact.reshape((self.p.size,) + self.shape)
+        return self.heights[2].reshape((self.p.size,) + self.shape)
+
+# Exact mean, variance, minimum and maximum of a stream of chunks (Chan, Golub and LeVeque)
+class StreamingMoments:
+    def __init__(self, shape):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.minimum = np.full(shape, np.inf)
+        self.maximum = np.full(shape, -np.inf)
+
+    # values of one chunk, the samples along axis 0
+    def update(self, values):
+        n = values.shape[0]
+        mean = values.mean(axis=0)
+        m2 = ((values - mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        np.minimum(self.minimum, values.min(axis=0), out=self.minimum)
+        np.maximum(self.maximum, values.max(axis=0), out=self.maximum)
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / max(self.count - 1, 1))
+
+# Params of the samples start .. stop - 1 as one batch, every sampled field a (members, 1) column. Only the
+# chunk being run is built, the arithmetic of Params and kernel.step_coefficients then gives the
+# coefficients of all members at once as (members, 1) columns.
+def batch_params(params, samples, start=0, stop=None):
+    return params.with_values(**{name: values[start:stop, None] for name, values in samples.items()})
+
+# Initial fields of the members of a batch
+def ensemble_initial(batch, members, grid, scenario):
+    X = np.empty((members,) + grid.shape)
+    X[:] = np.reshape(np.broadcast_to(batch.T0, (members, 1)), (members, 1, 1))
+    wall_boundary(batch_views(X), scenario.initial_wall_temp)
+    return X
+
+# One step of a batch for bioheat.stability, without modifying X
+def ensemble_step(batch, grid, scenario, wall_on):
+    cache = {}
+
+    def step(X, dt):
+        if cache.get('dt') != dt:
+            cache['dt'] = dt
+            cache['C'] = step_coefficients(batch, grid, dt)
+            cache['workspace'] = allocate_batch_workspace(X)
+        workspace = cache['workspace']
+        V, V_new = workspace['buffers']
+        np.copyto(V['field'], X)
+        advance(workspace, V, V_new, cache['C'], scenario, wall_on)
+        return V_new['field'].copy()
+    return step
+
+# Shared time step of the members of a batch
+def ensemble_dt(batch, members, grid, scenario, dt_mode='check', boundary_check=True):
+    coefficient = float(np.max(batch.laplacian_coefficient))
+    wall_phases = [False]
+    if scenario.boundary_set == 'wall' and scenario.wall_temp_duration > 0:
+        wall_phases.append(True)
+    return min(
+        resolve_dt(scenario.dt, coefficient, (grid.dx, grid.dy), mode=dt_mode,
+                   step=ensemble_step(batch, grid, scenario, wall_on) if boundary_check else None,
+                   T_reference=ensemble_initial(batch, members, grid, scenario))
+        for wall_on in wall_phases)
+
+# Samples with the smallest and largest value of every sampled parameter and of the laplacian coefficient,
+# taken from the sample arrays
+def extreme_samples(params, samples):
+    coefficients = np.broadcast_to(batch_params(params, samples).laplacian_coefficient, (len(next(iter(samples.values()))), 1))
+    indices = {int(index) for values in list(samples.values()) + [coefficients[:, 0]] for index in (np.argmin(values), np.argmax(values))}
+    rows = np.array(sorted(indices))
+    return {name: values[rows] for name, values in samples.items()}
+
+# Shared time step of the samples and the steps of the scenario at it, as Simulation.time_stepping
+def ensemble_time_stepping(params, samples, grid, scenario, dt_mode='check', boundary_check=True):
+    extremes = extreme_samples(params, samples)
+    members = len(next(iter(extremes.values())))
+    dt_run = ensemble_dt(batch_params(params, extremes), members, grid, scenario, dt_mode, boundary_check)
+    steps = int(round(scenario.time_steps * scenario.dt / dt_run))
+    wall_steps = int(round(scenario.wall_temp_duration * scenario.dt / dt_run))
+    return dt_run, steps, wall_steps
+
+# Runs the members of a batch together, observe(t, X) sees the fields X[member, x, y] after every step t
+def run_ensemble(batch, members, grid, scenario, dt, steps, wall_steps, observe):
+    C = step_coefficients(batch, grid, dt)
+    workspace = allocate_batch_workspace(ensemble_initial(batch, members, grid, scenario))
+    V, V_new = workspace['buffers']
+    for t in range(steps):
+        advance(workspace, V, V_new, C, scenario, t < wall_steps)
+        V, V_new = V_new, V
+        observe(t, V['field'])
+    return V['field']
+
+# Runs n_samples draws of the distributions ({Params field: distribution}) in chunks of chunk_size members
+# and returns percentile bands of the probe temperatures at every record_every-th step
+def monte_carlo(distributions, n_samples, params=None, grid=None, scenario=None, method='sobol', seed=0,
+                chunk_size=256, probes=None, record_every=1, percentiles=DEFAULT_PERCENTILES, dt_mode='check',
+                boundary_check=True):
+    params = params if params is not None else Params()
+    grid = grid if grid is not None else Grid()
+    scenario = scenario if scenario is not None else Scenario()
+    probes = list(probes) if probes is not None else [grid.center]
+
+    samples = draw_samples(distributions, n_samples, method, seed)
+    dt_run, steps, wall_steps = ensemble_time_stepping(params, samples, grid, scenario, dt_mode, boundary_check)
+    record_steps = np.arange(record_every - 1, steps, record_every)
+
+    rows, columns = np.array(probes).reshape(-1, 2).T
+    shape = (record_steps.size, len(probes))
+    quantiles = StreamingQuantiles(np.asarray(percentiles, float) / 100, shape)
+    moments = StreamingMoments(shape)
+
+    for start in range(0, n_samples, chunk_size):
+        stop = min(start + chunk_size, n_samples)
+        series = np.empty((stop - start,) + shape)
+
+        def record(t, X):
+            if (t + 1) % record_every == 0:
+                series[:, (t + 1) // record_every - 1] = X[:, rows, columns]
+        run_ensemble(batch_params(params, samples, start, stop), stop - start, grid, scenario, dt_run, steps, wall_steps, record)
+
+        # Fold the chunk into the statistics, its series are dropped with the next chunk
+        moments.update(series)
+        for member_series in series:
+            quantiles.update(member_series)
+
+    return UQResult(time=(record_steps + 1) * dt_run, percentiles=quantiles.values(), percentile_levels=tuple(percentiles),
+                    mean=moments.mean, std=moments.std, minimum=moments.minimum, maximum=moments.maximum,
+                    n_samples=n_samples, samples=samples, dt=dt_run, probes=probes)
@@ -0,0 +1,193 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from bioheat.sources import source_scale
+
+# Discrete large vessels exchanging heat with the cells they pass through.
+#
+#     artery = Vessel(centerline=[(0.0, 0.02), (0.05, 0.03)], radius=0.001, velocity=0.1)
+#     result = Simulation(params, grid, scenario, vessels=VesselNetwork([artery])).run()
+#
+# A vessel is a polyline from its inlet, cut into segments at the cells its centerline crosses (positions
+# in metres as in bioheat.sources). Blood crossing segment j of length L in a cell at T_c leaves it at
+#     T_in,j+1 = e_j T_in,j + (1 - e_j) T_c(j),  e_j = exp(-h_v 2 pi r L / (m cb))
+# with the wall coefficient h_v = Nu k_b / (2 r) of laminar flow and the mass flow m = rho_b pi r^2 u, and
+# gives the cell G_j (T_in,j - T_c(j)) with G_j = m cb (1 - e_j). Blood crosses the grid much faster than
+# tissue heats, so the blood temperatures are quasi-steady and every step marches this recurrence down
+# each vessel from the current cell temperatures. A vessel with a parent starts at the outlet of the
+# parent instead of inlet_temp.
+# The march is a scan, T_in,j = P_j (T_in,0 + sum over l < j of (1 - e_l) T_c(l) / P_l+1) with P_j the
+# product of the e before j, one cumsum per vessel, so a step costs O(segments). The scan restarts in
+# blocks where P falls below exp(-BLOCK_DECAY), which keeps 1 / P in range. The factor dt * lag /
+# (rho c V_cell) is folded into G once per run.
+# The 2D grid stands for a slab of thickness depth, which sets the cell volume V_cell = dx dy depth.
+# Segments in face cells do not exchange heat, the boundary conditions own those cells.
+
+BLOCK_DECAY = 30.0  # Largest decay exponent within one block of the scan
+
+@dataclass(frozen=True)
+class Vessel:
+    centerline: tuple  # (x, y) points from the inlet to the outlet (m)
+    radius: float  # (m)
+    velocity: float  # Mean blood velocity (m/s)
+    inlet_temp: float = None  # Blood temperature at the inlet (°C), Tb of Params if not given
+    parent: int = None  # Index of the vessel feeding this one in VesselNetwork.vessels
+
+    @property
+    def diameter(self):
+        return 2 * self.radius
+
+@dataclass(frozen=True)
+class VesselNetwork:
+    vessels: tuple
+    depth: float = 0.005  # Thickness of the tissue slab the grid stands for (m)
+    nusselt: float = 4.36  # Nusselt number of fully developed laminar flow
+    blood_k: float = 0.5  # Thermal conductivity of blood (W/m°C)
+
+    def __post_init__(self):
+        for index, vessel in enumerate(self.vessels):
+            if vessel.parent is not None and not 0 <= vessel.parent < index:
+                raise ValueError(f'Vessel {index} has parent {vessel.parent}, parents have to come before their branches')
+
+# Cell of every point, row and column as in buffer_views
+def point_cells(grid, points):
+    rows = grid.nx - 1 - np.rint(points[:, 0] / grid.dx).astype(int)
+    columns = np.rint(points[:, 1] / grid.dy).astype(int)
+    return np.clip(rows, 0, grid.nx - 1), np.clip(columns, 0, grid.ny - 1)
+
+# Cells a centerline crosses from its inlet and the length of the centerline in each of them
+def vessel_segments(vessel, grid):
+    points = np.asarray(vessel.centerline, float)
+    lengths = np.hypot(*np.diff(points, axis=0).T)
+    step = 0.25 * min(grid.dx, grid.dy)
+    pieces = [np.linspace(a, b, max(int(np.ceil(length / step)), 1) + 1) for a, b, length in zip(points[:-1], points[1:], lengths)]
+    samples = np.concatenate([piece[:-1] for piece in pieces] + [points[-1:]])
+    midpoints = 0.5 * (samples[1:] + samples[:-1])
+    sample_lengths = np.hypot(*np.diff(samples, axis=0).T)
+
+    # Merge consecutive samples in the same cell
+    rows, columns = point_cells(grid, midpoints)
+    new_cell = np.ones(rows.size, bool)
+    new_cell[1:] = (rows[1:] != rows[:-1]) | (columns[1:] != columns[:-1])
+    starts = np.flatnonzero(new_cell)
+    return rows[starts], columns[starts], np.add.reduceat(sample_lengths, starts)
+
+# March of a run: the segments of all vessels in order with the cells they lie in as flat indices of the
+# solver field, their scan coefficients and conductances with the update factor folded in, and the blocks
+# of the scan. T_in holds the inlet of every segment and the outlet of every vessel, vessel v at the
+# positions of its segments shifted by v. Profiles are laid out on the tissue grid and shifted by offset,
+# as for bioheat.sources.
+def vessel_coefficients(network, params, grid, dt, tissue=None, offset=(0, 0), solver_shape=None):
+    solver_shape = grid.shape if solver_shape is None else solver_shape
+    rows, columns, gains, decays, conductances, inlet_decays = [], [], [], [], [], []
+    blocks = []  # (segments, inlet position, inlet) of every block, inlet a temperature, a T_in position or None
+    outlets = []  # Position of the outlet of every vessel in T_in and its decay from the root inlet
+    n_segments = 0
+
+    for index, vessel in enumerate(network.vessels):
+        segment_rows, segment_columns, lengths = vessel_segments(vessel, grid)
+        interior = (segment_rows > 0) & (segment_rows < grid.nx - 1) & (segment_columns > 0) & (segment_columns < grid.ny - 1)
+        n = lengths.size
+
+        # Exponent beta of every segment, zero in the face cells, and its conductance m cb (1 - e)
+        flow_capacity = params.rho_b * np.pi * vessel.radius ** 2 * vessel.velocity * params.cb
+        wall_coefficient = network.nusselt * network.blood_k / vessel.diameter
+        beta = np.where(interior, wall_coefficient * 2 * np.pi * vessel.radius * lengths / flow_capacity, 0)
+        B = np.concatenate([[0], np.cumsum(beta)])
+
+        if vessel.parent is None:
+            inlet = float(params.Tb if vessel.inlet_temp is None else vessel.inlet_temp)
+            root_decay = 1.0
+        else:
+            inlet, root_decay = outlets[vessel.parent]
+
+        # Blocks of the scan, each starts where the decay since the previous start reaches BLOCK_DECAY
+        start = 0
+        base = np.zeros(n)  # B at the start of the block of every segment
+        while start < n:
+            stop = start + 1 + int(np.searchsorted(B[start + 2:n + 1], B[start] + BLOCK_DECAY, side='right'))
+            base[start:stop] = B[start]
+            first = n_segments + start
+            blocks.append((slice(first, n_segments + stop), first + index, inlet if start == 0 else None))
+            start = stop
+
+        rows.append(segment_rows)
+        columns.append(segment_columns)
+        gains.append(-np.expm1(-beta) * np.exp(B[1:] - base))  # (1 - e_l) / P_l+1 relative to the block start
+        decays.append(np.exp(-(B[1:] - base)))  # P_l+1 relative to the block start
+        conductances.append(flow_capacity * -np.expm1(-beta))
+        inlet_decays.append(root_decay * np.exp(-B[:n]))
+        outlets.append((n_segments + n + index, root_decay * np.exp(-B[n])))
+        n_segments += n
+
+    rows = np.concatenate(rows) + offset[0]
+    columns = np.concatenate(columns) + offset[1]
+    cells = np.ravel_multi_index((rows, columns), solver_shape)
+
+    # dt * lag / (rho c V_cell) of every segment, folded into the conductances
+    scale = source_scale(params, dt, tissue)
+    scale = (scale[rows, columns] if np.ndim(scale) else np.full(n_segments, scale)) / (grid.dx * grid.dy * network.depth)
+    conductances = np.concatenate(conductances) * scale
+
+    # Segments sorted by cell, the heat of the segments sharing a cell is summed with reduceat
+    order = np.argsort(cells, kind='stable')
+    first = np.ones(n_segments, bool)
+    first[1:] = cells[order][1:] != cells[order][:-1]
+    starts = np.flatnonzero(first)
+
+    # Change of a cell per degree, G_j (1 + weight of the cells upstream), at most G_j (2 - decay from the root inlet)
+    rates = np.add.reduceat((conductances * (2 - np.concatenate(inlet_decays)))[order], starts) if n_segments else np.zeros(0)
+
+    return {
+        'vessel_cells': cells[order][starts],
+        'vessel_segment_cells': cells,
+        'vessel_inlet_index': np.arange(n_segments) + np.repeat(np.arange(len(network.vessels)), [len(r) for r in gains]),
+        'vessel_gains': np.concatenate(gains),
+        'vessel_decays': np.concatenate(decays),
+        'vessel_conductances': conductances,
+        'vessel_blocks': blocks,
+        'vessel_order': order,
+        'vessel_starts': starts,
+        'vessel_rates': rates,
+        'vessel_inlets': np.empty(n_segments + len(network.vessels)),
+        'vessel_temps': np.empty(n_segments),
+        'vessel_work': np.empty(n_segments),
+        'vessel_heat': np.empty(starts.size),
+    }
+
+# Largest change of a vessel cell per second and degree of the field, bounds the exchange for the time step limit (1/s)
+def vessel_rate(network, params, grid, tissue=None, offset=(0, 0), solver_shape=None):
+    rates = vessel_coefficients(network, params, grid, 1.0, tissue, offset, solver_shape)['vessel_rates']
+    return rates.max() if rates.size else 0.0
+
+# Adds the vessel exchange of the field T_array to T_new_array, a march down every vessel over its segments
+def vessel_exchange(T_array, T_new_array, C):
+    temps = C['vessel_temps']
+    work = C['vessel_work']
+    inlets = C['vessel_inlets']
+    np.take(T_array.reshape(-1), C['vessel_segment_cells'], out=temps)
+
+    # Blood temperature at the inlet of every segment, block by block, parents before their branches
+    np.multiply(C['vessel_gains'], temps, out=work)
+    for segments, position, inlet in C['vessel_blocks']:
+        if inlet is not None:
+            inlets[position] = inlet if isinstance(inlet, float) else inlets[inlet]
+        block = work[segments]
+        np.cumsum(block, out=block)
+        block += inlets[position]
+        np.multiply(block, C['vessel_decays'][segments], out=inlets[position + 1:position + 1 + block.size])
+
+    # G_j (T_in,j - T_c(j)) of every segment, summed per cell
+    np.take(inlets, C['vessel_inlet_index'], out=work)
+    work -= temps
+    work *= C['vessel_conductances']
+    np.take(work, C['vessel_order'], out=temps)
+    heat = C['vessel_heat']
+    np.add.reduceat(temps, C['vessel_starts'], out=heat)
+
+    cells = C['vessel_cells']
+    new_flat = T_new_array.reshape(-1)
+    np.take(new_flat, cells, out=work[:cells.size])
+    heat += work[:cells.size]
+    new_flat[cells] = heat
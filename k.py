@@ -1,5 +1,6 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from bioheat.stability import laplacian_coefficient, resolve_dt
 
 # Constants and parameters
 rho = 1000  # Tissue density (kg/m^3)
@@ -21,6 +22,7 @@ Ly = 0.05  # Length of the skin tissue in y direction (m)
 dx = 0.01  # Space step in x direction (m)
 dy = 0.01  # Space step in y direction (m)
 dt = 0.1  # Time step (s)
+dt_mode = 'check' # 'check' rejects an unstable dt, 'scale' shrinks it to the stable limit, 'max' runs each k at its largest stable dt
 wall_temp_duration = 50 # Number of Wall Temperature 'ON' time steps
 remove_wall_after = False # Remove Wall if True, disables fourth boundry condition on boundry border
 fourth_boundary_on = True
@@ -66,32 +68,93 @@ def third_boundary(T_array):
     T_array[-1, :] = (h * dx * Tl + k * T_array[-2, :]) / (h * dx + k)  # x = 0
     T_array[:, 0] = (h * dx * Tl + k * T_array[:, 1]) / (h * dx + k)  # y = 0
 
+# One time step for the current k. T_new must hold a copy of T on entry, the loop updates it in place
+def advance(T, T_new, dt_k, wall_on):
+    for i in range(1, nx - 1):
+        for j in range(1, ny - 1):
+            # From eq. 5
+            Qm = Qm0 * (1 + (Tl - T0) / 10)
+
+            #From eq. 6
+            Qb = wb * rho_b * cb * (Tb - Tl)
+
+            # Discretization using finite difference method
+            d2Tdx2 = (T_new[i + 1, j] - 2 * T_new[i, j] + T_new[i - 1, j]) / dx ** 2
+            d2Tdy2 = (T_new[i, j + 1] - 2 * T_new[i, j] + T_new[i, j - 1]) / dy ** 2
+
+            # From eq. 4
+            dTdt = (k * (d2Tdx2 + d2Tdy2) + Qb + Qm) / (rho * c)
+
+            # Derivative of eq. 4 with k* integrated
+            d2Tdt2 = (k_star * (d2Tdx2 + d2Tdy2)) / (rho * c)
+
+            # Substitute finite differences from discretization into eq. 7 and solve for T_n+1 
+            T_new[i, j] = T[i, j] + dt_k * (dTdt + tau_q * dTdt - tau_T * d2Tdt2 + (k + k_star * tau_v) * dTdt)
+
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(T_new, Tw)
+
+    # Symmetric boundary conditions (Neumann conditions with zero gradient)
+    symmetric_boundary(T_new)
+
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(T_new, Tw)
+
+    convective_boundary(T_new)
+
+    # Robin boundary condition on all boundaries (convective) once the wall is removed
+    if not wall_on and remove_wall_after is True:
+        third_boundary(T_new)
+
+    # Apply 4th boundry condition at boundry border between wall and tissue
+    else:
+        fourth_boundary(T_new)
+
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(T_new, Tw)
+
+# Time step, number of steps and wall 'ON' steps for the current k, covering the same time as time_steps * dt.
+# The in-place loop of advance is the 'sweep' update of stability.py, and both wall phases are checked
+# with their boundary closures included.
+def member_time_stepping():
+    coefficient = laplacian_coefficient(k, k_star, tau_q, tau_T, tau_v, rho, c)
+
+    def phase_step(wall_on):
+        def step(T_array, dt_k):
+            T_next = T_array.copy()
+            advance(T_array, T_next, dt_k, wall_on)
+            return T_next
+        return step
+
+    dt_member = min(resolve_dt(dt, coefficient, (dx, dy), update='sweep', mode=dt_mode, step=phase_step(wall_on), T_reference=T_initial)
+                    for wall_on in (True, False))
+    steps = int(round(time_steps * dt / dt_member))
+    wall_steps = int(round(wall_temp_duration * dt / dt_member))
+    return dt_member, steps, wall_steps
+
 # Discretization
 x = np.arange(0, Lx + dx, dx)
 y = np.arange(0, Ly + dy, dy)
 nx = len(x)
 ny = len(y)
 
-# Initialize time derivatives
-dTdt_initial = np.zeros((nx, ny))  # Initial first time derivative of temperature
-d2Tdt2_initial = np.zeros((nx, ny))  # Initial second time derivative of temperature
-
 # Initialize temperature fields
 T_initial = np.ones((nx, ny)) * T0  # Initialize entire temperature field to T0
 T_new_initial = np.ones((nx, ny)) * T0  # Initialize entire temperature field to T0
 
 # Plotting the results
-time = np.arange(0, time_steps * dt, dt)
 plt.figure(figsize=(10, 6))
 
 for k in k_list:
-    # Copy time derivatives
-    dTdt = dTdt_initial.copy()
-    d2Tdt2 = d2Tdt2_initial.copy()
-
     # Copy temperature fields
     T = T_initial.copy()
     T_new = T_new_initial.copy()
+
+    # Stable time step for this k
+    dt_k, steps_k, wall_steps_k = member_time_stepping()
     
     # Check if wall is initialized
     if wall_temp_duration > 0:
@@ -111,62 +174,8 @@ for k in k_list:
     temperature_profile = []
 
     # Time integration
-    for t in range(time_steps):  
-        for i in range(1, nx - 1):
-            for j in range(1, ny - 1):
-                # From eq. 5
-                Qm = Qm0 * (1 + (Tl - T0) / 10)
-
-                #From eq. 6
-                Qb = wb * rho_b * cb * (Tb - Tl)
-
-                # Discretization using finite difference method
-                d2Tdx2 = (T_new[i + 1, j] - 2 * T_new[i, j] + T_new[i - 1, j]) / dx ** 2
-                d2Tdy2 = (T_new[i, j + 1] - 2 * T_new[i, j] + T_new[i, j - 1]) / dy ** 2
-
-                # From eq. 4
-                dTdt[i, j] = (k * (d2Tdx2 + d2Tdy2) + Qb + Qm) / (rho * c)
-
-                # Derivative of eq. 4 with k* integrated
-                d2Tdt2[i, j] = (k_star * (d2Tdx2 + d2Tdy2)) / (rho * c)
-
-                # Substitute finite differences from discretization into eq. 7 and solve for T_n+1 
-                T_new[i, j] = T[i, j] + dt * (dTdt[i, j] + tau_q * dTdt[i, j] - tau_T * d2Tdt2[i, j] + (k + k_star * tau_v) * dTdt[i, j])
-
-        # Reapply fixed temperature boundary condition at each time step
-        if t < wall_temp_duration:
-            wall_boundary(T_new, Tw)
-
-        # Symmetric boundary conditions (Neumann conditions with zero gradient)
-        symmetric_boundary(T_new)
-
-        # Reapply fixed temperature boundary condition at each time step
-        if t < wall_temp_duration:
-            wall_boundary(T_new, Tw)
-
-        convective_boundary(T_new)
-            
-        # Robin boundary condition on all boundaries (convective)
-        if t >= wall_temp_duration and remove_wall_after is True:
-            print("both off")
-            third_boundary(T_new)
-
-        elif t >= wall_temp_duration and remove_wall_after is False:
-            print("off")
-            fourth_boundary(T_new)
-
-        # Apply 4th boundry condition at boundry border between wall and tissue
-        elif t < wall_temp_duration or remove_wall_after is False:
-            print("on")
-            fourth_boundary(T_new)
-
-        elif t < wall_temp_duration or remove_wall_after is True:
-            print("on")
-            third_boundary(T_new)
-
-        # Reapply fixed temperature boundary condition at each time step
-        if t < wall_temp_duration:
-            wall_boundary(T_new, Tw)
+    for t in range(steps_k):  
+        advance(T, T_new, dt_k, t < wall_steps_k)
 
         # Update temperature
         T = T_new.copy()
@@ -178,6 +187,7 @@ for k in k_list:
     temperature_profile = np.array(temperature_profile)
 
     # Plot temperature at a specific point over time
+    time = np.arange(steps_k) * dt_k
     plt.plot(time, temperature_profile[:, nx // 2, ny // 2], label=f'k = {k} W/m°C')
 
 plt.xlabel('Time (s)')
@@ -192,13 +202,12 @@ plt.savefig(f'temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_
 fig, axes = plt.subplots(1, len(k_list), figsize=(18, 6))
 
 for idx, k in enumerate(k_list):
-    # Copy time derivatives
-    dTdt = dTdt_initial.copy()
-    d2Tdt2 = d2Tdt2_initial.copy()
-
     # Copy temperature fields
     T = T_initial.copy()
     T_new = T_new_initial.copy()
+
+    # Stable time step for this k
+    dt_k, steps_k, wall_steps_k = member_time_stepping()
     
     # Check if wall is initialized
     if wall_temp_duration > 0:
@@ -218,55 +227,8 @@ for idx, k in enumerate(k_list):
     temperature_profile = []
 
     # Time integration
-    for t in range(time_steps):  
-        for i in range(1, nx - 1):
-            for j in range(1, ny - 1):
-                # From eq. 5
-                Qm = Qm0 * (1 + (Tl - T0) / 10)
-
-                #From eq. 6
-                Qb = wb * rho_b * cb * (Tb - Tl)
-
-                # Discretization using finite difference method
-                d2Tdx2 = (T_new[i + 1, j] - 2 * T_new[i, j] + T_new[i - 1, j]) / dx ** 2
-                d2Tdy2 = (T_new[i, j + 1] - 2 * T_new[i, j] + T_new[i, j - 1]) / dy ** 2
-
-                # From eq. 4
-                dTdt[i, j] = (k * (d2Tdx2 + d2Tdy2) + Qb + Qm) / (rho * c)
-
-                # Derivative of eq. 4 with k* integrated
-                d2Tdt2[i, j] = (k_star * (d2Tdx2 + d2Tdy2)) / (rho * c)
-
-                # Substitute finite differences from discretization into eq. 7 and solve for T_n+1 
-                T_new[i, j] = T[i, j] + dt * (dTdt[i, j] + tau_q * dTdt[i, j] - tau_T * d2Tdt2[i, j] + (k + k_star * tau_v) * dTdt[i, j])
-
-        # Reapply fixed temperature boundary condition at each time step
-        if t < wall_temp_duration:
-            wall_boundary(T_new, Tw)
-
-        # Symmetric boundary conditions (Neumann conditions with zero gradient)
-        symmetric_boundary(T_new)
-
-        # Reapply fixed temperature boundary condition at each time step
-        if t < wall_temp_duration:
-            wall_boundary(T_new, Tw)
-
-        convective_boundary(T_new)
-            
-        # Robin boundary condition on all boundaries (convective)
-        if t >= wall_temp_duration and remove_wall_after is True:
-            third_boundary(T_new)
-
-        elif t >= wall_temp_duration and remove_wall_after is False:
-            fourth_boundary(T_new)
-
-        # Apply 4th boundry condition at boundry border between wall and tissue
-        elif t < wall_temp_duration or remove_wall_after is False:
-            fourth_boundary(T_new)
-
-        # Reapply fixed temperature boundary condition at each time step
-        if t < wall_temp_duration:
-            wall_boundary(T_new, Tw)
+    for t in range(steps_k):  
+        advance(T, T_new, dt_k, t < wall_steps_k)
 
         # Update temperature
         T = T_new.copy()
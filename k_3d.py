@@ -0,0 +1,262 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+# Constants and parameters
+rho = 1000  # Tissue density (kg/m^3)
+c = 4000  # Specific heat of tissue (J/kg°C)
+k_list = [0.3, 0.625, 1, 1.5]  # Thermal conductivity of tissue (W/m°C)
+k_star = 0.1 # Additional thermal conductivity term (W/m°C/s)
+h = 4.5  # Heat transfer coefficient for Robin boundary condition (W/m^2°C) - Typical for large blood vessels
+wb = 0.0098  # Blood perfusion rate coefficient (1/s) - Typical for skin tissue
+rho_b = 1056  # Density of blood (kg/m^3)
+cb = 4000  # Specific heat of blood (J/kg°C)
+Qm0 = 50.65  # Metabolic heat generation (W/m^3)
+Tb = 37  # Temperature of arterial blood (°C)
+T0 = 37  # Initial temperature of the body (°C)
+Tl = 37  # Temperature of Tissue (°C)
+Tw = 100 # Fixed temperature at left, bottom and back boundary
+Tw0 = 37
+Lx = 0.05  # Length of the skin tissue in x direction (m)
+Ly = 0.05  # Length of the skin tissue in y direction (m)
+Lz = 0.05  # Length of the skin tissue in z direction (m)
+dx = 0.01  # Space step in x direction (m)
+dy = 0.01  # Space step in y direction (m)
+dz = 0.01  # Space step in z direction (m)
+dt = 0.05  # Time step (s), half of k.py since the explicit 3D stencil has a tighter stability limit
+wall_temp_duration = 100 # Number of Wall Temperature 'ON' time steps
+remove_wall_after = False # Remove Wall if True, disables fourth boundry condition on boundry border
+fourth_boundary_on = True
+time_steps = 200  # Number of time steps
+tau_q = 600  # Relaxation time due to heat flux (s)
+tau_T = 300  # Relaxation time due to temperature gradient (s)
+tau_v = 100  # Relaxation time due to thermal displacement (s)
+ambient_temp = 37 # Ambient temperature of space without initialized wall temp (°C)
+
+# Constants for the second material (assuming for the boundary condition of fourth kind)
+ku = 0.625   # Thermal conductivity of left material (W/m°C)
+
+# Slab layout and recording
+slab_depth = 4  # Number of z planes updated together, sized so a slab and its buffers stay in cache
+slice_every = 10  # Store the recorded z slice every n time steps (0 stores none)
+
+DOI_1 = 'https://doi.org/10.1016/j.ijthermalsci.2022.108002'
+
+if wall_temp_duration == time_steps:
+    remove_wall_after = False
+
+# Fields are stored as T[z, x, y] so every z slab T[z0:z1] is one contiguous block of memory.
+# The x and y faces keep the same index convention as k.py, the z faces are T[0] and T[-1].
+
+# Boundry between wall and tissue
+def wall_boundary(T_array, wall_temp):
+    T_array[:, -1, :] = wall_temp  # x = 0 (bottom boundary)
+    T_array[:, :, 0] = wall_temp  # y = 0 (left boundary)
+    T_array[0, :, :] = wall_temp  # z = 0 (back boundary)
+
+# Symmetrical boundary conditions from eq. 16
+def symmetric_boundary(T_array):
+    T_array[:, 0, :] = T_array[:, 1, :]  # x = Lx
+    T_array[:, -1, :] = T_array[:, -2, :]  # x = 0
+    T_array[:, :, 0] = T_array[:, :, 1]  # y = 0
+    T_array[:, :, -1] = T_array[:, :, -2]  # y = Ly
+    T_array[0, :, :] = T_array[1, :, :]  # z = 0
+    T_array[-1, :, :] = T_array[-2, :, :]  # z = Lz
+
+# Convective boundary condition to introduce a constant heat coefficient
+def convective_boundary(T_array):
+    T_array[:, 0, :] = (h * dx * Tl + k * T_array[:, 1, :]) / (h * dx + k)  # x = Lx
+    T_array[:, :, -1] = (h * dy * Tl + k * T_array[:, :, -2]) / (h * dy + k)  # y = Ly
+    T_array[-1, :, :] = (h * dz * Tl + k * T_array[-2, :, :]) / (h * dz + k)  # z = Lz
+
+# Fourth boundary using constant temperature and heat flux for two thermal conductivity terms from secondary paper to model conduction.
+def fourth_boundary(T_array):
+    if fourth_boundary_on is True:
+        T_array[:, -1, :] = T_array[:, -2, :] - (k / ku) * (T_array[:, -2, :] - T_array[:, -3, :])  # x = 0
+        T_array[:, :, 0] = T_array[:, :, 1] - (ku / k) * (T_array[:, :, 1] - T_array[:, :, 2])  # y = 0
+        T_array[0, :, :] = T_array[1, :, :] - (k / ku) * (T_array[1, :, :] - T_array[2, :, :])  # z = 0
+
+# Third boundary using constant heat coefficient
+def third_boundary(T_array):
+    T_array[:, -1, :] = (h * dx * Tl + k * T_array[:, -2, :]) / (h * dx + k)  # x = 0
+    T_array[:, :, 0] = (h * dy * Tl + k * T_array[:, :, 1]) / (h * dy + k)  # y = 0
+    T_array[0, :, :] = (h * dz * Tl + k * T_array[1, :, :]) / (h * dz + k)  # z = 0
+
+# Same boundary sequence as the time loop in k.py, applied to all six faces
+def apply_boundaries(T_array, t):
+    # Reapply fixed temperature boundary condition at each time step
+    if t < wall_temp_duration:
+        wall_boundary(T_array, Tw)
+
+    # Symmetric boundary conditions (Neumann conditions with zero gradient)
+    symmetric_boundary(T_array)
+
+    # Reapply fixed temperature boundary condition at each time step
+    if t < wall_temp_duration:
+        wall_boundary(T_array, Tw)
+
+    convective_boundary(T_array)
+
+    # Robin boundary condition once the wall has been removed, otherwise conduction into the wall material
+    if t >= wall_temp_duration and remove_wall_after is True:
+        third_boundary(T_array)
+    else:
+        fourth_boundary(T_array)
+
+    # Reapply fixed temperature boundary condition at each time step
+    if t < wall_temp_duration:
+        wall_boundary(T_array, Tw)
+
+# Slab buffers, allocated once per run and reused for every slab and every time step
+def allocate_slab_buffers(nx, ny):
+    lap = np.empty((slab_depth, nx - 2, ny - 2))
+    work = np.empty((slab_depth, nx - 2, ny - 2))
+    return lap, work
+
+# Explicit TPL update of the interior, one z slab at a time.
+# Only slab sized buffers are touched, no full size temporaries are created.
+def tpl_step_slabs(T, T_new, lap_buffer, work_buffer):
+    nz = T.shape[0]
+
+    # From eq. 5 and eq. 6, constant for the whole field
+    Qm = Qm0 * (1 + (Tl - T0) / 10)
+    Qb = wb * rho_b * cb * (Tb - Tl)
+
+    # Eq. 4 and its k* derivative substituted into eq. 7 collapse to a laplacian term and a source term
+    lag = 1 + tau_q + k + k_star * tau_v
+    lap_coef = dt * (lag * k - tau_T * k_star) / (rho * c)
+    source = dt * lag * (Qb + Qm) / (rho * c)
+
+    for z0 in range(1, nz - 1, slab_depth):
+        z1 = min(z0 + slab_depth, nz - 1)
+        lap = lap_buffer[:z1 - z0]
+        work = work_buffer[:z1 - z0]
+        center = T[z0:z1, 1:-1, 1:-1]
+
+        # d2T/dz2
+        np.add(T[z0 + 1:z1 + 1, 1:-1, 1:-1], T[z0 - 1:z1 - 1, 1:-1, 1:-1], out=lap)
+        lap -= center
+        lap -= center
+        lap *= 1 / dz ** 2
+
+        # d2T/dx2
+        np.add(T[z0:z1, 2:, 1:-1], T[z0:z1, :-2, 1:-1], out=work)
+        work -= center
+        work -= center
+        work *= 1 / dx ** 2
+        lap += work
+
+        # d2T/dy2
+        np.add(T[z0:z1, 1:-1, 2:], T[z0:z1, 1:-1, :-2], out=work)
+        work -= center
+        work -= center
+        work *= 1 / dy ** 2
+        lap += work
+
+        # T_n+1 = T_n + dt * (...)
+        lap *= lap_coef
+        lap += source
+        np.add(center, lap, out=T_new[z0:z1, 1:-1, 1:-1])
+
+# Records probe time series and a single z slice instead of the full field history
+def allocate_recorder(probes, n_steps, slice_shape):
+    probe_history = np.empty((n_steps, len(probes)))
+    n_slices = n_steps // slice_every if slice_every > 0 else 0
+    slice_history = np.empty((n_slices,) + slice_shape)
+    return probe_history, slice_history
+
+def record(T_array, t, probes, probe_history, slice_history, slice_z):
+    for p, (pz, px, py) in enumerate(probes):
+        probe_history[t, p] = T_array[pz, px, py]
+
+    if slice_every > 0 and (t + 1) % slice_every == 0 and (t + 1) // slice_every <= len(slice_history):
+        slice_history[(t + 1) // slice_every - 1] = T_array[slice_z]
+
+# Discretization
+x = np.arange(0, Lx + dx, dx)
+y = np.arange(0, Ly + dy, dy)
+z = np.arange(0, Lz + dz, dz)
+nx = len(x)
+ny = len(y)
+nz = len(z)
+
+# Initialize temperature fields
+T_initial = np.ones((nz, nx, ny)) * T0  # Initialize entire temperature field to T0
+T_new_initial = np.ones((nz, nx, ny)) * T0  # Initialize entire temperature field to T0
+
+# Probes to record, (z, x, y) indices
+probes = [(nz // 2, nx // 2, ny // 2), (nz // 2, nx - 2, 1)]
+slice_z = nz // 2  # z plane kept for the heatmaps
+
+lap_buffer, work_buffer = allocate_slab_buffers(nx, ny)
+probe_histories = {}
+slice_histories = {}
+final_slices = {}
+
+for k in k_list:
+    # Copy temperature fields
+    T = T_initial.copy()
+    T_new = T_new_initial.copy()
+
+    # Check if wall is initialized
+    if wall_temp_duration > 0:
+        wall_boundary(T, Tw)
+        wall_boundary(T_new, Tw)
+
+    # Else use ambient temperature of air
+    elif wall_temp_duration == 0 and remove_wall_after is False:
+        wall_boundary(T, Tw0)
+        wall_boundary(T_new, Tw0)
+
+    elif wall_temp_duration == 0 and remove_wall_after is True:
+        wall_boundary(T, ambient_temp)
+        wall_boundary(T_new, ambient_temp)
+
+    probe_history, slice_history = allocate_recorder(probes, time_steps, (nx, ny))
+
+    # Time integration
+    for t in range(time_steps):
+        tpl_step_slabs(T, T_new, lap_buffer, work_buffer)
+        apply_boundaries(T_new, t)
+
+        # Swap fields instead of copying, T_new is fully overwritten next step
+        T, T_new = T_new, T
+
+        record(T, t, probes, probe_history, slice_history, slice_z)
+
+    probe_histories[k] = probe_history
+    slice_histories[k] = slice_history
+    final_slices[k] = T[slice_z].copy()
+
+# Plotting the results
+time = np.arange(0, time_steps * dt, dt)
+plt.figure(figsize=(10, 6))
+
+for k in k_list:
+    # Plot temperature at the center probe over time
+    plt.plot(time, probe_histories[k][:, 0], label=f'k = {k} W/m°C')
+
+plt.xlabel('Time (s)')
+plt.ylabel('Temperature (°C)')
+plt.title('Temperature Profile Over Time for Different k (3D, center probe)')
+plt.legend()
+plt.grid(True)
+plt.savefig(f'3d_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}.png')
+# plt.show()
+
+# Plot heatmaps of the recorded z slice for each k value
+fig, axes = plt.subplots(1, len(k_list), figsize=(18, 6))
+
+for idx, k in enumerate(k_list):
+    ax = axes[idx]  # Access the correct subplot
+    T_rotated = np.rot90(final_slices[k], -1)
+
+    contour = ax.contourf(T_rotated, 100, cmap='hot')
+    fig.colorbar(contour, ax=ax, shrink=0.5)
+    ax.set_aspect('equal', 'box')
+    ax.set_xlabel('Length in cm')
+    ax.set_ylabel('Length in cm')
+    ax.set_title(f'Temperature Distribution (k = {k}W/m°C, z = {z[slice_z]:.2f}m)')
+
+plt.tight_layout()
+plt.savefig(f'3d_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}_HM.png')
+# plt.show()
@@ -0,0 +1,207 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+# Constants and parameters
+rho = 1000  # Tissue density (kg/m^3)
+c = 4000  # Specific heat of tissue (J/kg°C)
+k_list = [0.3, 0.625, 1, 1.5]  # Thermal conductivity of tissue (W/m°C)
+k_star = 0.1 # Additional thermal conductivity term (W/m°C/s)
+h = 4.5  # Heat transfer coefficient for Robin boundary condition (W/m^2°C) - Typical for large blood vessels
+wb = 0.0098  # Blood perfusion rate coefficient (1/s) - Typical for skin tissue
+rho_b = 1056  # Density of blood (kg/m^3)
+cb = 4000  # Specific heat of blood (J/kg°C)
+Qm0 = 50.65  # Metabolic heat generation (W/m^3)
+Tb = 37  # Temperature of arterial blood (°C)
+T0 = 37  # Initial temperature of the body (°C)
+Tl = 37  # Temperature of Tissue (°C)
+Tw = 100 # Fixed temperature of the probe (use a cold value such as 3.93 for a cryo-probe)
+Tw0 = 37
+R = 0.05  # Radius of the tissue cylinder around the probe axis (m)
+Lz = 0.05  # Depth of the tissue cylinder in z direction (m)
+dr = 0.01  # Space step in r direction (m)
+dz = 0.01  # Space step in z direction (m)
+dt = 0.05  # Time step (s), the axis stencil has a tighter stability limit than the cartesian one
+wall_temp_duration = 100 # Number of Wall Temperature 'ON' time steps
+remove_wall_after = False # Remove Wall if True, disables fourth boundry condition on boundry border
+fourth_boundary_on = True
+time_steps = 200  # Number of time steps
+tau_q = 600  # Relaxation time due to heat flux (s)
+tau_T = 300  # Relaxation time due to temperature gradient (s)
+tau_v = 100  # Relaxation time due to thermal displacement (s)
+ambient_temp = 37 # Ambient temperature of space without initialized wall temp (°C)
+probe_depth = 0.03  # Insertion depth of the probe along r = 0, measured from the skin surface at z = 0 (m)
+
+# Constants for the second material (assuming for the boundary condition of fourth kind)
+ku = 0.625   # Thermal conductivity of the probe material (W/m°C)
+
+DOI_1 = 'https://doi.org/10.1016/j.ijthermalsci.2022.108002'
+
+if wall_temp_duration == time_steps:
+    remove_wall_after = False
+
+# Fields are stored as T[i, j] with i along r (i = 0 is the axis) and j along z (j = 0 is the skin surface).
+# The probe occupies the axis cells T[0, 1:probe_end].
+
+# Boundry between probe and tissue
+def wall_boundary(T_array, wall_temp):
+    T_array[0, 1:probe_end] = wall_temp  # r = 0, 0 < z < probe_depth
+
+# Symmetrical boundary conditions from eq. 16, the axis itself is handled by the stencil
+def symmetric_boundary(T_array):
+    T_array[-1, :] = T_array[-2, :]  # r = R
+    T_array[:, 0] = T_array[:, 1]  # z = 0
+    T_array[:, -1] = T_array[:, -2]  # z = Lz
+
+# Convective boundary condition to introduce a constant heat coefficient
+def convective_boundary(T_array):
+    T_array[:, 0] = (h * dz * Tl + k * T_array[:, 1]) / (h * dz + k)  # z = 0
+
+# Fourth boundary using constant temperature and heat flux for two thermal conductivity terms from secondary paper to model conduction.
+def fourth_boundary(T_array):
+    if fourth_boundary_on is True:
+        T_array[0, 1:probe_end] = T_array[1, 1:probe_end] - (k / ku) * (T_array[1, 1:probe_end] - T_array[2, 1:probe_end])  # r = 0
+
+# Third boundary using constant heat coefficient
+def third_boundary(T_array):
+    T_array[0, 1:probe_end] = (h * dr * Tl + k * T_array[1, 1:probe_end]) / (h * dr + k)  # r = 0
+
+# Same boundary sequence as the time loop in k.py, applied to the probe segment and the outer faces
+def apply_boundaries(T_array, t):
+    # Reapply fixed temperature boundary condition at each time step
+    if t < wall_temp_duration:
+        wall_boundary(T_array, Tw)
+
+    # Symmetric boundary conditions (Neumann conditions with zero gradient)
+    symmetric_boundary(T_array)
+
+    convective_boundary(T_array)
+
+    # Robin boundary condition once the probe has been removed, otherwise conduction into the probe material
+    if t >= wall_temp_duration and remove_wall_after is True:
+        third_boundary(T_array)
+    else:
+        fourth_boundary(T_array)
+
+    # Reapply fixed temperature boundary condition at each time step
+    if t < wall_temp_duration:
+        wall_boundary(T_array, Tw)
+
+# Cylindrical laplacian d2T/dr2 + (1/r) dT/dr + d2T/dz2 for every row from the axis up to r = R - dr.
+# Off the axis the radial part is written in flux form (1/r) d/dr(r dT/dr), on the axis it is the
+# limit 2 d2T/dr2 with the symmetry T(-dr) = T(dr), which gives 4 (T[1] - T[0]) / dr^2.
+def cylindrical_laplacian(T_array):
+    lap = np.empty((nr - 1, nz - 2))
+    center = T_array[:-1, 1:-1]
+
+    lap[1:] = (r_plus[1:, None] * (T_array[2:, 1:-1] - center[1:])
+               - r_minus[1:, None] * (center[1:] - T_array[:-2, 1:-1]))
+    lap[0] = 4 * (T_array[1, 1:-1] - T_array[0, 1:-1]) / dr ** 2
+
+    lap += (T_array[:-1, 2:] - 2 * center + T_array[:-1, :-2]) / dz ** 2
+    return lap
+
+# Discretization
+r = np.arange(0, R + dr, dr)
+z = np.arange(0, Lz + dz, dz)
+nr = len(r)
+nz = len(z)
+probe_end = int(round(probe_depth / dz)) + 1
+
+# Face weights r_{i+1/2} / (r_i dr^2) and r_{i-1/2} / (r_i dr^2), precomputed once (unused on the axis)
+i_index = np.arange(nr - 1, dtype=float)
+i_index[0] = 1
+r_plus = (1 + 1 / (2 * i_index)) / dr ** 2
+r_minus = (1 - 1 / (2 * i_index)) / dr ** 2
+
+# Initialize temperature fields
+T_initial = np.ones((nr, nz)) * T0  # Initialize entire temperature field to T0
+T_new_initial = np.ones((nr, nz)) * T0  # Initialize entire temperature field to T0
+
+# Store temperature next to the probe tip and at the final time step
+probe_histories = {}
+final_fields = {}
+
+for k in k_list:
+    # Copy temperature fields
+    T = T_initial.copy()
+    T_new = T_new_initial.copy()
+
+    # Check if wall is initialized
+    if wall_temp_duration > 0:
+        wall_boundary(T, Tw)
+        wall_boundary(T_new, Tw)
+
+    # Else use ambient temperature of air
+    elif wall_temp_duration == 0 and remove_wall_after is False:
+        wall_boundary(T, Tw0)
+        wall_boundary(T_new, Tw0)
+
+    elif wall_temp_duration == 0 and remove_wall_after is True:
+        wall_boundary(T, ambient_temp)
+        wall_boundary(T_new, ambient_temp)
+
+    # From eq. 5 and eq. 6
+    Qm = Qm0 * (1 + (Tl - T0) / 10)
+    Qb = wb * rho_b * cb * (Tb - Tl)
+
+    # Store temperature profile at each time step
+    temperature_profile = []
+
+    # Time integration
+    for t in range(time_steps):
+        lap = cylindrical_laplacian(T)
+
+        # From eq. 4
+        dTdt = (k * lap + Qb + Qm) / (rho * c)
+
+        # Derivative of eq. 4 with k* integrated
+        d2Tdt2 = (k_star * lap) / (rho * c)
+
+        # Substitute finite differences from discretization into eq. 7 and solve for T_n+1
+        T_new[:-1, 1:-1] = T[:-1, 1:-1] + dt * (dTdt + tau_q * dTdt - tau_T * d2Tdt2 + (k + k_star * tau_v) * dTdt)
+
+        apply_boundaries(T_new, t)
+
+        # Update temperature
+        T = T_new.copy()
+
+        # Store temperature one cell off the axis, halfway down the probe
+        temperature_profile.append(T[1, probe_end // 2])
+
+    probe_histories[k] = np.array(temperature_profile)
+    final_fields[k] = T.copy()
+
+# Plotting the results
+time = np.arange(0, time_steps * dt, dt)
+plt.figure(figsize=(10, 6))
+
+for k in k_list:
+    plt.plot(time, probe_histories[k], label=f'k = {k} W/m°C')
+
+plt.xlabel('Time (s)')
+plt.ylabel('Temperature (°C)')
+plt.title('Temperature Next to the Probe Over Time for Different k (axisymmetric)')
+plt.legend()
+plt.grid(True)
+plt.savefig(f'axisym_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}.png')
+# plt.show()
+
+# Plot heatmaps for each k value, mirrored about the axis to show the full cross section
+fig, axes = plt.subplots(1, len(k_list), figsize=(18, 6))
+
+for idx, k in enumerate(k_list):
+    ax = axes[idx]  # Access the correct subplot
+    T_section = np.concatenate([final_fields[k][:0:-1], final_fields[k]])
+    r_section = np.concatenate([-r[:0:-1], r])
+
+    contour = ax.contourf(r_section, z, T_section.T, 100, cmap='hot')
+    fig.colorbar(contour, ax=ax, shrink=0.5)
+    ax.invert_yaxis()
+    ax.set_aspect('equal', 'box')
+    ax.set_xlabel('r (m)')
+    ax.set_ylabel('z (m)')
+    ax.set_title(f'Temperature Distribution (k = {k}W/m°C)')
+
+plt.tight_layout()
+plt.savefig(f'axisym_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}_HM.png')
+# plt.show()
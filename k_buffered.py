@@ -0,0 +1,296 @@
+import tracemalloc
+import numpy as np
+import matplotlib.pyplot as plt
+from bioheat.stability import laplacian_coefficient, resolve_dt
+
+# Constants and parameters
+rho = 1000  # Tissue density (kg/m^3)
+c = 4000  # Specific heat of tissue (J/kg°C)
+k_list = [0.3, 0.625, 1, 1.5]  # Thermal conductivity of tissue (W/m°C)
+k_star = 0.1 # Additional thermal conductivity term (W/m°C/s)
+h = 4.5  # Heat transfer coefficient for Robin boundary condition (W/m^2°C) - Typical for large blood vessels
+wb = 0.0098  # Blood perfusion rate coefficient (1/s) - Typical for skin tissue
+rho_b = 1056  # Density of blood (kg/m^3)
+cb = 4000  # Specific heat of blood (J/kg°C)
+Qm0 = 50.65  # Metabolic heat generation (W/m^3)
+Tb = 37  # Temperature of arterial blood (°C)
+T0 = 37  # Initial temperature of the body (°C)
+Tl = 37  # Temperature of Tissue (°C)
+Tw = 100 # Fixed temperature at left and bottom boundary
+Tw0 = 37
+Lx = 0.05  # Length of the skin tissue in x direction (m)
+Ly = 0.05  # Length of the skin tissue in y direction (m)
+dx = 0.001  # Space step in x direction (m)
+dy = 0.001  # Space step in y direction (m)
+dt = 0.1  # Time step (s), scaled down to the stability limit of the fine grid
+dt_mode = 'scale'
+wall_temp_duration = 100 # Number of Wall Temperature 'ON' time steps
+remove_wall_after = False # Remove Wall if True, disables fourth boundry condition on boundry border
+fourth_boundary_on = True
+time_steps = 200  # Number of time steps
+tau_q = 600  # Relaxation time due to heat flux (s)
+tau_T = 300  # Relaxation time due to temperature gradient (s)
+tau_v = 100  # Relaxation time due to thermal displacement (s)
+ambient_temp = 37 # Ambient temperature of space without initialized wall temp (°C)
+allocation_benchmark = True  # Measure the steady state allocations per step with tracemalloc
+
+# Constants for the second material (assuming for the boundary condition of fourth kind)
+ku = 0.625   # Thermal conductivity of left material (W/m°C)
+
+DOI_1 = 'https://doi.org/10.1016/j.ijthermalsci.2022.108002'
+
+if wall_temp_duration == time_steps:
+    remove_wall_after = False
+
+# Every array and every view the time loop touches is created once by allocate_workspace. The boundary
+# functions below take the views of one field buffer and write through out= arguments, so a time step
+# allocates nothing. T and T_new are two buffers whose view sets are swapped after every step.
+#
+# The stencil runs on the flattened field over the rows 1 .. nx-2, where the x neighbours are ny cells
+# away and the y neighbours one cell away. Every operand is then a contiguous 1D slice (strided 2D
+# operands make NumPy allocate temporaries). The first and last column of those rows see wrapped
+# neighbours, but every face is rewritten by symmetric_boundary in the same step.
+
+# Named views of one field buffer, faces named as in the boundary comments of k.py
+def buffer_views(T_array):
+    flat = T_array.reshape(-1)
+    start = ny
+    stop = (nx - 1) * ny
+    return {
+        'field': T_array,
+        'center': flat[start:stop],
+        'up': flat[start - ny:stop - ny],
+        'down': flat[start + ny:stop + ny],
+        'left': flat[start - 1:stop - 1],
+        'right': flat[start + 1:stop + 1],
+        'xL': T_array[0, :],  # x = Lx
+        'xL_in': T_array[1, :],
+        'x0': T_array[-1, :],  # x = 0
+        'x0_in': T_array[-2, :],
+        'x0_in2': T_array[-3, :],
+        'y0': T_array[:, 0],  # y = 0
+        'y0_in': T_array[:, 1],
+        'y0_in2': T_array[:, 2],
+        'yL': T_array[:, -1],  # y = Ly
+        'yL_in': T_array[:, -2],
+        'probe': T_array[nx // 2, ny // 2:ny // 2 + 1],
+    }
+
+# Both field buffers, their views and the stencil and boundary scratch buffers
+def allocate_workspace():
+    return {
+        'buffers': [buffer_views(T_initial.copy()), buffer_views(T_initial.copy())],
+        'lap': np.empty((nx - 2) * ny),
+        'work': np.empty((nx - 2) * ny),
+        'row': np.empty(ny),
+        'column': np.empty(nx),
+    }
+
+# Scalar coefficients of the update and the boundaries for the current k, computed once per run
+def step_coefficients(dt_run):
+    # From eq. 5 and eq. 6
+    Qm = Qm0 * (1 + (Tl - T0) / 10)
+    Qb = wb * rho_b * cb * (Tb - Tl)
+
+    # Eq. 4 and its k* derivative substituted into eq. 7 collapse to a laplacian term and a source term
+    lag = 1 + tau_q + k + k_star * tau_v
+    return {
+        'lap_coef': dt_run * (lag * k - tau_T * k_star) / (rho * c),
+        'source': dt_run * lag * (Qb + Qm) / (rho * c),
+        'inv_dx2': 1 / dx ** 2,
+        'inv_dy2': 1 / dy ** 2,
+        'robin_inner': k / (h * dx + k),
+        'robin_outer': h * dx * Tl / (h * dx + k),
+        'fourth_x': k / ku,
+        'fourth_x_keep': 1 - k / ku,
+        'fourth_y': ku / k,
+        'fourth_y_keep': 1 - ku / k,
+    }
+
+# Boundry between wall and tissue
+def wall_boundary(V, wall_temp):
+    V['x0'].fill(wall_temp)  # x = 0 (bottom boundary)
+    V['y0'].fill(wall_temp)  # y = 0 (left boundary)
+
+# Symmetrical boundary conditions from eq. 16
+def symmetric_boundary(V):
+    np.copyto(V['xL'], V['xL_in'])  # x = Lx
+    np.copyto(V['x0'], V['x0_in'])  # x = 0
+    np.copyto(V['y0'], V['y0_in'])  # y = 0
+    np.copyto(V['yL'], V['yL_in'])  # y = Ly
+
+# Convective boundary condition to introduce a constant heat coefficient
+def convective_boundary(V, C):
+    np.multiply(V['xL_in'], C['robin_inner'], out=V['xL'])  # x = Lx
+    V['xL'] += C['robin_outer']
+    np.multiply(V['yL_in'], C['robin_inner'], out=V['yL'])  # y = Ly
+    V['yL'] += C['robin_outer']
+
+# Fourth boundary using constant temperature and heat flux for two thermal conductivity terms from secondary paper to model conduction.
+# T[-1] = T[-2] - r (T[-2] - T[-3]) is evaluated as (1 - r) T[-2] + r T[-3] through the row and column scratch buffers.
+def fourth_boundary(V, C, row, column):
+    if fourth_boundary_on is True:
+        np.multiply(V['x0_in'], C['fourth_x_keep'], out=V['x0'])  # x = 0
+        np.multiply(V['x0_in2'], C['fourth_x'], out=row)
+        V['x0'] += row
+        np.multiply(V['y0_in'], C['fourth_y_keep'], out=V['y0'])  # y = 0
+        np.multiply(V['y0_in2'], C['fourth_y'], out=column)
+        V['y0'] += column
+
+# Third boundary using constant heat coefficient
+def third_boundary(V, C):
+    np.multiply(V['x0_in'], C['robin_inner'], out=V['x0'])  # x = 0
+    V['x0'] += C['robin_outer']
+    np.multiply(V['y0_in'], C['robin_inner'], out=V['y0'])  # y = 0
+    V['y0'] += C['robin_outer']
+
+# One time step from the views of T into the views of T_new, same boundary sequence as the time loop in k.py
+def advance(workspace, V, V_new, C, wall_on):
+    lap = workspace['lap']
+    work = workspace['work']
+
+    # d2T/dx2
+    np.add(V['down'], V['up'], out=lap)
+    lap -= V['center']
+    lap -= V['center']
+    lap *= C['inv_dx2']
+
+    # d2T/dy2
+    np.add(V['right'], V['left'], out=work)
+    work -= V['center']
+    work -= V['center']
+    work *= C['inv_dy2']
+    lap += work
+
+    # T_n+1 = T_n + dt * (...)
+    lap *= C['lap_coef']
+    lap += C['source']
+    np.add(V['center'], lap, out=V_new['center'])
+
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(V_new, Tw)
+
+    # Symmetric boundary conditions (Neumann conditions with zero gradient)
+    symmetric_boundary(V_new)
+
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(V_new, Tw)
+
+    convective_boundary(V_new, C)
+
+    # Robin boundary condition once the wall has been removed, otherwise conduction into the wall material
+    if not wall_on and remove_wall_after is True:
+        third_boundary(V_new, C)
+    else:
+        fourth_boundary(V_new, C, workspace['row'], workspace['column'])
+
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(V_new, Tw)
+
+# Runs the current k for n_steps steps starting at step first_step, recording the center probe into probe_history
+def run_steps(workspace, C, probe_history, first_step, n_steps, wall_steps):
+    V, V_new = workspace['buffers']
+    for t in range(first_step, first_step + n_steps):
+        advance(workspace, V, V_new, C, t < wall_steps)
+
+        # Swap the buffers instead of copying
+        V, V_new = V_new, V
+
+        # Store temperature at the center of the tissue
+        np.copyto(probe_history[t], V['probe'])
+
+    workspace['buffers'] = [V, V_new]
+
+# Discretization
+x = np.arange(0, Lx + dx, dx)
+y = np.arange(0, Ly + dy, dy)
+nx = len(x)
+ny = len(y)
+
+# Initialize temperature field
+T_initial = np.ones((nx, ny)) * T0  # Initialize entire temperature field to T0
+
+# Check if wall is initialized
+if wall_temp_duration > 0:
+    wall_boundary(buffer_views(T_initial), Tw)
+
+# Else use ambient temperature of air
+elif wall_temp_duration == 0 and remove_wall_after is False:
+    wall_boundary(buffer_views(T_initial), Tw0)
+
+elif wall_temp_duration == 0 and remove_wall_after is True:
+    wall_boundary(buffer_views(T_initial), ambient_temp)
+
+# Stable time step shared by every k
+dt_run = dt
+for k in k_list:
+    dt_run = resolve_dt(dt_run, laplacian_coefficient(k, k_star, tau_q, tau_T, tau_v, rho, c), (dx, dy), mode=dt_mode)
+
+probe_histories = {}
+final_fields = {}
+
+for k in k_list:
+    workspace = allocate_workspace()
+    C = step_coefficients(dt_run)
+    probe_history = np.empty((time_steps, 1))
+
+    run_steps(workspace, C, probe_history, 0, time_steps, wall_temp_duration)
+
+    probe_histories[k] = probe_history[:, 0]
+    final_fields[k] = workspace['buffers'][0]['field'].copy()
+
+# Steady state allocations: after a warm up, the traced memory must not grow and no step may
+# allocate a temporary array
+if allocation_benchmark:
+    k = k_list[-1]
+    workspace = allocate_workspace()
+    C = step_coefficients(dt_run)
+    probe_history = np.empty((time_steps, 1))
+    warm_up = 10
+
+    tracemalloc.start()
+    run_steps(workspace, C, probe_history, 0, warm_up, wall_temp_duration)
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    run_steps(workspace, C, probe_history, warm_up, time_steps - warm_up, wall_temp_duration)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{time_steps - warm_up} steps on {nx} x {ny} cells: {(after - before) / (time_steps - warm_up):.1f} bytes retained per step, '
+          f'{peak - before} bytes peak above steady state (one row of the field is {ny * 8} bytes)')
+
+# Plotting the results
+time = np.arange(time_steps) * dt_run
+plt.figure(figsize=(10, 6))
+
+for k in k_list:
+    plt.plot(time, probe_histories[k], label=f'k = {k} W/m°C')
+
+plt.xlabel('Time (s)')
+plt.ylabel('Temperature (°C)')
+plt.title('Temperature Profile Over Time for Different k (double buffered)')
+plt.legend()
+plt.grid(True)
+plt.savefig(f'buffered_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}.png')
+# plt.show()
+
+# Plot heatmaps for each k value
+fig, axes = plt.subplots(1, len(k_list), figsize=(18, 6))
+
+for idx, k in enumerate(k_list):
+    ax = axes[idx]  # Access the correct subplot
+    T_rotated = np.rot90(final_fields[k], -1)
+
+    contour = ax.contourf(T_rotated, 100, cmap='hot')
+    fig.colorbar(contour, ax=ax, shrink=0.5)
+    ax.set_aspect('equal', 'box')
+    ax.set_xlabel('Length in cells')
+    ax.set_ylabel('Length in cells')
+    ax.set_title(f'Temperature Distribution (k = {k}W/m°C)')
+
+plt.tight_layout()
+plt.savefig(f'buffered_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}_HM.png')
+# plt.show()
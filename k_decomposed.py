@@ -0,0 +1,354 @@
+import os
+import time as timer
+import numpy as np
+import matplotlib.pyplot as plt
+from multiprocessing import Barrier, Process
+from multiprocessing.shared_memory import SharedMemory
+from bioheat.stability import laplacian_coefficient, resolve_dt
+
+# Constants and parameters
+rho = 1000  # Tissue density (kg/m^3)
+c = 4000  # Specific heat of tissue (J/kg°C)
+k = 0.5  # Thermal conductivity of tissue (W/m°C)
+k_star = 0.1 # Additional thermal conductivity term (W/m°C/s)
+h = 4.5  # Heat transfer coefficient for Robin boundary condition (W/m^2°C) - Typical for large blood vessels
+wb = 0.0098  # Blood perfusion rate coefficient (1/s) - Typical for skin tissue
+rho_b = 1056  # Density of blood (kg/m^3)
+cb = 4000  # Specific heat of blood (J/kg°C)
+Qm0 = 50.65  # Metabolic heat generation (W/m^3)
+Tb = 37  # Temperature of arterial blood (°C)
+T0 = 37  # Initial temperature of the body (°C)
+Tl = 37  # Temperature of Tissue (°C)
+Tw = 100 # Fixed temperature at left and bottom boundary
+Tw0 = 37
+Lx = 0.05  # Length of the skin tissue in x direction (m)
+Ly = 0.05  # Length of the skin tissue in y direction (m)
+dx = 0.00003  # Space step in x direction (m), about 1668 x 1668 = 2.8 M cells
+dy = 0.00003  # Space step in y direction (m)
+dt = 0.1  # Time step (s), scaled down to the stability limit of the fine grid
+dt_mode = 'scale'
+wall_temp_duration = 100 # Number of Wall Temperature 'ON' time steps
+remove_wall_after = False # Remove Wall if True, disables fourth boundry condition on boundry border
+fourth_boundary_on = True
+time_steps = 200  # Number of time steps
+tau_q = 600  # Relaxation time due to heat flux (s)
+tau_T = 300  # Relaxation time due to temperature gradient (s)
+tau_v = 100  # Relaxation time due to thermal displacement (s)
+ambient_temp = 37 # Ambient temperature of space without initialized wall temp (°C)
+
+# Constants for the second material (assuming for the boundary condition of fourth kind)
+ku = 0.625   # Thermal conductivity of left material (W/m°C)
+
+# Decomposition
+n_workers = os.cpu_count()  # Number of processes, each owns one strip of rows
+benchmark_workers = [1, 2, 4]  # Worker counts timed by the throughput benchmark (empty list skips it)
+
+DOI_1 = 'https://doi.org/10.1016/j.ijthermalsci.2022.108002'
+
+if wall_temp_duration == time_steps:
+    remove_wall_after = False
+
+# The field is split into strips of whole rows. Every strip lives in its own shared memory block of
+# shape (rows + 2, ny): local row 0 is the halo copied from the strip above, local row -1 the halo
+# from the strip below. The boundary functions act on the owned rows of one strip, the x faces only
+# in the strip that owns them (first strip: x = Lx, last strip: x = 0).
+
+# Boundry between wall and tissue
+def wall_boundary(T_array, wall_temp, first, last):
+    if last:
+        T_array[-1, :] = wall_temp  # x = 0 (bottom boundary)
+    T_array[:, 0] = wall_temp  # y = 0 (left boundary)
+
+# Symmetrical boundary conditions from eq. 16
+def symmetric_boundary(T_array, first, last):
+    if first:
+        T_array[0, :] = T_array[1, :]  # x = Lx
+    if last:
+        T_array[-1, :] = T_array[-2, :]  # x = 0
+    T_array[:, 0] = T_array[:, 1]  # y = 0
+    T_array[:, -1] = T_array[:, -2]  # y = Ly
+
+# Convective boundary condition to introduce a constant heat coefficient
+def convective_boundary(T_array, first, last):
+    if first:
+        T_array[0, :] = (h * dx * Tl + k * T_array[1, :]) / (h * dx + k)  # x = Lx
+    T_array[:, -1] = (h * dx * Tl + k * T_array[:, -2]) / (h * dx + k)  # y = Ly
+
+# Fourth boundary using constant temperature and heat flux for two thermal conductivity terms from secondary paper to model conduction.
+def fourth_boundary(T_array, first, last):
+    if fourth_boundary_on is True:
+        if last:
+            T_array[-1, :] = T_array[-2, :] - (k / ku) * (T_array[-2, :] - T_array[-3, :])  # x = 0
+        T_array[:, 0] = T_array[:, 1] - (ku / k) * (T_array[:, 1] - T_array[:, 2])  # y = 0
+
+# Third boundary using constant heat coefficient
+def third_boundary(T_array, first, last):
+    if last:
+        T_array[-1, :] = (h * dx * Tl + k * T_array[-2, :]) / (h * dx + k)  # x = 0
+    T_array[:, 0] = (h * dx * Tl + k * T_array[:, 1]) / (h * dx + k)  # y = 0
+
+# Same boundary sequence as the time loop in k.py, for the owned rows of one strip
+def apply_boundaries(T_array, wall_on, first, last):
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(T_array, Tw, first, last)
+
+    # Symmetric boundary conditions (Neumann conditions with zero gradient)
+    symmetric_boundary(T_array, first, last)
+
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(T_array, Tw, first, last)
+
+    convective_boundary(T_array, first, last)
+
+    # Robin boundary condition once the wall has been removed, otherwise conduction into the wall material
+    if not wall_on and remove_wall_after is True:
+        third_boundary(T_array, first, last)
+    else:
+        fourth_boundary(T_array, first, last)
+
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(T_array, Tw, first, last)
+
+# Owned rows [start, stop) of every strip, as even as possible. The last strip needs three rows
+# for the fourth boundary, the first two for the symmetric one.
+def strip_layout(n_rows, n_strips):
+    n_strips = max(1, min(n_strips, n_rows // 3))
+    edges = np.linspace(0, n_rows, n_strips + 1).round().astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+# Closes the blocks and with unlink removes them from /dev/shm. Both steps are attempted for every block
+# and their errors are dropped, so the cleanup neither hides the error that ended the run nor leaves
+# segments behind. The caller drops its views of the blocks first.
+def release_blocks(blocks, unlink):
+    for block in blocks:
+        try:
+            block.close()
+        except (BufferError, OSError):
+            pass
+        if unlink:
+            try:
+                block.unlink()
+            except OSError:
+                pass
+
+# Attach to a float64 shared memory block as an array
+def shared_array(name, shape):
+    block = SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+
+# Time integration of one strip. Every step reads the current buffer (owned rows plus halos), writes
+# the owned rows of the next buffer, copies its edge rows into the neighbours' halos of the next
+# buffer and meets the other workers at the barrier before the buffers swap.
+def strip_worker(index, layout, block_names, probe_name, barrier, dt_run, n_steps, wall_steps):
+    start, stop = layout[index]
+    first = index == 0
+    last = index == len(layout) - 1
+    shape = (stop - start + 2, ny)
+    blocks = []
+
+    try:
+        # Current and next buffers of this strip and its neighbours
+        local = []
+        for buffer_index in range(2):
+            block, array = shared_array(block_names[index][buffer_index], shape)
+            blocks.append(block)
+            local.append(array)
+
+        above = []
+        below = []
+        if not first:
+            for buffer_index in range(2):
+                block, array = shared_array(block_names[index - 1][buffer_index], (layout[index - 1][1] - layout[index - 1][0] + 2, ny))
+                blocks.append(block)
+                above.append(array)
+        if not last:
+            for buffer_index in range(2):
+                block, array = shared_array(block_names[index + 1][buffer_index], (layout[index + 1][1] - layout[index + 1][0] + 2, ny))
+                blocks.append(block)
+                below.append(array)
+
+        probe_block, probe_history = shared_array(probe_name, (n_steps,))
+        blocks.append(probe_block)
+        probe_row = nx // 2 - start + 1 if start <= nx // 2 < stop else None
+
+        # Local rows updated by the stencil, the global rows 0 and nx - 1 are left to the boundaries
+        row_begin = max(start, 1) - start + 1
+        row_end = min(stop, nx - 1) - start + 1
+        lap = np.empty((row_end - row_begin, ny - 2))
+        work = np.empty_like(lap)
+
+        # From eq. 5 and eq. 6
+        Qm = Qm0 * (1 + (Tl - T0) / 10)
+        Qb = wb * rho_b * cb * (Tb - Tl)
+
+        # Eq. 4 and its k* derivative substituted into eq. 7 collapse to a laplacian term and a source term
+        lag = 1 + tau_q + k + k_star * tau_v
+        lap_coef = dt_run * (lag * k - tau_T * k_star) / (rho * c)
+        source = dt_run * lag * (Qb + Qm) / (rho * c)
+
+        for t in range(n_steps):
+            current = local[t % 2]
+            following = local[(t + 1) % 2]
+            center = current[row_begin:row_end, 1:-1]
+
+            # d2T/dx2, the rows next to the strip edges read the halos
+            np.add(current[row_begin + 1:row_end + 1, 1:-1], current[row_begin - 1:row_end - 1, 1:-1], out=lap)
+            lap -= center
+            lap -= center
+            lap *= 1 / dx ** 2
+
+            # d2T/dy2
+            np.add(current[row_begin:row_end, 2:], current[row_begin:row_end, :-2], out=work)
+            work -= center
+            work -= center
+            work *= 1 / dy ** 2
+            lap += work
+
+            # T_n+1 = T_n + dt * (...)
+            lap *= lap_coef
+            lap += source
+            np.add(center, lap, out=following[row_begin:row_end, 1:-1])
+
+            apply_boundaries(following[1:-1], t < wall_steps, first, last)
+
+            # Halo exchange into the neighbours' next buffers
+            if not first:
+                above[(t + 1) % 2][-1] = following[1]
+            if not last:
+                below[(t + 1) % 2][0] = following[-2]
+
+            if probe_row is not None:
+                probe_history[t] = following[probe_row, ny // 2]
+
+            barrier.wait()
+
+    except BaseException:
+        # Release the other workers instead of leaving them waiting at the barrier
+        barrier.abort()
+        raise
+
+    finally:
+        # Drop the views first, a block cannot be closed while an array still points into it
+        local = above = below = current = following = center = array = probe_history = None
+        release_blocks(blocks, unlink=False)
+
+# Runs the decomposed solver with n_strips processes, returns the probe history, the final field and the wall time
+def run_decomposed(n_strips, dt_run, n_steps, wall_steps):
+    layout = strip_layout(nx, n_strips)
+    blocks = []
+
+    try:
+        # Two shared buffers per strip, both initialized with the owned rows and halos of T_initial
+        block_names = []
+        buffers = []
+        for start, stop in layout:
+            halo_start = max(start - 1, 0)
+            halo_stop = min(stop + 1, nx)
+            names = []
+            arrays = []
+            for _ in range(2):
+                block = SharedMemory(create=True, size=(stop - start + 2) * ny * 8)
+                blocks.append(block)
+                array = np.ndarray((stop - start + 2, ny), dtype=np.float64, buffer=block.buf)
+                array[halo_start - start + 1:halo_stop - start + 1] = T_initial[halo_start:halo_stop]
+                names.append(block.name)
+                arrays.append(array)
+            block_names.append(names)
+            buffers.append(arrays)
+
+        probe_block = SharedMemory(create=True, size=max(n_steps, 1) * 8)
+        blocks.append(probe_block)
+
+        barrier = Barrier(len(layout))
+        workers = [Process(target=strip_worker, args=(index, layout, block_names, probe_block.name, barrier, dt_run, n_steps, wall_steps))
+                   for index in range(len(layout))]
+
+        started = timer.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = timer.perf_counter() - started
+
+        if any(worker.exitcode != 0 for worker in workers):
+            raise RuntimeError('A strip worker failed, see its traceback above')
+
+        # Gather the owned rows of the buffer written by the last step
+        T_final = np.empty((nx, ny))
+        for (start, stop), arrays in zip(layout, buffers):
+            T_final[start:stop] = arrays[n_steps % 2][1:-1]
+
+        probe_history = np.ndarray((n_steps,), dtype=np.float64, buffer=probe_block.buf).copy()
+        return probe_history, T_final, elapsed
+
+    finally:
+        # Drop the views first, a block cannot be closed while an array still points into it
+        buffers = arrays = array = None
+        release_blocks(blocks, unlink=True)
+
+# Discretization
+x = np.arange(0, Lx + dx, dx)
+y = np.arange(0, Ly + dy, dy)
+nx = len(x)
+ny = len(y)
+
+# Initialize temperature field
+T_initial = np.ones((nx, ny)) * T0  # Initialize entire temperature field to T0
+
+# Check if wall is initialized
+if wall_temp_duration > 0:
+    wall_boundary(T_initial, Tw, True, True)
+
+# Else use ambient temperature of air
+elif wall_temp_duration == 0 and remove_wall_after is False:
+    wall_boundary(T_initial, Tw0, True, True)
+
+elif wall_temp_duration == 0 and remove_wall_after is True:
+    wall_boundary(T_initial, ambient_temp, True, True)
+
+if __name__ == '__main__':
+    # Stable time step for the fine grid
+    dt_run = resolve_dt(dt, laplacian_coefficient(k, k_star, tau_q, tau_T, tau_v, rho, c), (dx, dy), mode=dt_mode)
+    n_steps = time_steps
+    wall_steps = wall_temp_duration
+
+    probe_history, T_final, elapsed = run_decomposed(n_workers, dt_run, n_steps, wall_steps)
+    print(f'{len(strip_layout(nx, n_workers))} strips, {nx} x {ny} cells, {n_steps} steps in {elapsed:.2f}s')
+
+    # Throughput for each worker count against the first one, every run must reproduce the same field
+    reference = None
+    for workers in benchmark_workers:
+        _, T_bench, elapsed_bench = run_decomposed(workers, dt_run, n_steps, wall_steps)
+        if reference is None:
+            reference = (workers, T_bench, elapsed_bench)
+        speedup = reference[2] / elapsed_bench
+        difference = np.abs(T_bench - reference[1]).max()
+        print(f'{workers} workers: {nx * ny * n_steps / elapsed_bench / 1e6:.1f} Mcell-steps/s, '
+              f'speedup {speedup:.2f} (efficiency {speedup * reference[0] / workers:.2f}), '
+              f'max difference {difference:.1e} ({"identical" if difference == 0 else "differs"})')
+
+    # Plotting the results
+    time = np.arange(n_steps) * dt_run
+    plt.figure(figsize=(10, 6))
+    plt.plot(time, probe_history, label=f'k = {k} W/m°C')
+    plt.xlabel('Time (s)')
+    plt.ylabel('Temperature (°C)')
+    plt.title('Temperature Profile Over Time (domain decomposed)')
+    plt.legend()
+    plt.grid(True)
+    plt.savefig(f'decomposed_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}.png')
+    # plt.show()
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    contour = ax.contourf(np.rot90(T_final, -1), 100, cmap='hot')
+    fig.colorbar(contour, ax=ax, shrink=0.5)
+    ax.set_aspect('equal', 'box')
+    ax.set_xlabel('Length in cells')
+    ax.set_ylabel('Length in cells')
+    ax.set_title(f'Temperature Distribution (k = {k}W/m°C)')
+    plt.tight_layout()
+    plt.savefig(f'decomposed_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}_HM.png')
+    # plt.show()
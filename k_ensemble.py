@@ -0,0 +1,254 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from bioheat.stability import laplacian_coefficient, resolve_dt
+
+# Constants and parameters
+rho = 1000  # Tissue density (kg/m^3)
+c = 4000  # Specific heat of tissue (J/kg°C)
+k_list = [0.3, 0.625, 1, 1.5]  # Thermal conductivity of tissue (W/m°C), one ensemble member each
+k_star = 0.1 # Additional thermal conductivity term (W/m°C/s)
+h = 4.5  # Heat transfer coefficient for Robin boundary condition (W/m^2°C) - Typical for large blood vessels
+wb = 0.0098  # Blood perfusion rate coefficient (1/s) - Typical for skin tissue
+rho_b = 1056  # Density of blood (kg/m^3)
+cb = 4000  # Specific heat of blood (J/kg°C)
+Qm0 = 50.65  # Metabolic heat generation (W/m^3)
+Tb = 37  # Temperature of arterial blood (°C)
+T0 = 37  # Initial temperature of the body (°C)
+Tl = 37  # Temperature of Tissue (°C)
+Tw = 100 # Fixed temperature at left and bottom boundary
+Tw0 = 37
+Lx = 0.05  # Length of the skin tissue in x direction (m)
+Ly = 0.05  # Length of the skin tissue in y direction (m)
+dx = 0.01  # Space step in x direction (m)
+dy = 0.01  # Space step in y direction (m)
+dt = 0.1  # Time step (s)
+dt_mode = 'scale' # All members share dt, 'scale' shrinks it to the limit of the least stable member
+wall_temp_duration = 500 # Number of Wall Temperature 'ON' time steps
+remove_wall_after = False # Remove Wall if True, disables fourth boundry condition on boundry border
+fourth_boundary_on = True
+time_steps = 1000  # Number of time steps
+tau_q = 600  # Relaxation time due to heat flux (s)
+tau_T = 300  # Relaxation time due to temperature gradient (s)
+tau_v = 100  # Relaxation time due to thermal displacement (s)
+ambient_temp = 37 # Ambient temperature of space without initialized wall temp (°C)
+
+# Constants for the second material (assuming for the boundary condition of fourth kind)
+ku = 0.625   # Thermal conductivity of left material (W/m°C)
+
+# Precision
+precision = 'float32'  # dtype of the kernel, boundaries and recorder, 'float32' or 'float64'
+float64_accumulation = True  # Kahan compensation of the interior update in a float32 carry field, so long runs do not drift
+accuracy_report = True  # Rerun the ensemble in float64 and report the error of the chosen precision
+report_tolerance = 0.01  # Largest acceptable difference from float64 (°C)
+
+DOI_1 = 'https://doi.org/10.1016/j.ijthermalsci.2022.108002'
+
+if wall_temp_duration == time_steps:
+    remove_wall_after = False
+
+# Every field is stored as T[member, x, y], all members are advanced together.
+# The boundary functions take the member conductivities as a float64 (members, 1) array and write into the field dtype.
+
+# Boundry between wall and tissue
+def wall_boundary(T_array, wall_temp):
+    T_array[:, -1, :] = wall_temp  # x = 0 (bottom boundary)
+    T_array[:, :, 0] = wall_temp  # y = 0 (left boundary)
+
+# Symmetrical boundary conditions from eq. 16
+def symmetric_boundary(T_array):
+    T_array[:, 0, :] = T_array[:, 1, :]  # x = Lx
+    T_array[:, -1, :] = T_array[:, -2, :]  # x = 0
+    T_array[:, :, 0] = T_array[:, :, 1]  # y = 0
+    T_array[:, :, -1] = T_array[:, :, -2]  # y = Ly
+
+# Convective boundary condition to introduce a constant heat coefficient
+def convective_boundary(T_array, k):
+    T_array[:, 0, :] = (h * dx * Tl + k * T_array[:, 1, :]) / (h * dx + k)  # x = Lx
+    T_array[:, :, -1] = (h * dx * Tl + k * T_array[:, :, -2]) / (h * dx + k)  # y = Ly
+
+# Fourth boundary using constant temperature and heat flux for two thermal conductivity terms from secondary paper to model conduction.
+def fourth_boundary(T_array, k):
+    if fourth_boundary_on is True:
+        T_array[:, -1, :] = T_array[:, -2, :] - (k / ku) * (T_array[:, -2, :] - T_array[:, -3, :])  # x = 0
+        T_array[:, :, 0] = T_array[:, :, 1] - (ku / k) * (T_array[:, :, 1] - T_array[:, :, 2])  # y = 0
+
+# Third boundary using constant heat coefficient
+def third_boundary(T_array, k):
+    T_array[:, -1, :] = (h * dx * Tl + k * T_array[:, -2, :]) / (h * dx + k)  # x = 0
+    T_array[:, :, 0] = (h * dx * Tl + k * T_array[:, :, 1]) / (h * dx + k)  # y = 0
+
+# Same boundary sequence as the time loop in k.py
+def apply_boundaries(T_array, k, wall_on):
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(T_array, Tw)
+
+    # Symmetric boundary conditions (Neumann conditions with zero gradient)
+    symmetric_boundary(T_array)
+
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(T_array, Tw)
+
+    convective_boundary(T_array, k)
+
+    # Robin boundary condition once the wall has been removed, otherwise conduction into the wall material
+    if not wall_on and remove_wall_after is True:
+        third_boundary(T_array, k)
+    else:
+        fourth_boundary(T_array, k)
+
+    # Reapply fixed temperature boundary condition at each time step
+    if wall_on:
+        wall_boundary(T_array, Tw)
+
+# Interior increment T_n+1 - T_n of eq. 7 for every member, written into lap.
+# lap_coef and source are (members, 1, 1) arrays, eq. 4 and its k* derivative collapse into them.
+# The neighbour differences are taken first, which are exact for close float32 values, instead of sums
+# near 2 T that would lose the small differences to rounding.
+def tpl_increment(T_array, lap, work, lap_coef, source):
+    center = T_array[:, 1:-1, 1:-1]
+
+    # d2T/dx2
+    np.subtract(T_array[:, 2:, 1:-1], center, out=lap)
+    np.subtract(T_array[:, :-2, 1:-1], center, out=work)
+    lap += work
+    lap *= 1 / dx ** 2
+
+    # d2T/dy2
+    np.subtract(T_array[:, 1:-1, 2:], center, out=work)
+    work *= 1 / dy ** 2
+    lap += work
+    np.subtract(T_array[:, 1:-1, :-2], center, out=work)
+    work *= 1 / dy ** 2
+    lap += work
+
+    lap *= lap_coef
+    lap += source
+
+# Compensated T += increment: the part of the increment lost when rounding the sum is kept in carry and
+# added back with the next increment, so the float32 field follows the exact sum of the increments.
+# increment is overwritten, work holds the new sum.
+def kahan_add(T_array, increment, work, carry):
+    increment -= carry
+    np.add(T_array, increment, out=work)
+    np.subtract(work, T_array, out=carry)
+    carry -= increment
+    np.copyto(T_array, work)
+
+# Runs every member for n_steps in the given dtype, returns the center probe history and the final fields
+def run_ensemble(dtype, accumulate, dt_run, n_steps, wall_steps):
+    dtype = np.dtype(dtype)
+    members = len(k_list)
+    # Per-member coefficients stay float64, they are a few numbers and rounding them to float32 would bias every step
+    k = np.array(k_list)[:, None]
+
+    # From eq. 5 and eq. 6
+    Qm = Qm0 * (1 + (Tl - T0) / 10)
+    Qb = wb * rho_b * cb * (Tb - Tl)
+
+    lag = 1 + tau_q + k[:, :, None] + k_star * tau_v
+    lap_coef = dt_run * (lag * k[:, :, None] - tau_T * k_star) / (rho * c)
+    source = dt_run * lag * (Qb + Qm) / (rho * c)
+
+    T = np.ones((members, nx, ny), dtype=dtype) * T0
+
+    # Check if wall is initialized
+    if wall_temp_duration > 0:
+        wall_boundary(T, Tw)
+
+    # Else use ambient temperature of air
+    elif wall_temp_duration == 0 and remove_wall_after is False:
+        wall_boundary(T, Tw0)
+
+    elif wall_temp_duration == 0 and remove_wall_after is True:
+        wall_boundary(T, ambient_temp)
+
+    lap = np.empty((members, nx - 2, ny - 2), dtype=dtype)
+    work = np.empty((members, nx - 2, ny - 2), dtype=dtype)
+    probe_history = np.empty((n_steps, members), dtype=dtype)
+
+    # Rounding error of the interior update, only needed below float64
+    carry = np.zeros((members, nx - 2, ny - 2), dtype=dtype) if accumulate and dtype != np.float64 else None
+
+    # Time integration
+    for t in range(n_steps):
+        tpl_increment(T, lap, work, lap_coef, source)
+        if carry is None:
+            T[:, 1:-1, 1:-1] += lap
+        else:
+            kahan_add(T[:, 1:-1, 1:-1], lap, work, carry)
+
+        apply_boundaries(T, k, t < wall_steps)
+
+        # Store temperature at the center of the tissue
+        probe_history[t] = T[:, nx // 2, ny // 2]
+
+    return probe_history, T
+
+# One float64 step of the whole ensemble, used to check the shared dt with the boundaries included
+def ensemble_step(wall_on):
+    def step(T_array, dt_step):
+        k = np.array(k_list)[:, None]
+        lag = 1 + tau_q + k[:, :, None] + k_star * tau_v
+        lap_coef = dt_step * (lag * k[:, :, None] - tau_T * k_star) / (rho * c)
+        lap = np.empty((len(k_list), nx - 2, ny - 2))
+        work = np.empty_like(lap)
+
+        T_next = T_array.copy()
+        tpl_increment(T_array, lap, work, lap_coef, 0)
+        T_next[:, 1:-1, 1:-1] += lap
+        apply_boundaries(T_next, k, wall_on)
+        return T_next
+    return step
+
+# Discretization
+x = np.arange(0, Lx + dx, dx)
+y = np.arange(0, Ly + dy, dy)
+nx = len(x)
+ny = len(y)
+
+# Shared time step: every member is checked on its own, then the whole ensemble step with its boundaries
+coefficients = [laplacian_coefficient(k_member, k_star, tau_q, tau_T, tau_v, rho, c) for k_member in k_list]
+T_reference = np.ones((len(k_list), nx, ny)) * T0
+dt_run = dt
+for coefficient in coefficients:
+    dt_run = resolve_dt(dt_run, coefficient, (dx, dy), mode=dt_mode)
+for wall_on in (True, False):
+    dt_run = resolve_dt(dt_run, max(coefficients), (dx, dy), mode=dt_mode, step=ensemble_step(wall_on), T_reference=T_reference)
+
+n_steps = int(round(time_steps * dt / dt_run))
+wall_steps = int(round(wall_temp_duration * dt / dt_run))
+
+probe_history, T_final = run_ensemble(precision, float64_accumulation, dt_run, n_steps, wall_steps)
+
+# Accuracy of the chosen precision against float64
+if accuracy_report and np.dtype(precision) != np.float64:
+    probe_reference, T_reference_final = run_ensemble(np.float64, False, dt_run, n_steps, wall_steps)
+    probe_plain, T_plain = run_ensemble(precision, False, dt_run, n_steps, wall_steps)
+    rise = np.abs(T_reference_final - T0).max(axis=(1, 2))
+
+    print(f'Accuracy of {precision} against float64 after {n_steps} steps (dt = {dt_run:.4g}s)')
+    print(f'{"k (W/m°C)":>10} {"probe max err":>14} {"field max err":>14} {"no accumulation":>16} {"rel. to rise":>13}  safe')
+    for idx, k_member in enumerate(k_list):
+        probe_error = np.abs(probe_history[:, idx] - probe_reference[:, idx]).max()
+        field_error = np.abs(T_final[idx] - T_reference_final[idx]).max()
+        plain_error = np.abs(T_plain[idx] - T_reference_final[idx]).max()
+        relative = field_error / rise[idx] if rise[idx] > 0 else 0.0
+        safe = 'yes' if max(probe_error, field_error) <= report_tolerance else 'no'
+        print(f'{k_member:>10} {probe_error:>14.3e} {field_error:>14.3e} {plain_error:>16.3e} {relative:>13.3e}  {safe}')
+
+# Plotting the results
+time = np.arange(n_steps) * dt_run
+plt.figure(figsize=(10, 6))
+
+for idx, k_member in enumerate(k_list):
+    plt.plot(time, probe_history[:, idx], label=f'k = {k_member} W/m°C')
+
+plt.xlabel('Time (s)')
+plt.ylabel('Temperature (°C)')
+plt.title(f'Temperature Profile Over Time for Different k ({precision} ensemble)')
+plt.legend()
+plt.grid(True)
+plt.savefig(f'ensemble_{precision}_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}.png')
+# plt.show()
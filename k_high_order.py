@@ -0,0 +1,243 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+# Constants and parameters
+rho = 1000  # Tissue density (kg/m^3)
+c = 4000  # Specific heat of tissue (J/kg°C)
+k_list = [0.3, 0.625, 1, 1.5]  # Thermal conductivity of tissue (W/m°C)
+k_star = 0.1 # Additional thermal conductivity term (W/m°C/s)
+h = 4.5  # Heat transfer coefficient for Robin boundary condition (W/m^2°C) - Typical for large blood vessels
+wb = 0.0098  # Blood perfusion rate coefficient (1/s) - Typical for skin tissue
+rho_b = 1056  # Density of blood (kg/m^3)
+cb = 4000  # Specific heat of blood (J/kg°C)
+Qm0 = 50.65  # Metabolic heat generation (W/m^3)
+Tb = 37  # Temperature of arterial blood (°C)
+T0 = 37  # Initial temperature of the body (°C)
+Tl = 37  # Temperature of Tissue (°C)
+Tw = 100 # Fixed temperature at left and bottom boundary
+Tw0 = 37
+Lx = 0.05  # Length of the skin tissue in x direction (m)
+Ly = 0.05  # Length of the skin tissue in y direction (m)
+dx = 0.01  # Space step in x direction (m)
+dy = 0.01  # Space step in y direction (m)
+dt = 0.05  # Time step (s), the fourth order stencil has a 4/3 tighter stability limit than the three point one
+wall_temp_duration = 100 # Number of Wall Temperature 'ON' time steps
+remove_wall_after = False # Remove Wall if True, disables fourth boundry condition on boundry border
+fourth_boundary_on = True
+time_steps = 200  # Number of time steps
+tau_q = 600  # Relaxation time due to heat flux (s)
+tau_T = 300  # Relaxation time due to temperature gradient (s)
+tau_v = 100  # Relaxation time due to thermal displacement (s)
+ambient_temp = 37 # Ambient temperature of space without initialized wall temp (°C)
+stencil_order = 4  # Spatial order of accuracy, 2 for the three point stencil of k.py or 4 for the five point stencil
+
+# Constants for the second material (assuming for the boundary condition of fourth kind)
+ku = 0.625   # Thermal conductivity of left material (W/m°C)
+
+DOI_1 = 'https://doi.org/10.1016/j.ijthermalsci.2022.108002'
+
+if wall_temp_duration == time_steps:
+    remove_wall_after = False
+
+# Second derivative along the first axis for rows 1 .. n-2 (all columns).
+# Order 4 uses (-1, 16, -30, 16, -1) / 12 in the interior and the six point one-sided
+# closure (10, -15, -4, 14, -6, 1) / 12 on the rows next to the boundary.
+def second_derivative(T_array, spacing):
+    if stencil_order == 2:
+        return (T_array[2:] - 2 * T_array[1:-1] + T_array[:-2]) / spacing ** 2
+
+    d2 = np.empty((T_array.shape[0] - 2,) + T_array.shape[1:])
+    d2[1:-1] = -T_array[:-4] + 16 * T_array[1:-3] - 30 * T_array[2:-2] + 16 * T_array[3:-1] - T_array[4:]
+    d2[0] = 10 * T_array[0] - 15 * T_array[1] - 4 * T_array[2] + 14 * T_array[3] - 6 * T_array[4] + T_array[5]
+    d2[-1] = 10 * T_array[-1] - 15 * T_array[-2] - 4 * T_array[-3] + 14 * T_array[-4] - 6 * T_array[-5] + T_array[-6]
+    return d2 / (12 * spacing ** 2)
+
+def d2Tdx2(T_array):
+    return second_derivative(T_array, dx)[:, 1:-1]
+
+def d2Tdy2(T_array):
+    return second_derivative(T_array.T, dy).T[1:-1, :]
+
+# The n-th layer of cells inward from a face, faces named as in the boundary comments of k.py
+def layer(T_array, face, n):
+    if face == 'x0':
+        return T_array[-1 - n, :]
+    if face == 'xL':
+        return T_array[n, :]
+    if face == 'y0':
+        return T_array[:, n]
+    return T_array[:, -1 - n]
+
+# Boundary value for zero gradient at a face.
+# Order 4 uses the one-sided derivative (-25, 48, -36, 16, -3) / 12 set to zero.
+def neumann_value(T_array, face):
+    if stencil_order == 2:
+        return layer(T_array, face, 1)
+
+    return (48 * layer(T_array, face, 1) - 36 * layer(T_array, face, 2) + 16 * layer(T_array, face, 3) - 3 * layer(T_array, face, 4)) / 25
+
+# Boundary value for k dT/dn = h (T - Tl) at a face
+def robin_value(T_array, face, spacing):
+    if stencil_order == 2:
+        return (h * spacing * Tl + k * layer(T_array, face, 1)) / (h * spacing + k)
+
+    inner = 48 * layer(T_array, face, 1) - 36 * layer(T_array, face, 2) + 16 * layer(T_array, face, 3) - 3 * layer(T_array, face, 4)
+    return (k * inner + 12 * h * spacing * Tl) / (25 * k + 12 * h * spacing)
+
+# Boundary value for the fourth kind condition, the gradient at the face is -ratio times the gradient one cell in.
+# Order 4 evaluates both gradients with the one-sided derivatives at the face and at the first interior cell.
+def fourth_kind_value(T_array, face, ratio):
+    if stencil_order == 2:
+        return layer(T_array, face, 1) - ratio * (layer(T_array, face, 1) - layer(T_array, face, 2))
+
+    at_face = 48 * layer(T_array, face, 1) - 36 * layer(T_array, face, 2) + 16 * layer(T_array, face, 3) - 3 * layer(T_array, face, 4)
+    one_in = -10 * layer(T_array, face, 1) + 18 * layer(T_array, face, 2) - 6 * layer(T_array, face, 3) + layer(T_array, face, 4)
+    return (at_face + ratio * one_in) / (25 + 3 * ratio)
+
+# Boundry between wall and tissue
+def wall_boundary(T_array, wall_temp):
+    T_array[-1, :] = wall_temp  # x = 0 (bottom boundary)
+    T_array[:, 0] = wall_temp  # y = 0 (left boundary)
+
+# Symmetrical boundary conditions from eq. 16
+def symmetric_boundary(T_array):
+    T_array[0, :] = neumann_value(T_array, 'xL')  # x = Lx
+    T_array[-1, :] = neumann_value(T_array, 'x0')  # x = 0
+    T_array[:, 0] = neumann_value(T_array, 'y0')  # y = 0
+    T_array[:, -1] = neumann_value(T_array, 'yL')  # y = Ly
+
+# Convective boundary condition to introduce a constant heat coefficient
+def convective_boundary(T_array):
+    T_array[0, :] = robin_value(T_array, 'xL', dx)  # x = Lx
+    T_array[:, -1] = robin_value(T_array, 'yL', dy)  # y = Ly
+
+# Fourth boundary using constant temperature and heat flux for two thermal conductivity terms from secondary paper to model conduction.
+def fourth_boundary(T_array):
+    if fourth_boundary_on is True:
+        T_array[-1, :] = fourth_kind_value(T_array, 'x0', k / ku)  # x = 0
+        T_array[:, 0] = fourth_kind_value(T_array, 'y0', ku / k)  # y = 0
+
+# Third boundary using constant heat coefficient
+def third_boundary(T_array):
+    T_array[-1, :] = robin_value(T_array, 'x0', dx)  # x = 0
+    T_array[:, 0] = robin_value(T_array, 'y0', dy)  # y = 0
+
+# Discretization
+x = np.arange(0, Lx + dx, dx)
+y = np.arange(0, Ly + dy, dy)
+nx = len(x)
+ny = len(y)
+
+if stencil_order == 4 and min(nx, ny) < 6:
+    raise ValueError('The fourth order stencil needs at least 6 grid points in each direction')
+
+# Initialize temperature fields
+T_initial = np.ones((nx, ny)) * T0  # Initialize entire temperature field to T0
+T_new_initial = np.ones((nx, ny)) * T0  # Initialize entire temperature field to T0
+
+temperature_profiles = {}
+final_fields = {}
+
+for k in k_list:
+    # Copy temperature fields
+    T = T_initial.copy()
+    T_new = T_new_initial.copy()
+
+    # Check if wall is initialized
+    if wall_temp_duration > 0:
+        wall_boundary(T, Tw)
+        wall_boundary(T_new, Tw)
+
+    # Else use ambient temperature of air
+    elif wall_temp_duration == 0 and remove_wall_after is False:
+        wall_boundary(T, Tw0)
+        wall_boundary(T_new, Tw0)
+
+    elif wall_temp_duration == 0 and remove_wall_after is True:
+        wall_boundary(T, ambient_temp)
+        wall_boundary(T_new, ambient_temp)
+
+    # From eq. 5 and eq. 6
+    Qm = Qm0 * (1 + (Tl - T0) / 10)
+    Qb = wb * rho_b * cb * (Tb - Tl)
+
+    # Store temperature profile at each time step
+    temperature_profile = []
+
+    # Time integration
+    for t in range(time_steps):
+        lap = d2Tdx2(T) + d2Tdy2(T)
+
+        # From eq. 4
+        dTdt = (k * lap + Qb + Qm) / (rho * c)
+
+        # Derivative of eq. 4 with k* integrated
+        d2Tdt2 = (k_star * lap) / (rho * c)
+
+        # Substitute finite differences from discretization into eq. 7 and solve for T_n+1
+        T_new[1:-1, 1:-1] = T[1:-1, 1:-1] + dt * (dTdt + tau_q * dTdt - tau_T * d2Tdt2 + (k + k_star * tau_v) * dTdt)
+
+        # Reapply fixed temperature boundary condition at each time step
+        if t < wall_temp_duration:
+            wall_boundary(T_new, Tw)
+
+        # Symmetric boundary conditions (Neumann conditions with zero gradient)
+        symmetric_boundary(T_new)
+
+        # Reapply fixed temperature boundary condition at each time step
+        if t < wall_temp_duration:
+            wall_boundary(T_new, Tw)
+
+        convective_boundary(T_new)
+
+        # Robin boundary condition once the wall has been removed, otherwise conduction into the wall material
+        if t >= wall_temp_duration and remove_wall_after is True:
+            third_boundary(T_new)
+        else:
+            fourth_boundary(T_new)
+
+        # Reapply fixed temperature boundary condition at each time step
+        if t < wall_temp_duration:
+            wall_boundary(T_new, Tw)
+
+        # Update temperature
+        T = T_new.copy()
+
+        # Store temperature at the center of the tissue
+        temperature_profile.append(T[nx // 2, ny // 2])
+
+    temperature_profiles[k] = np.array(temperature_profile)
+    final_fields[k] = T.copy()
+
+# Plotting the results
+time = np.arange(0, time_steps * dt, dt)
+plt.figure(figsize=(10, 6))
+
+for k in k_list:
+    plt.plot(time, temperature_profiles[k], label=f'k = {k} W/m°C')
+
+plt.xlabel('Time (s)')
+plt.ylabel('Temperature (°C)')
+plt.title(f'Temperature Profile Over Time for Different k (order {stencil_order} stencil)')
+plt.legend()
+plt.grid(True)
+plt.savefig(f'order{stencil_order}_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}.png')
+# plt.show()
+
+# Plot heatmaps for each k value
+fig, axes = plt.subplots(1, len(k_list), figsize=(18, 6))
+
+for idx, k in enumerate(k_list):
+    ax = axes[idx]  # Access the correct subplot
+    T_rotated = np.rot90(final_fields[k], -1)
+
+    contour = ax.contourf(T_rotated, 100, cmap='hot')
+    fig.colorbar(contour, ax=ax, shrink=0.5)
+    ax.set_aspect('equal', 'box')
+    ax.set_xlabel('Length in cm')
+    ax.set_ylabel('Length in cm')
+    ax.set_title(f'Temperature Distribution (k = {k}W/m°C)')
+
+plt.tight_layout()
+plt.savefig(f'order{stencil_order}_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}_HM.png')
+# plt.show()
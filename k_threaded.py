@@ -0,0 +1,194 @@
+import os
+import time as timer
+import numpy as np
+import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
+from bioheat.boundaries import wall_boundary, wall_boundary_set
+from bioheat.grid import Grid
+from bioheat.kernel import buffer_views, step_coefficients
+from bioheat.params import Params
+from bioheat.scenario import Scenario
+from bioheat.stability import laplacian_coefficient, resolve_dt
+
+# Constants and parameters
+rho = 1000  # Tissue density (kg/m^3)
+c = 4000  # Specific heat of tissue (J/kg°C)
+k_list = [0.3, 0.625, 1, 1.5]  # Thermal conductivity of tissue (W/m°C)
+k_star = 0.1 # Additional thermal conductivity term (W/m°C/s)
+h = 4.5  # Heat transfer coefficient for Robin boundary condition (W/m^2°C) - Typical for large blood vessels
+wb = 0.0098  # Blood perfusion rate coefficient (1/s) - Typical for skin tissue
+rho_b = 1056  # Density of blood (kg/m^3)
+cb = 4000  # Specific heat of blood (J/kg°C)
+Qm0 = 50.65  # Metabolic heat generation (W/m^3)
+Tb = 37  # Temperature of arterial blood (°C)
+T0 = 37  # Initial temperature of the body (°C)
+Tl = 37  # Temperature of Tissue (°C)
+Tw = 100 # Fixed temperature at left and bottom boundary
+Tw0 = 37
+Lx = 0.05  # Length of the skin tissue in x direction (m)
+Ly = 0.05  # Length of the skin tissue in y direction (m)
+dx = 0.0002  # Space step in x direction (m)
+dy = 0.0002  # Space step in y direction (m)
+dt = 0.1  # Time step (s), scaled down to the stability limit of the fine grid
+dt_mode = 'scale'
+wall_temp_duration = 100 # Number of Wall Temperature 'ON' time steps
+remove_wall_after = False # Remove Wall if True, disables fourth boundry condition on boundry border
+fourth_boundary_on = True
+time_steps = 200  # Number of time steps
+tau_q = 600  # Relaxation time due to heat flux (s)
+tau_T = 300  # Relaxation time due to temperature gradient (s)
+tau_v = 100  # Relaxation time due to thermal displacement (s)
+ambient_temp = 37 # Ambient temperature of space without initialized wall temp (°C)
+
+# Constants for the second material (assuming for the boundary condition of fourth kind)
+ku = 0.625   # Thermal conductivity of left material (W/m°C)
+
+# Threading
+n_threads = os.cpu_count()  # Worker threads, the interior is split into this many row bands
+benchmark_threads = [1, 2, 4]  # Thread counts timed by the throughput benchmark (empty list skips it)
+
+DOI_1 = 'https://doi.org/10.1016/j.ijthermalsci.2022.108002'
+
+# The boundaries are those of the package, bioheat.boundaries.wall_boundary_set on the views of
+# bioheat.kernel.buffer_views with the coefficients of bioheat.kernel.step_coefficients. They write
+# through out= into the faces and the row and column scratch buffers, so they allocate no temporaries.
+params = Params(rho=rho, c=c, k_star=k_star, h=h, wb=wb, rho_b=rho_b, cb=cb, Qm0=Qm0, Tb=Tb, T0=T0, Tl=Tl,
+                tau_q=tau_q, tau_T=tau_T, tau_v=tau_v, ku=ku)
+grid = Grid(Lx=Lx, Ly=Ly, dx=dx, dy=dy)
+scenario = Scenario(Tw=Tw, Tw0=Tw0, ambient_temp=ambient_temp, wall_temp_duration=wall_temp_duration,
+                    remove_wall_after=remove_wall_after, fourth_boundary_on=fourth_boundary_on,
+                    time_steps=time_steps, dt=dt)
+
+# Interior rows [start, stop) of every band, rows 0 and nx - 1 belong to the boundaries
+def band_layout(n_bands):
+    n_bands = max(1, min(n_bands, nx - 2))
+    edges = np.linspace(1, nx - 1, n_bands + 1).round().astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+# Update of one row band, reads T and writes T_new[start:stop] through the band's own buffers.
+# Every call is a handful of ufuncs on large slices, which run without the GIL.
+def band_update(T, T_new, start, stop, lap, work, lap_coef, source):
+    center = T[start:stop, 1:-1]
+
+    # d2T/dx2
+    np.add(T[start + 1:stop + 1, 1:-1], T[start - 1:stop - 1, 1:-1], out=lap)
+    lap -= center
+    lap -= center
+    lap *= 1 / dx ** 2
+
+    # d2T/dy2
+    np.add(T[start:stop, 2:], T[start:stop, :-2], out=work)
+    work -= center
+    work -= center
+    work *= 1 / dy ** 2
+    lap += work
+
+    # T_n+1 = T_n + dt * (...)
+    lap *= lap_coef
+    lap += source
+    np.add(center, lap, out=T_new[start:stop, 1:-1])
+
+# Runs the current k on a persistent pool, returns the center probe history and the final field
+def run_threaded(executor, n_bands, dt_run, n_steps, wall_steps):
+    bands = band_layout(n_bands)
+    buffers = [(np.empty((stop - start, ny - 2)), np.empty((stop - start, ny - 2))) for start, stop in bands]
+
+    # Update and boundary coefficients of the current k, eq. 4 to eq. 7 collapse to a laplacian term and a source term
+    C = step_coefficients(params.with_values(k=k), grid, dt_run)
+    lap_coef = C['lap_coef']
+    source = C['source']
+    workspace = {'row': np.empty(ny), 'column': np.empty(nx)}
+
+    # Copy temperature fields
+    T = T_initial.copy()
+    T_new = T_initial.copy()
+    V, V_new = buffer_views(T), buffer_views(T_new)
+    probe_history = np.empty(n_steps)
+
+    for t in range(n_steps):
+        futures = [executor.submit(band_update, T, T_new, start, stop, lap, work, lap_coef, source)
+                   for (start, stop), (lap, work) in zip(bands, buffers)]
+        for future in futures:
+            future.result()
+
+        wall_boundary_set(V, V_new, C, scenario, workspace, t < wall_steps)
+
+        # Swap fields instead of copying, every cell of T_new is rewritten next step
+        T, T_new = T_new, T
+        V, V_new = V_new, V
+
+        # Store temperature at the center of the tissue
+        probe_history[t] = T[nx // 2, ny // 2]
+
+    return probe_history, T
+
+# Discretization
+x = np.arange(0, Lx + dx, dx)
+y = np.arange(0, Ly + dy, dy)
+nx = len(x)
+ny = len(y)
+
+# Initialize temperature field
+T_initial = np.ones((nx, ny)) * T0  # Initialize entire temperature field to T0
+
+# Wall temperature, or the ambient temperature of air when the wall starts off
+wall_boundary(buffer_views(T_initial), scenario.initial_wall_temp)
+
+# Stable time step shared by every k
+dt_run = dt
+for k in k_list:
+    dt_run = resolve_dt(dt_run, laplacian_coefficient(k, k_star, tau_q, tau_T, tau_v, rho, c), (dx, dy), mode=dt_mode)
+
+probe_histories = {}
+final_fields = {}
+
+with ThreadPoolExecutor(max_workers=n_threads) as executor:
+    for k in k_list:
+        probe_histories[k], final_fields[k] = run_threaded(executor, n_threads, dt_run, time_steps, wall_temp_duration)
+
+# Throughput for each thread count, every run must reproduce the same field
+reference = None
+k = k_list[-1]
+for threads in benchmark_threads:
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        started = timer.perf_counter()
+        _, T_bench = run_threaded(executor, threads, dt_run, time_steps, wall_temp_duration)
+        elapsed = timer.perf_counter() - started
+
+    if reference is None:
+        reference = (T_bench, elapsed)
+    print(f'{threads} threads: {nx * ny * time_steps / elapsed / 1e6:.1f} Mcell-steps/s, '
+          f'speedup {reference[1] / elapsed:.2f}, max difference {np.abs(T_bench - reference[0]).max():.1e}')
+
+# Plotting the results
+time = np.arange(time_steps) * dt_run
+plt.figure(figsize=(10, 6))
+
+for k in k_list:
+    plt.plot(time, probe_histories[k], label=f'k = {k} W/m°C')
+
+plt.xlabel('Time (s)')
+plt.ylabel('Temperature (°C)')
+plt.title('Temperature Profile Over Time for Different k (threaded)')
+plt.legend()
+plt.grid(True)
+plt.savefig(f'threaded_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}.png')
+# plt.show()
+
+# Plot heatmaps for each k value
+fig, axes = plt.subplots(1, len(k_list), figsize=(18, 6))
+
+for idx, k in enumerate(k_list):
+    ax = axes[idx]  # Access the correct subplot
+    T_rotated = np.rot90(final_fields[k], -1)
+
+    contour = ax.contourf(T_rotated, 100, cmap='hot')
+    fig.colorbar(contour, ax=ax, shrink=0.5)
+    ax.set_aspect('equal', 'box')
+    ax.set_xlabel('Length in cells')
+    ax.set_ylabel('Length in cells')
+    ax.set_title(f'Temperature Distribution (k = {k}W/m°C)')
+
+plt.tight_layout()
+plt.savefig(f'threaded_temp_dur-{wall_temp_duration}_removewallafter-{remove_wall_after}_fourth-{fourth_boundary_on}_HM.png')
+# plt.show()